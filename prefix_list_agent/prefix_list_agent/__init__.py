@@ -13,16 +13,25 @@
 
 import logging
 import sys
+import typing
 
-import eossdk
-
-from .agent import PrefixListAgent
+if typing.TYPE_CHECKING:
+    import eossdk
 
 logging.getLogger(__name__).addHandler(logging.NullHandler())
 
 
-def start(sdk: eossdk.Sdk) -> int:
+def __getattr__(name: str) -> typing.Any:
+    """Import 'PrefixListAgent' lazily, so that EOS SDK is optional."""
+    if name == "PrefixListAgent":
+        from .agent import PrefixListAgent
+        return PrefixListAgent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def start(sdk: "eossdk.Sdk") -> int:
     """Start the agent."""
+    from .agent import PrefixListAgent
     try:
         # create an instance of the agent
         _ = PrefixListAgent(sdk)
@@ -15,15 +15,28 @@ import datetime
 import multiprocessing.connection
 import os
 import signal
+import socket
+import time
 import typing
 
 import eossdk
 
 from .base import PrefixListBase
 from .exceptions import ConfigValueError
-from .types import ConfigVal, StatusVal
+from .formats import DECODERS
+from .history import RunHistory
+from .index import ListIndex
+from .metrics import MetricsExporter
+from .profiler import PROFILE_MODES
+from .scheduling import IO_CLASSES, Throttle, parse_cpus, phase_offset
+from .snapshot import Snapshot
+from .status import StatusPublisher
+from .types import (ConfigVal, ListRecords, PriorityRules, RunRecord, Stats,
+                    StatsVal, StatusVal)
 from .worker import PrefixListWorker
 
+RESTART_OPTIONS = ("rptk-endpoint", "source-directory")
+
 
 class PrefixListAgent(PrefixListBase,
                       eossdk.AgentHandler,  # type: ignore[misc]
@@ -43,9 +56,18 @@ class PrefixListAgent(PrefixListBase,
         eossdk.AgentHandler.__init__(self, self.agent_mgr)
         eossdk.TimeoutHandler.__init__(self, self.timeout_mgr)
         eossdk.FdHandler.__init__(self)
+        # publish status via a cache of the published values
+        self.publisher = StatusPublisher(self.agent_mgr)
         # set worker process to None
         self._worker: typing.Optional[PrefixListWorker] = None
         self.watching: typing.Set[multiprocessing.connection.Connection] = set()  # noqa: E501
+        # count worker runs, and arm one-shot profiling
+        self.runs = 0
+        self.profile_next = True
+        # per-list results, merged across runs
+        self.lists: ListRecords = dict()
+        # rptk format negotiated by a previous run, reused until a run fails
+        self.negotiated_format: typing.Optional[str] = None
 
     def option(self,
                typ: typing.Callable[[str], ConfigVal],
@@ -77,6 +99,16 @@ class PrefixListAgent(PrefixListBase,
             return i
         return self.option(validate, "refresh-interval", 3600)
 
+    @property
+    def refresh_jitter(self) -> typing.Optional[int]:
+        """Get 'refresh-jitter' option."""
+        def validate(s: str) -> int:
+            i = int(s)
+            if i not in range(0, 86401):
+                raise ConfigValueError("refresh-jitter must be in range 0 - 86400")  # noqa: E501
+            return i
+        return self.option(validate, "refresh-jitter", None)
+
     @property
     def update_delay(self) -> typing.Optional[int]:
         """Get 'update-delay' option."""
@@ -87,21 +119,260 @@ class PrefixListAgent(PrefixListBase,
             return i
         return self.option(validate, "update-delay", None)
 
+    @property
+    def profile_mode(self) -> typing.Optional[str]:
+        """Get 'profile-mode' option."""
+        def validate(s: str) -> str:
+            if s not in PROFILE_MODES:
+                raise ConfigValueError("profile-mode must be one of "
+                                       f"{', '.join(PROFILE_MODES)}")
+            return s
+        return self.option(validate, "profile-mode", None)
+
+    @property
+    def profile_interval(self) -> typing.Optional[int]:
+        """Get 'profile-interval' option."""
+        def validate(s: str) -> int:
+            i = int(s)
+            if i not in range(1, 1001):
+                raise ConfigValueError("profile-interval must be in range 1 - 1000")  # noqa: E501
+            return i
+        return self.option(validate, "profile-interval", None)
+
+    @property
+    def profile_dir(self) -> str:
+        """Get 'profile-directory' option."""
+        return self.option(str, "profile-directory", "/tmp/prefix-list-profiles")  # noqa: S108, E501
+
+    @property
+    def history_file(self) -> str:
+        """Get 'history-file' option."""
+        return self.option(str, "history-file", "/mnt/flash/prefix-list-agent/history.json")  # noqa: E501
+
+    @property
+    def history_size(self) -> int:
+        """Get 'history-size' option."""
+        def validate(s: str) -> int:
+            i = int(s)
+            if i not in range(1, 10001):
+                raise ConfigValueError("history-size must be in range 1 - 10000")  # noqa: E501
+            return i
+        return self.option(validate, "history-size", 100)
+
+    @property
+    def snapshot_file(self) -> str:
+        """Get 'snapshot-file' option."""
+        return self.option(str, "snapshot-file", "/mnt/flash/prefix-list-agent/snapshot.tar.gz")  # noqa: E501
+
+    @property
+    def checkpoint_age(self) -> int:
+        """Get 'checkpoint-age' option."""
+        def validate(s: str) -> int:
+            i = int(s)
+            if i not in range(0, 86401):
+                raise ConfigValueError("checkpoint-age must be in range 0 - 86400")  # noqa: E501
+            return i
+        return self.option(validate, "checkpoint-age", 900)
+
+    @property
+    def priority_tiers(self) -> PriorityRules:
+        """Get 'priority-tiers' option."""
+        def validate(s: str) -> PriorityRules:
+            rules = list()
+            for rule in s.split(","):
+                pattern, sep, tier = rule.strip().rpartition("=")
+                if not (sep and pattern and tier.isdigit()):
+                    raise ConfigValueError(f"invalid priority-tiers rule '{rule}'")  # noqa: E501
+                if int(tier) not in range(0, 10):
+                    raise ConfigValueError("priority-tiers tier must be in range 0 - 9")  # noqa: E501
+                rules.append((pattern, int(tier)))
+            return rules
+        return self.option(validate, "priority-tiers", [])
+
+    @property
+    def rptk_timeout(self) -> int:
+        """Get 'rptk-timeout' option."""
+        def validate(s: str) -> int:
+            i = int(s)
+            if i not in range(1, 601):
+                raise ConfigValueError("rptk-timeout must be in range 1 - 600")
+            return i
+        return self.option(validate, "rptk-timeout", 60)
+
+    @property
+    def run_deadline(self) -> typing.Optional[int]:
+        """Get 'run-deadline' option."""
+        def validate(s: str) -> int:
+            i = int(s)
+            if i not in range(60, 86401):
+                raise ConfigValueError("run-deadline must be in range 60 - 86400")  # noqa: E501
+            return i
+        return self.option(validate, "run-deadline", None)
+
+    @property
+    def max_entries(self) -> typing.Optional[int]:
+        """Get 'max-entries' option."""
+        def validate(s: str) -> int:
+            i = int(s)
+            if i not in range(1, 10000001):
+                raise ConfigValueError("max-entries must be in range 1 - 10000000")  # noqa: E501
+            return i
+        return self.option(validate, "max-entries", None)
+
+    @property
+    def max_response_bytes(self) -> typing.Optional[int]:
+        """Get 'max-response-bytes' option."""
+        def validate(s: str) -> int:
+            i = int(s)
+            if i not in range(1024, 1073741825):
+                raise ConfigValueError("max-response-bytes must be in range 1024 - 1073741824")  # noqa: E501
+            return i
+        return self.option(validate, "max-response-bytes", None)
+
+    @property
+    def entry_budget(self) -> typing.Optional[int]:
+        """Get 'entry-budget' option."""
+        def validate(s: str) -> int:
+            i = int(s)
+            if i not in range(1, 100000001):
+                raise ConfigValueError("entry-budget must be in range 1 - 100000000")  # noqa: E501
+            return i
+        return self.option(validate, "entry-budget", None)
+
+    @property
+    def rptk_rate(self) -> typing.Optional[float]:
+        """Get 'rptk-rate' option."""
+        def validate(s: str) -> float:
+            f = float(s)
+            if not 0.1 <= f <= 1000:
+                raise ConfigValueError("rptk-rate must be in range 0.1 - 1000")  # noqa: E501
+            return f
+        return self.option(validate, "rptk-rate", None)
+
+    @property
+    def rptk_bandwidth(self) -> typing.Optional[int]:
+        """Get 'rptk-bandwidth' option."""
+        def validate(s: str) -> int:
+            i = int(s)
+            if i not in range(1024, 1073741825):
+                raise ConfigValueError("rptk-bandwidth must be in range 1024 - 1073741824")  # noqa: E501
+            return i
+        return self.option(validate, "rptk-bandwidth", None)
+
+    @property
+    def rptk_format(self) -> typing.Optional[str]:
+        """Get 'rptk-format' option."""
+        def validate(s: str) -> str:
+            if s not in DECODERS:
+                raise ConfigValueError("rptk-format must be one of "
+                                       f"{', '.join(DECODERS)}")
+            return s
+        return self.option(validate, "rptk-format", None)
+
+    @property
+    def bundle_url(self) -> typing.Optional[str]:
+        """Get 'bundle-url' option."""
+        def validate(s: str) -> str:
+            if not s.startswith(("http://", "https://")):
+                raise ConfigValueError("bundle-url must be an http or https URL")  # noqa: E501
+            return s
+        return self.option(validate, "bundle-url", None)
+
+    @property
+    def prebuilt_url(self) -> typing.Optional[str]:
+        """Get 'prebuilt-url' option."""
+        def validate(s: str) -> str:
+            if not s.startswith(("http://", "https://")):
+                raise ConfigValueError("prebuilt-url must be an http or https URL")  # noqa: E501
+            return s
+        return self.option(validate, "prebuilt-url", None)
+
+    @property
+    def orphan_grace(self) -> int:
+        """Get 'orphan-grace' option."""
+        def validate(s: str) -> int:
+            i = int(s)
+            if i not in range(0, 2592001):
+                raise ConfigValueError("orphan-grace must be in range 0 - 2592000")  # noqa: E501
+            return i
+        return self.option(validate, "orphan-grace", 86400)
+
+    @property
+    def worker_nice(self) -> typing.Optional[int]:
+        """Get 'worker-nice' option."""
+        def validate(s: str) -> int:
+            i = int(s)
+            if i not in range(0, 20):
+                raise ConfigValueError("worker-nice must be in range 0 - 19")
+            return i
+        return self.option(validate, "worker-nice", None)
+
+    @property
+    def worker_io_class(self) -> typing.Optional[str]:
+        """Get 'worker-io-class' option."""
+        def validate(s: str) -> str:
+            if s not in IO_CLASSES:
+                raise ConfigValueError("worker-io-class must be one of "
+                                       f"{', '.join(IO_CLASSES)}")
+            return s
+        return self.option(validate, "worker-io-class", None)
+
+    @property
+    def worker_cpus(self) -> typing.Optional[typing.Set[int]]:
+        """Get 'worker-cpus' option."""
+        def validate(s: str) -> typing.Set[int]:
+            try:
+                return parse_cpus(s)
+            except ValueError as e:
+                raise ConfigValueError(f"invalid worker-cpus: {e}")
+        return self.option(validate, "worker-cpus", None)
+
+    @property
+    def throttle_load(self) -> typing.Optional[float]:
+        """Get 'throttle-load' option."""
+        def validate(s: str) -> float:
+            f = float(s)
+            if not 0 < f <= 100:
+                raise ConfigValueError("throttle-load must be in range 0 - 100")  # noqa: E501
+            return f
+        return self.option(validate, "throttle-load", None)
+
+    @property
+    def throttle_pressure(self) -> typing.Optional[int]:
+        """Get 'throttle-pressure' option."""
+        def validate(s: str) -> int:
+            i = int(s)
+            if i not in range(1, 101):
+                raise ConfigValueError("throttle-pressure must be in range 1 - 100")  # noqa: E501
+            return i
+        return self.option(validate, "throttle-pressure", None)
+
+    def throttle(self) -> typing.Optional[Throttle]:
+        """Get a worker throttle, if adaptive throttling is configured."""
+        load, pressure = self.throttle_load, self.throttle_pressure
+        if load is None and pressure is None:
+            return None
+        return Throttle(load=load, pressure=pressure)
+
+    @property
+    def index_file(self) -> str:
+        """Get 'index-file' option."""
+        return self.option(str, "index-file", "/tmp/prefix-list-agent/lists.json")  # noqa: S108, E501
+
+    @property
+    def metrics_file(self) -> typing.Optional[str]:
+        """Get 'metrics-file' option."""
+        return self.option(str, "metrics-file", None)
+
     def status_get(self,
                    typ: typing.Callable[[str], StatusVal],
                    key: str) -> StatusVal:
         """Get agent state key-value-pair."""
-        return typ(self.agent_mgr.status(key))
+        return typ(self.publisher.get(key))
 
-    # TODO: check max key/val lengths (512 char/10KB)
     def status_set(self, key: str, val: typing.Optional[StatusVal]) -> None:
         """Set agent state key-value-pair."""
-        if val is None:
-            self.debug(f"deleting state key {key}")
-            self.agent_mgr.status_del(key)
-        else:
-            self.debug(f"setting state '{key}' = '{val}'")
-            self.agent_mgr.status_set(key, val)
+        self.publisher.set(key, None if val is None else str(val))
 
     @property
     def status(self) -> typing.Optional[str]:
@@ -165,28 +436,102 @@ class PrefixListAgent(PrefixListBase,
             raise RuntimeError("attempted to access uninitialized worker.")
         return self._worker
 
+    @property
+    def running(self) -> bool:
+        """Check whether a worker process is currently running."""
+        return self._worker is not None and self._worker.is_alive()
+
     def start(self) -> None:
         """Start up the agent."""
         self.status = "init"
         self.init()
-        self.run()
+        offset = self.schedule_offset()
+        if offset:
+            self.info(f"Delaying first run by {offset} seconds")
+            self.sleep(offset)
+        else:
+            self.run()
 
-    def init(self) -> None:  # pragma: no cover
+    def init(self) -> None:
         """Perform one-time start actions."""
-        pass
+        self.restore_snapshot()
+
+    def restore_snapshot(self) -> None:
+        """Restore missing prefix-lists from the last snapshot."""
+        try:
+            restored = Snapshot(self.snapshot_file).restore(self.source_dir)
+        except Exception as e:
+            self.err(f"Failed to restore snapshot: {e}")
+            return
+        if not restored:
+            return
+        self.notice(f"Restored {len(restored)} prefix-lists from snapshot")
+        for afi in ("ip", "ipv6"):
+            try:
+                resp = self.eapi_mgr.run_show_cmd(f"refresh {afi} prefix-list")
+            except Exception as e:
+                self.err(f"Failed to refresh {afi} prefix-lists: {e}")
+                continue
+            if not resp.success():
+                self.err(f"Failed to refresh {afi} prefix-lists: "
+                         f"{resp.error_message()}")
+
+    def profile_path(self) -> typing.Optional[str]:
+        """Get the profile output path for the current run, if profiled.
+
+        Without 'profile-interval', only the next run after 'profile-mode' is
+        configured is profiled. Otherwise, every Nth run is profiled.
+        """
+        if self.profile_mode is None:
+            return None
+        interval = self.profile_interval
+        if interval is None:
+            if not self.profile_next:
+                return None
+            self.profile_next = False
+        elif self.runs % interval:
+            return None
+        ts = datetime.datetime.now().strftime("%Y%m%dT%H%M%S")
+        return os.path.join(self.profile_dir, f"worker-{ts}")
 
     def init_worker(self) -> None:
         """Create a worker instance."""
         self.info("Initialising worker")
         assert self.rptk_endpoint is not None  # noqa: S101
+        profile_path = self.profile_path()
+        if profile_path is not None:
+            self.notice(f"Profiling worker run: {profile_path}")
+            self.status_set("last-profile", profile_path)
         self._worker = PrefixListWorker(rptk_endpoint=self.rptk_endpoint,
                                         source_dir=self.source_dir,
                                         update_delay=self.update_delay,
-                                        eapi=self.eapi_mgr)
+                                        eapi=self.eapi_mgr,
+                                        profile_mode=self.profile_mode,
+                                        profile_path=profile_path,
+                                        snapshot_file=self.snapshot_file,
+                                        checkpoint_age=self.checkpoint_age,
+                                        priorities=self.priority_tiers,
+                                        nice=self.worker_nice,
+                                        io_class=self.worker_io_class,
+                                        cpus=self.worker_cpus,
+                                        throttle=self.throttle(),
+                                        orphan_grace=self.orphan_grace,
+                                        rptk_timeout=self.rptk_timeout,
+                                        run_deadline=self.run_deadline,
+                                        max_entries=self.max_entries,
+                                        max_response_bytes=self.max_response_bytes,  # noqa: E501
+                                        entry_budget=self.entry_budget,
+                                        rptk_rate=self.rptk_rate,
+                                        rptk_bandwidth=self.rptk_bandwidth,
+                                        bundle_url=self.bundle_url,
+                                        prebuilt_url=self.prebuilt_url,
+                                        rptk_format=self.rptk_format,
+                                        negotiated_format=self.negotiated_format)  # noqa: E501
 
     def run(self) -> None:
         """Spawn worker process."""
         self.status = "running"
+        self.runs += 1
         if self.rptk_endpoint is not None:
             try:
                 self.last_start = datetime.datetime.now()
@@ -233,11 +578,17 @@ class PrefixListAgent(PrefixListBase,
         """Report statistics and restart refresh_interval timer."""
         self.status = "finalising"
         self.info("Receiving results from worker")
-        stats = self.worker.data
-        if stats is not None:
+        stats = None
+        result = self.worker.data
+        if result is not None:
+            stats, lists, self.negotiated_format = result
             self.report(**stats)
+            self.update_lists(lists)
+            self.record_index()
         self.result = "ok"
         self.last_end = datetime.datetime.now()
+        self.record_history(stats=stats)
+        self.record_metrics(stats=stats)
         self.cleanup(process=self.worker)
         self.sleep()
 
@@ -252,26 +603,103 @@ class PrefixListAgent(PrefixListBase,
             err = process.error
         self.err(err)
         self.result = "failed"
+        self.negotiated_format = None
         self.last_end = datetime.datetime.now()
+        self.record_history(err=err)
+        self.record_metrics()
         if restart:
             self.restart()
         else:
             self.cleanup(process=process)
             self.sleep()
 
-    def report(self, **stats: int) -> None:
+    def record_history(self,
+                       stats: typing.Optional[Stats] = None,
+                       err: typing.Optional[Exception] = None) -> None:
+        """Append a record of the last run to the run history."""
+        start, end = self.last_start, self.last_end
+        duration = None
+        if start is not None and end is not None:
+            duration = round((end - start).total_seconds(), 3)
+        record: RunRecord = {
+            "start": None if start is None else start.isoformat(),
+            "end": None if end is None else end.isoformat(),
+            "duration": duration,
+            "result": self.result,
+            "stats": stats or {},
+            "error": None if err is None else str(err),
+        }
+        try:
+            RunHistory(self.history_file, self.history_size).append(record)
+            self.status_set("history-file", self.history_file)
+        except Exception as e:
+            self.err(f"Failed to record run history: {e}")
+
+    def update_lists(self, lists: ListRecords) -> None:
+        """Merge the per-list results of the last run."""
+        now = datetime.datetime.now().timestamp()
+        merged: ListRecords = dict()
+        for key, record in lists.items():
+            previous = self.lists.get(key, {})
+            if record.get("error") is None:
+                record["updated"] = now
+                if record.get("changed"):
+                    record["changed-at"] = now
+                else:
+                    record["changed-at"] = previous.get("changed-at")
+            else:
+                for field in ("entries", "digest", "updated", "changed-at"):
+                    record[field] = previous.get(field)
+            merged[key] = record
+        self.lists = merged
+
+    def record_index(self) -> None:
+        """Write the per-list results to the list index."""
+        try:
+            ListIndex(self.index_file).write(self.lists)
+            self.status_set("index-file", self.index_file)
+        except Exception as e:
+            self.err(f"Failed to write list index: {e}")
+
+    def record_metrics(self, stats: typing.Optional[Stats] = None) -> None:
+        """Write the metrics of the last run to the metrics file."""
+        path = self.metrics_file
+        if path is None:
+            return
+        try:
+            MetricsExporter(path).write(runs=self.runs,
+                                        result=self.result,
+                                        start=self.last_start,
+                                        end=self.last_end,
+                                        stats=stats,
+                                        lists=self.lists)
+            self.status_set("metrics-file", path)
+        except Exception as e:
+            self.err(f"Failed to write metrics: {e}")
+
+    def report(self, **stats: StatsVal) -> None:
         """Report statistics to the agent manager."""
-        for name, value in stats.items():
-            self.info(f"{name}: {value}")
-            self.agent_mgr.status_set(name, str(value))
+        changed = self.publisher.publish("stats", {name: str(value)
+                                                   for name, value
+                                                   in stats.items()})
+        self.info(f"Published {len(stats)} statistics "
+                  f"({changed} changed)")
 
     def cleanup(self,  # noqa: R701
-                process: typing.Optional[PrefixListWorker]) -> None:
-        """Kill the process if it is still running."""
+                process: typing.Optional[PrefixListWorker],
+                clear_checkpoint: bool = False) -> None:
+        """Kill the process if it is still running.
+
+        If 'clear_checkpoint' is set, the checkpoint journal of the process
+        is discarded, so that a stale run is not resumed.
+        """
         self.status = "cleanup"
         process_name = process.__class__.__name__
         self.info(f"Cleaning up {process_name} process")
         if process is not None:
+            if process.is_alive():
+                self.debug(f"Requesting {process_name} cancellation")
+                process.cancel()
             self.info(f"Closing connections from {process_name}")
             for conn in [c for c in
                          [getattr(process, k) for k in dir(process)
@@ -295,12 +723,38 @@ class PrefixListAgent(PrefixListBase,
                 self.notice(f"Timeout waiting for {process_name}. "
                             "Sending SIGKILL")
                 os.kill(process.pid, signal.SIGKILL)
+            if clear_checkpoint:
+                process.clear_checkpoint()
         self.info("Cleanup complete")
 
-    def sleep(self) -> None:
-        """Go to sleep for 'refresh_interval' seconds."""
+    def schedule_offset(self) -> int:
+        """Get the offset of this switch into the 'refresh-jitter' window."""
+        if not self.refresh_jitter:
+            return 0
+        return phase_offset(socket.gethostname(),
+                            min(self.refresh_jitter, self.refresh_interval))
+
+    def next_delay(self) -> float:
+        """Get the number of seconds until the next run is due.
+
+        Without 'refresh-jitter', this is 'refresh_interval'. Otherwise, runs
+        are aligned to the offset of this switch into each 'refresh_interval'
+        of the wall clock, but are never less than half an interval apart.
+        """
+        interval = self.refresh_interval
+        if not self.refresh_jitter:
+            return interval
+        delay = interval - (time.time() - self.schedule_offset()) % interval
+        if delay < interval / 2:
+            delay += interval
+        return delay
+
+    def sleep(self, delay: typing.Optional[float] = None) -> None:
+        """Go to sleep for 'delay' seconds, or until the next run is due."""
+        if delay is None:
+            delay = self.next_delay()
         self.status = "sleeping"
-        self.timeout_time_is(eossdk.now() + self.refresh_interval)
+        self.timeout_time_is(eossdk.now() + delay)
 
     def shutdown(self) -> None:
         """Shutdown the agent gracefully."""
@@ -334,6 +788,18 @@ class PrefixListAgent(PrefixListBase,
             self.notice("Agent disabled")
             self.shutdown()
 
+    def on_agent_option(self, name: str, value: str) -> None:
+        """Handle a change to an agent configuration option."""
+        self.info(f"Option '{name}' changed: '{value}'")
+        if name == "profile-mode":
+            self.profile_next = True
+        if name in ("rptk-endpoint", "rptk-format"):
+            self.negotiated_format = None
+        if name in RESTART_OPTIONS and self.running:
+            self.notice(f"'{name}' changed: cancelling stale run")
+            self.cleanup(process=self.worker, clear_checkpoint=True)
+            self.run()
+
     def on_timeout(self) -> None:
         """Handle a 'refresh_interval' timeout."""
         self.run()
@@ -11,7 +11,31 @@
 # the License.
 """prefix_list_agent base class."""
 
-import eossdk
+import logging
+import typing
+
+try:
+    import eossdk
+except ImportError:  # pragma: no cover
+    # running off-box, e.g. under 'prefix-list-render'
+    eossdk = None
+
+# logging levels corresponding to tracing levels 0 - 7
+LOG_LEVELS = (logging.CRITICAL, logging.CRITICAL, logging.CRITICAL,
+              logging.ERROR, logging.WARNING, logging.INFO, logging.INFO,
+              logging.DEBUG)
+
+
+class LogTracer(object):
+    """Tracer that writes to the 'logging' module, for use without EOS."""
+
+    def __init__(self, name: str) -> None:
+        """Initialise a LogTracer instance."""
+        self.logger = logging.getLogger(f"prefix_list_agent.{name}")
+
+    def trace(self, level: int, msg: str) -> None:
+        """Write tracing output at 'level'."""
+        self.logger.log(LOG_LEVELS[level], msg)
 
 
 class PrefixListBase(object):
@@ -19,7 +43,11 @@ class PrefixListBase(object):
 
     def __init__(self) -> None:
         """Initialise a PrefixListBase instance."""
-        self.tracer = eossdk.Tracer(self.__class__.__name__)
+        self.tracer: typing.Any
+        if eossdk is None:
+            self.tracer = LogTracer(self.__class__.__name__)
+        else:
+            self.tracer = eossdk.Tracer(self.__class__.__name__)
 
     def _trace(self, msg: object, level: int = 0) -> None:
         """Write tracing output."""
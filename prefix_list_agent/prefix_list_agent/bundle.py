@@ -0,0 +1,105 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""prefix_list_agent pre-resolved IRR data bundles."""
+
+import hashlib
+import json
+import os
+import typing
+import zipfile
+
+from .base import PrefixListBase
+from .formats import json_loads
+from .types import RptkPrefixFamilies, RptkPrefixes
+
+BUNDLE_SUFFIX = ".zip"
+
+MEMBER_SUFFIX = ".json"
+
+# fixed member timestamp, so that identical data gives an identical bundle
+MEMBER_DATE = (1980, 1, 1, 0, 0, 0)
+
+
+class Bundle(PrefixListBase):
+    """A pre-resolved bundle of the IRR data for the objects of a policy.
+
+    A bundle is a zip archive with a JSON member '<object>.json' per object,
+    holding its prefix entries by AFI in the RPTK 'json' format. The archive
+    comment holds a version stamp derived from the contents. The central
+    directory of the archive serves as an index, so that individual objects
+    can be read without decompressing the rest.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Initialise a Bundle instance."""
+        PrefixListBase.__init__(self)
+        self.path = path
+        self.archive = zipfile.ZipFile(path)
+
+    def __enter__(self) -> "Bundle":
+        """Enter a context."""
+        return self
+
+    def __exit__(self, *args: typing.Any) -> None:
+        """Exit a context."""
+        self.close()
+
+    def close(self) -> None:
+        """Close the archive."""
+        self.archive.close()
+
+    @property
+    def version(self) -> str:
+        """Get the version stamp of the bundle."""
+        return self.archive.comment.decode()
+
+    def get(self, obj: str) -> typing.Optional[RptkPrefixFamilies]:
+        """Get the prefix entries of 'obj', if it is in the bundle."""
+        try:
+            raw = self.archive.read(f"{obj}{MEMBER_SUFFIX}")
+        except KeyError:
+            return None
+        return typing.cast(RptkPrefixFamilies, json_loads(raw))
+
+    @staticmethod
+    def write(path: str, data: RptkPrefixes) -> bool:
+        """Write a bundle of 'data' to 'path'.
+
+        The existing bundle is left in place if its contents are the same,
+        so that the file, and any HTTP validators derived from it, only
+        change when the data does.
+
+        Returns whether the bundle at 'path' changed.
+        """
+        members = [(f"{obj}{MEMBER_SUFFIX}",
+                    json.dumps(data[obj], separators=(",", ":")).encode())
+                   for obj in sorted(data)]
+        digest = hashlib.sha256()
+        for name, content in members:
+            digest.update(name.encode() + b"\0" + content + b"\0")
+        version = digest.hexdigest()[:16]
+        try:
+            with Bundle(path) as existing:
+                if existing.version == version:
+                    return False
+        except (OSError, zipfile.BadZipFile):
+            pass
+        tmp_path = f"{path}.tmp"
+        with zipfile.ZipFile(tmp_path, "w",
+                             compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.comment = version.encode()
+            for name, content in members:
+                info = zipfile.ZipInfo(name, date_time=MEMBER_DATE)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                archive.writestr(info, content)
+        os.replace(tmp_path, path)
+        return True
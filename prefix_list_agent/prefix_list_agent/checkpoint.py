@@ -0,0 +1,100 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""prefix_list_agent run checkpoints."""
+
+import hashlib
+import json
+import os
+import time
+import typing
+
+from .base import PrefixListBase
+
+CheckpointRecord = typing.Dict[str, typing.Any]
+
+
+def file_digest(path: str) -> typing.Optional[str]:
+    """Get the SHA-256 digest of the contents of a file."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(65536), b""):
+                digest.update(chunk)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+
+class Checkpoint(PrefixListBase):
+    """Append-only journal of the prefix-lists completed by a run.
+
+    Each line of the journal is a JSON record of a prefix-list file that was
+    written, together with the digest of its contents. Records older than
+    'max_age' seconds are ignored.
+
+    The first line of the journal is a 'header' describing the run that
+    wrote it. A journal with a different header is stale, and is discarded.
+    """
+
+    def __init__(self, path: str, max_age: int,
+                 header: typing.Optional[CheckpointRecord] = None) -> None:
+        """Initialise a Checkpoint instance."""
+        PrefixListBase.__init__(self)
+        self.path = path
+        self.max_age = max_age
+        self.header = header or dict()
+
+    def load(self) -> typing.Dict[str, CheckpointRecord]:
+        """Load the fresh records in the journal, keyed by prefix-list."""
+        records: typing.Dict[str, CheckpointRecord] = dict()
+        oldest = time.time() - self.max_age
+        try:
+            with open(self.path) as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return records
+        if not self.is_current(lines[:1]):
+            self.notice("Discarding checkpoint journal of a stale run")
+            self.clear()
+            return records
+        for line in lines[1:]:
+            try:
+                record = json.loads(line)
+                if record["time"] >= oldest:
+                    records[record["key"]] = record
+            except (ValueError, KeyError, TypeError):
+                # most likely a record truncated by an interrupted write
+                self.debug(f"Ignoring invalid checkpoint record: {line!r}")
+        self.info(f"Loaded {len(records)} checkpoint records")
+        return records
+
+    def is_current(self, lines: typing.List[str]) -> bool:
+        """Check whether the journal header matches 'header'."""
+        try:
+            return bool(json.loads(lines[0])["header"] == self.header)
+        except (IndexError, ValueError, KeyError, TypeError):
+            return False
+
+    def record(self, key: str, **fields: typing.Any) -> None:
+        """Append a record of a completed prefix-list to the journal."""
+        record = dict(fields, key=key, time=time.time())
+        with open(self.path, "a") as f:
+            if not f.tell():
+                f.write(json.dumps({"header": self.header}) + "\n")
+            f.write(json.dumps(record) + "\n")
+
+    def clear(self) -> None:
+        """Remove the journal."""
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
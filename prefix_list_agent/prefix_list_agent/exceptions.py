@@ -21,12 +21,30 @@ class ConfigValueError(Exception):
     pass
 
 
+class CeilingExceeded(Exception):
+    """Raised when IRR data exceeds a configured ceiling."""
+
+    pass
+
+
 class TermException(BaseException):
     """Raised when SIGTERM is handled by handle_sigterm."""
 
     pass
 
 
+class CancelledException(BaseException):
+    """Raised when the agent requests cancellation of a worker run."""
+
+    pass
+
+
+class DeadlineExceeded(BaseException):
+    """Raised when a worker run has reached its deadline."""
+
+    pass
+
+
 def handle_sigterm(signum: int,
                    frame: typing.Optional[types.FrameType]) -> None:
     """Handle a SIGTERM signal by raising custom exception."""
@@ -0,0 +1,139 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""prefix_list_agent RPTK response formats."""
+
+import json
+import typing
+
+from .types import RptkPrefixEntry, RptkPrefixes
+
+Decoder = typing.Callable[[bytes], RptkPrefixes]
+JsonLoads = typing.Callable[[typing.Union[str, bytes]], typing.Any]
+
+# available JSON backends, in order of preference
+JSON_BACKENDS: typing.Dict[str, JsonLoads] = {"json": json.loads}
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    # the optional 'fast' extra is not installed
+    pass
+else:
+    # decodes directly from 'bytes', without an intermediate 'str'
+    JSON_BACKENDS["orjson"] = orjson.loads
+
+JSON_BACKEND = list(JSON_BACKENDS)[-1]
+json_loads = JSON_BACKENDS[JSON_BACKEND]
+
+DEFAULT_FORMAT = "json"
+
+# registered decoders
+DECODERS: typing.Dict[str, Decoder] = dict()
+
+
+def register(name: str) -> typing.Callable[[Decoder], Decoder]:
+    """Register a decoder for the RPTK format 'name'."""
+    def decorator(func: Decoder) -> Decoder:
+        DECODERS[name] = func
+        return func
+    return decorator
+
+
+def select(offered: typing.Iterable[str],
+           preferred: str = DEFAULT_FORMAT) -> str:
+    """Select the format to use from those offered by RPTK.
+
+    JSON is the cheapest format to decode, so other formats are only used
+    if 'preferred', and offered by RPTK. Otherwise, JSON is used.
+    """
+    if preferred in DECODERS and preferred in set(offered):
+        return preferred
+    return DEFAULT_FORMAT
+
+
+@register("json")
+def decode_json(body: bytes) -> RptkPrefixes:
+    """Decode a JSON object of objects, AFIs and prefix entries."""
+    return typing.cast(RptkPrefixes, json_loads(body))
+
+
+PLAIN_OBJECT = "irr object: "
+
+PLAIN_AFI = " prefixes:"
+
+PLAIN_BOUNDS = {"ge": "greater-equal", "le": "less-equal"}
+
+
+@register("plain")
+def decode_plain(body: bytes) -> RptkPrefixes:
+    """Decode RPTK's plain-text (LOA-style) prefix-list format.
+
+    The format is much smaller on the wire than JSON, but slower to decode.
+
+    Each object starts with an ``irr object: <object>`` line, followed by an
+    ``<afi> prefixes:`` line per AFI, and an indented line per prefix entry,
+    of the form ``<prefix>[ ge <n>][ le <n>]``, or ``none`` if there are no
+    entries. As the format does not mark inexact entries without bounds,
+    entries are decoded as exact unless they have bounds, which renders the
+    same prefix-list lines.
+    """
+    result: RptkPrefixes = dict()
+    obj = None
+    entries = None
+    for line in body.decode().splitlines():
+        if not line:
+            continue
+        if line.startswith(PLAIN_OBJECT):
+            obj = line[len(PLAIN_OBJECT):]
+            result[obj] = dict()
+            entries = None
+        elif line.endswith(PLAIN_AFI) and obj is not None:
+            entries = result[obj][line[:-len(PLAIN_AFI)]] = list()
+        elif line.startswith(" ") and entries is not None:
+            entry = decode_plain_entry(line)
+            if entry is not None:
+                entries.append(entry)
+        else:
+            raise ValueError(f"unexpected line '{line}'")
+    return result
+
+
+def decode_plain_entry(line: str) -> typing.Optional[RptkPrefixEntry]:
+    """Decode a prefix entry line of RPTK's plain-text format."""
+    prefix, *bounds = line.split()
+    if prefix == "none" and not bounds:
+        return None
+    if len(bounds) % 2 or not set(bounds[::2]) <= set(PLAIN_BOUNDS):
+        raise ValueError(f"invalid prefix entry '{line.strip()}'")
+    entry: RptkPrefixEntry = {"prefix": prefix, "exact": not bounds}
+    for key, value in zip(bounds[::2], bounds[1::2]):
+        entry[PLAIN_BOUNDS[key]] = int(value)
+    return entry
+
+
+def encode_plain(data: RptkPrefixes) -> bytes:
+    """Encode prefix data in RPTK's plain-text format."""
+    lines = []
+    for obj, afis in data.items():
+        lines.append(f"{PLAIN_OBJECT}{obj}")
+        for afi, entries in afis.items():
+            lines.append(f"{afi}{PLAIN_AFI}")
+            if not entries:
+                lines.append(" none")
+            for entry in entries:
+                line = f" {entry['prefix']}"
+                for key, field in PLAIN_BOUNDS.items():
+                    if field in entry:
+                        line += f" {key} {entry[field]}"
+                lines.append(line)
+        lines.append("")
+    return "".join(f"{line}\n" for line in lines).encode()
@@ -0,0 +1,58 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""prefix_list_agent run history."""
+
+import json
+import os
+import typing
+
+from .base import PrefixListBase
+from .types import RunRecord
+
+
+class RunHistory(PrefixListBase):
+    """Bounded on-disk ring buffer of update run records."""
+
+    def __init__(self, path: str, size: int) -> None:
+        """Initialise a RunHistory instance."""
+        PrefixListBase.__init__(self)
+        self.path = path
+        self.size = size
+
+    def load(self) -> typing.List[RunRecord]:
+        """Load the stored run records, oldest first."""
+        try:
+            with open(self.path) as f:
+                records = json.load(f)
+        except FileNotFoundError:
+            return []
+        except Exception as e:
+            self.err(f"Failed to load run history from {self.path}: {e}")
+            return []
+        if not isinstance(records, list):
+            self.err(f"Invalid run history in {self.path}")
+            return []
+        return records[-self.size:]
+
+    def append(self, record: RunRecord) -> None:
+        """Append a run record, discarding the oldest records if full."""
+        records = self.load()
+        records.append(record)
+        records = records[-self.size:]
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(records, f)
+        os.replace(tmp_path, self.path)
+        self.debug(f"Appended run record to {self.path}")
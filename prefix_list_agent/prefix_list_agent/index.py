@@ -0,0 +1,73 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""prefix_list_agent per-list index."""
+
+import json
+import os
+
+from .base import PrefixListBase
+from .types import ListRecords
+
+INDEX_VERSION = 1
+
+# fields of each per-list record, in the order they are stored
+INDEX_FIELDS = ("policy", "name", "afi", "file", "tier", "entries", "digest",
+                "changed", "changed-at", "updated", "latency", "error",
+                "loaded", "refresh-latency", "refresh-error", "mismatch")
+
+
+class ListIndex(PrefixListBase):
+    """Compact on-disk index of per-list records.
+
+    Records are stored as rows of the values of ``INDEX_FIELDS``, sorted by
+    policy, name and AFI, so that readers such as the CLI can filter them
+    without holding thousands of dictionaries in memory.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Initialise a ListIndex instance."""
+        PrefixListBase.__init__(self)
+        self.path = path
+
+    def load(self) -> ListRecords:
+        """Load the indexed records, keyed by policy, name and AFI."""
+        try:
+            with open(self.path) as f:
+                index = json.load(f)
+            fields = index["fields"]
+            rows = index["rows"]
+        except FileNotFoundError:
+            return dict()
+        except Exception as e:
+            self.err(f"Failed to load list index from {self.path}: {e}")
+            return dict()
+        records: ListRecords = dict()
+        for row in rows:
+            record = dict(zip(fields, row))
+            records[f"{record['policy']}/{record['name']}/{record['afi']}"] = record  # noqa: E501
+        return records
+
+    def write(self, lists: ListRecords) -> None:
+        """Replace the index with the records in 'lists'."""
+        rows = [[record.get(field) for field in INDEX_FIELDS]
+                for _, record in sorted(lists.items())]
+        index = {"version": INDEX_VERSION,
+                 "fields": INDEX_FIELDS,
+                 "rows": rows}
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(index, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+        self.debug(f"Wrote {len(rows)} records to {self.path}")
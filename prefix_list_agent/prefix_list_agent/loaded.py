@@ -0,0 +1,53 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""prefix_list_agent record of the prefix-lists loaded by EOS."""
+
+import json
+import os
+import typing
+
+from .base import PrefixListBase
+
+Digests = typing.Dict[str, str]
+
+
+class LoadedDigests(PrefixListBase):
+    """Digests of the prefix-list files that EOS last loaded successfully.
+
+    Digests are keyed by policy, name and AFI. A prefix-list whose file does
+    not match its recorded digest still needs refreshing, even if the file
+    was not changed by the current run.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Initialise a LoadedDigests instance."""
+        PrefixListBase.__init__(self)
+        self.path = path
+
+    def load(self) -> Digests:
+        """Load the recorded digests."""
+        try:
+            with open(self.path) as f:
+                digests = json.load(f)
+        except FileNotFoundError:
+            return dict()
+        except ValueError as e:
+            self.err(f"Failed to load loaded digests from {self.path}: {e}")
+            return dict()
+        return typing.cast(Digests, digests)
+
+    def save(self, digests: Digests) -> None:
+        """Replace the recorded digests."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(digests, f, sort_keys=True)
+        os.replace(tmp_path, self.path)
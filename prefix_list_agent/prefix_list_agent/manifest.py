@@ -0,0 +1,87 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""prefix_list_agent rendered tree manifests."""
+
+import datetime
+import json
+import os
+import typing
+
+from .base import PrefixListBase
+from .checkpoint import file_digest
+from .types import ListRecords, Stats
+
+MANIFEST_FILE = "manifest.json"
+
+MANIFEST_VERSION = 1
+
+
+class Manifest(PrefixListBase):
+    """Manifest of the prefix-list files in a rendered source directory.
+
+    Each file is listed by its path relative to the source directory, along
+    with the SHA-256 digest of its contents, so that a tree rendered off-box
+    can be verified before it is used.
+    """
+
+    def __init__(self, source_dir: str) -> None:
+        """Initialise a Manifest instance."""
+        PrefixListBase.__init__(self)
+        self.source_dir = source_dir
+        self.path = os.path.join(source_dir, MANIFEST_FILE)
+
+    def write(self, lists: ListRecords, stats: Stats) -> None:
+        """Write the manifest for the prefix-lists in 'lists'."""
+        files = {f"{record['policy']}/{record['file']}": {
+                     "name": record["name"],
+                     "afi": record["afi"],
+                     "entries": record["entries"],
+                     "digest": record["digest"],
+                 }
+                 for _, record in sorted(lists.items())
+                 if record.get("error") is None}
+        manifest = {"version": MANIFEST_VERSION,
+                    "generated": datetime.datetime.now().isoformat(),
+                    "stats": stats,
+                    "files": files}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp_path, self.path)
+        self.info(f"Wrote manifest of {len(files)} files to {self.path}")
+
+    def load(self) -> typing.Dict[str, typing.Any]:
+        """Load the manifest."""
+        with open(self.path) as f:
+            manifest = json.load(f)
+        if manifest.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"Unsupported manifest version in {self.path}")
+        return typing.cast(typing.Dict[str, typing.Any], manifest)
+
+    def verify(self,
+               files: typing.Optional[typing.Iterable[str]] = None) -> typing.List[str]:  # noqa: E501
+        """Verify the files in the source directory against the manifest.
+
+        If 'files' is given, only those files are verified.
+
+        Returns the files that are missing or whose digest does not match.
+        """
+        invalid = list()
+        entries = self.load()["files"]
+        for file in (entries if files is None else files):
+            entry = entries.get(file)
+            path = os.path.join(self.source_dir, file)
+            if entry is None or file_digest(path) != entry["digest"]:
+                invalid.append(file)
+        if invalid:
+            self.err(f"{len(invalid)} files do not match {self.path}")
+        return invalid
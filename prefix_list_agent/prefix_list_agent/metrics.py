@@ -0,0 +1,182 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""prefix_list_agent metrics export."""
+
+import datetime
+import os
+import typing
+
+from .base import PrefixListBase
+from .types import ListRecords, Stats, StatsVal
+
+Labels = typing.Dict[str, str]
+Sample = typing.Tuple[Labels, StatsVal]
+
+PREFIX = "prefix_list_agent"
+
+
+def escape(value: str) -> str:
+    """Escape a label value."""
+    return (value.replace("\\", "\\\\")
+                 .replace("\"", "\\\"")
+                 .replace("\n", "\\n"))
+
+
+def timestamp(ts: typing.Optional[datetime.datetime]) -> typing.Optional[float]:  # noqa: E501
+    """Convert a datetime to a unix timestamp."""
+    if ts is None:
+        return None
+    return round(ts.timestamp(), 3)
+
+
+class MetricsExporter(PrefixListBase):
+    """Write agent metrics to a file in OpenMetrics text format.
+
+    The file is replaced atomically, so that it can be picked up by a
+    collector such as the node_exporter textfile collector at any time.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Initialise a MetricsExporter instance."""
+        PrefixListBase.__init__(self)
+        self.path = path
+        self.lines: typing.List[str] = []
+
+    def metric(self,
+               name: str,
+               typ: str,
+               doc: str,
+               samples: typing.Iterable[Sample]) -> None:
+        """Add a metric family to the output."""
+        name = f"{PREFIX}_{name}"
+        suffix = "_total" if typ == "counter" else ""
+        self.lines.append(f"# TYPE {name} {typ}")
+        self.lines.append(f"# HELP {name} {doc}")
+        for labels, value in samples:
+            label_str = ",".join(f"{k}=\"{escape(v)}\""
+                                 for k, v in labels.items())
+            if label_str:
+                label_str = f"{{{label_str}}}"
+            self.lines.append(f"{name}{suffix}{label_str} {value}")
+
+    def render(self,
+               runs: int,
+               result: typing.Optional[str],
+               start: typing.Optional[datetime.datetime],
+               end: typing.Optional[datetime.datetime],
+               stats: typing.Optional[Stats],
+               lists: ListRecords,
+               now: typing.Optional[float] = None) -> str:
+        """Render the metrics exposition."""
+        if now is None:
+            now = datetime.datetime.now().timestamp()
+        stats = stats or {}
+        self.lines = []
+        self.metric("runs", "counter",
+                    "Update runs started since agent start.",
+                    [({}, runs)])
+        self.metric("last_run_success", "gauge",
+                    "Whether the last update run succeeded.",
+                    [({}, int(result == "ok"))])
+        self.run_metrics(start, end)
+        self.stats_metrics(stats)
+        self.list_metrics(lists, now)
+        self.lines.append("# EOF")
+        return "\n".join(self.lines) + "\n"
+
+    def run_metrics(self,
+                    start: typing.Optional[datetime.datetime],
+                    end: typing.Optional[datetime.datetime]) -> None:
+        """Add the timing metrics of the last run."""
+        start_ts, end_ts = timestamp(start), timestamp(end)
+        if start_ts is not None:
+            self.metric("last_run_start_timestamp_seconds", "gauge",
+                        "Start time of the last update run.",
+                        [({}, start_ts)])
+        if end_ts is not None:
+            self.metric("last_run_end_timestamp_seconds", "gauge",
+                        "End time of the last update run.",
+                        [({}, end_ts)])
+        if start_ts is not None and end_ts is not None:
+            self.metric("last_run_duration_seconds", "gauge",
+                        "Duration of the last update run.",
+                        [({}, round(end_ts - start_ts, 3))])
+
+    def stats_metrics(self, stats: Stats) -> None:
+        """Add the statistics reported by the worker."""
+        phases = [({"phase": k[len("phase-"):-len("-time")]}, v)
+                  for k, v in stats.items()
+                  if k.startswith("phase-") and k.endswith("-time")]
+        if phases:
+            self.metric("last_run_phase_duration_seconds", "gauge",
+                        "Duration of each phase of the last update run.",
+                        phases)
+        others = [({"stat": k}, v) for k, v in stats.items()
+                  if not k.startswith("phase-")]
+        if others:
+            self.metric("last_run_stat", "gauge",
+                        "Statistics reported by the last update run.",
+                        others)
+
+    def list_metrics(self, lists: ListRecords, now: float) -> None:
+        """Add the per-list metrics."""
+        if not lists:
+            return
+        entries: typing.List[Sample] = []
+        ages: typing.List[Sample] = []
+        latencies: typing.List[Sample] = []
+        errors: typing.List[Sample] = []
+        loaded: typing.List[Sample] = []
+        refreshes: typing.List[Sample] = []
+        for record in lists.values():
+            labels = {k: str(record[k]) for k in ("policy", "name", "afi")}
+            if record.get("entries") is not None:
+                entries.append((labels, record["entries"]))
+            if record.get("updated") is not None:
+                ages.append((labels, round(now - record["updated"], 3)))
+            if record.get("latency") is not None:
+                latencies.append((labels, round(record["latency"], 3)))
+            errors.append((labels, int(record.get("error") is not None)))
+            if record.get("loaded") is not None:
+                loaded.append((labels, record["loaded"]))
+            if record.get("refresh-latency") is not None:
+                refreshes.append((labels, record["refresh-latency"]))
+        self.metric("prefix_list_entries", "gauge",
+                    "Number of entries in each prefix-list.",
+                    entries)
+        self.metric("prefix_list_age_seconds", "gauge",
+                    "Time since each prefix-list was last updated.",
+                    ages)
+        self.metric("prefix_list_fetch_seconds", "gauge",
+                    "RPTK query latency of each prefix-list.",
+                    latencies)
+        self.metric("prefix_list_error", "gauge",
+                    "Whether the last update of each prefix-list failed.",
+                    errors)
+        self.metric("prefix_list_loaded_entries", "gauge",
+                    "Number of entries loaded by EOS for each prefix-list.",
+                    loaded)
+        self.metric("prefix_list_refresh_seconds", "gauge",
+                    "EOS refresh latency of each prefix-list.",
+                    refreshes)
+
+    def write(self, *args: typing.Any, **kwargs: typing.Any) -> None:
+        """Render the metrics and atomically replace the metrics file."""
+        text = self.render(*args, **kwargs)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(text)
+        os.replace(tmp_path, self.path)
+        self.debug(f"Wrote metrics to {self.path}")
@@ -0,0 +1,133 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""prefix_list_agent orphaned prefix-list file collection."""
+
+import json
+import os
+import time
+import typing
+
+from .base import PrefixListBase
+
+ORPHANS_FILE = ".orphans"
+
+
+class OrphanCollector(PrefixListBase):
+    """Remove prefix-list files that are no longer configured.
+
+    A file under '<source_dir>/<policy>/' that is not the source of any
+    configured prefix-list is removed once it has been orphaned for 'grace'
+    seconds. The time at which each orphan was first seen is kept in a state
+    file, so that the grace period spans runs. Policy directories are removed
+    once they have been empty for the same grace period, and are kept in the
+    state file as '<policy>/'.
+    """
+
+    def __init__(self, source_dir: str, grace: int) -> None:
+        """Initialise an OrphanCollector instance."""
+        PrefixListBase.__init__(self)
+        self.source_dir = source_dir
+        self.grace = grace
+        self.path = os.path.join(source_dir, ORPHANS_FILE)
+
+    def load(self) -> typing.Dict[str, float]:
+        """Load the times at which orphans were first seen."""
+        try:
+            with open(self.path) as f:
+                seen = json.load(f)
+        except FileNotFoundError:
+            return dict()
+        except Exception as e:
+            self.err(f"Failed to load orphan state from {self.path}: {e}")
+            return dict()
+        if not isinstance(seen, dict):
+            return dict()
+        return seen
+
+    def save(self, seen: typing.Dict[str, float]) -> None:
+        """Save the times at which orphans were first seen."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(seen, f)
+        os.replace(tmp_path, self.path)
+
+    def find(self, expected: typing.Set[str]) -> typing.Set[str]:
+        """Find files in policy directories that are not in 'expected'.
+
+        Paths are relative to the source directory, i.e. '<policy>/<file>'.
+        """
+        orphans = set()
+        for policy in os.listdir(self.source_dir):
+            policy_dir = os.path.join(self.source_dir, policy)
+            if policy.startswith(".") or not os.path.isdir(policy_dir):
+                continue
+            for file in os.listdir(policy_dir):
+                path = f"{policy}/{file}"
+                if not file.startswith(".") and path not in expected:
+                    orphans.add(path)
+        return orphans
+
+    def collect(self, expected: typing.Set[str]) -> typing.Tuple[int, int]:
+        """Remove the files orphaned for longer than the grace period.
+
+        Returns the number of files removed and the bytes reclaimed.
+        """
+        now = time.time()
+        previous = self.load()
+        orphans = self.find(expected)
+        seen = {path: previous.get(path, now) for path in orphans}
+        removed = reclaimed = 0
+        for path, since in sorted(seen.items()):
+            if now - since < self.grace:
+                continue
+            full_path = os.path.join(self.source_dir, path)
+            try:
+                size = os.path.getsize(full_path)
+                os.unlink(full_path)
+            except OSError as e:
+                self.err(f"Failed to remove orphaned file {full_path}: {e}")
+                continue
+            self.notice(f"Removed orphaned prefix-list file {full_path}")
+            del seen[path]
+            removed += 1
+            reclaimed += size
+        self.remove_empty_dirs(previous, seen, now)
+        self.save(seen)
+        return removed, reclaimed
+
+    def remove_empty_dirs(self,
+                          previous: typing.Dict[str, float],
+                          seen: typing.Dict[str, float],
+                          now: float) -> None:
+        """Remove policy directories empty for longer than the grace period.
+
+        Directories that are kept are added to 'seen', with the time they
+        were first seen empty in 'previous', or 'now'.
+        """
+        for policy in os.listdir(self.source_dir):
+            policy_dir = os.path.join(self.source_dir, policy)
+            if policy.startswith(".") or not os.path.isdir(policy_dir):
+                continue
+            if os.listdir(policy_dir):
+                continue
+            key = f"{policy}/"
+            since = previous.get(key, now)
+            if now - since < self.grace:
+                seen[key] = since
+                continue
+            try:
+                os.rmdir(policy_dir)
+            except OSError as e:
+                self.err(f"Failed to remove empty directory {policy_dir}: {e}")  # noqa: E501
+                seen[key] = since
+                continue
+            self.info(f"Removed empty directory {policy_dir}")
@@ -0,0 +1,118 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""prefix_list_agent worker profiling."""
+
+import cProfile
+import contextlib
+import os
+import pstats
+import threading
+import tracemalloc
+import types
+import typing
+
+from .base import PrefixListBase
+
+PROFILE_MODES = ("cpu", "memory", "all")
+
+
+class Profiler(PrefixListBase):
+    """Context manager to profile a block using cProfile and/or tracemalloc.
+
+    Results are written to files named after ``path``:
+
+    - ``<path>.pstats``: cProfile statistics, for use with ``pstats``,
+      merged across the threads profiled using ``thread()``.
+    - ``<path>.tracemalloc``: a ``tracemalloc.Snapshot`` dump.
+    - ``<path>.tracemalloc.txt``: the top allocation sites.
+    """
+
+    def __init__(self, mode: str, path: str, top: int = 50) -> None:
+        """Initialise a Profiler instance."""
+        PrefixListBase.__init__(self)
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"invalid profile mode '{mode}'")
+        self.mode = mode
+        self.path = path
+        self.top = top
+        self._profile: typing.Optional[cProfile.Profile] = None
+        self._threads: typing.List[cProfile.Profile] = list()
+        self._lock = threading.Lock()
+
+    @property
+    def cpu(self) -> bool:
+        """Check whether CPU profiling is enabled."""
+        return self.mode in ("cpu", "all")
+
+    @property
+    def memory(self) -> bool:
+        """Check whether memory allocation tracing is enabled."""
+        return self.mode in ("memory", "all")
+
+    def __enter__(self) -> "Profiler":
+        """Start profiling."""
+        self.info(f"Starting {self.mode} profiling")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if self.memory:
+            tracemalloc.start()
+        if self.cpu:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        return self
+
+    @contextlib.contextmanager
+    def thread(self) -> typing.Iterator[None]:
+        """Profile the calling thread, until the context exits.
+
+        cProfile only profiles the thread that enables it, so other threads
+        of the profiled block must be profiled separately. Their statistics
+        are merged into the results when the profiler exits.
+        """
+        if not self.cpu:
+            yield
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:  # pragma: no cover
+            # python >= 3.12 profiles all threads with a single profiler
+            yield
+            return
+        try:
+            yield
+        finally:
+            profile.disable()
+            with self._lock:
+                self._threads.append(profile)
+
+    def __exit__(self,
+                 exc_type: typing.Optional[typing.Type[BaseException]],
+                 exc_value: typing.Optional[BaseException],
+                 traceback: typing.Optional[types.TracebackType]) -> None:
+        """Stop profiling and write the results."""
+        if self._profile is not None:
+            self._profile.disable()
+            stats = pstats.Stats(self._profile)
+            with self._lock:
+                for profile in self._threads:
+                    stats.add(profile)
+                self._threads.clear()
+            stats.dump_stats(f"{self.path}.pstats")
+            self._profile = None
+        if self.memory:
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            snapshot.dump(f"{self.path}.tracemalloc")
+            with open(f"{self.path}.tracemalloc.txt", "w") as f:
+                for stat in snapshot.statistics("lineno")[:self.top]:
+                    f.write(f"{stat}\n")
+        self.notice(f"Profile written to {self.path}")
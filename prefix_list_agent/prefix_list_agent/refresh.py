@@ -0,0 +1,58 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""prefix_list_agent EOS prefix-list refresh output parsing."""
+
+import re
+import typing
+
+from .types import RefreshResult
+
+# 'refresh' command AFI keywords and the corresponding AFIs
+REFRESH_AFIS = {"ip": "ipv4", "ipv6": "ipv6"}
+
+NAME_RE = re.compile(r"prefix-list (?P<name>[^\s:,]+)", re.IGNORECASE)
+ENTRIES_RE = re.compile(r"num(ber|\.)?( of)? entries( loaded)?\s*:?\s*"
+                        r"(?P<entries>\d+)", re.IGNORECASE)
+# EOS prefixes error messages with '%' and warnings with '!'. Only the start
+# of a line is matched, since prefix-list names and source file paths may
+# contain words such as 'error' or 'invalid'.
+FAILED_RE = re.compile(r"^\s*(%|error\b|failed\b)", re.IGNORECASE)
+
+
+def parse_refresh_messages(messages: typing.Iterable[str],
+                           afi: str) -> typing.List[RefreshResult]:
+    """Parse the messages output by a 'refresh ... prefix-list' command.
+
+    Each line naming a prefix-list starts a new result. The number of
+    entries loaded, and any error, are taken from that line and those that
+    follow it. A line is an error if it starts with '%', 'Error' or
+    'Failed'. Lines that precede the first prefix-list are ignored.
+    """
+    results: typing.List[RefreshResult] = list()
+    current: typing.Optional[RefreshResult] = None
+    for msg in messages:
+        for line in msg.splitlines():
+            m = NAME_RE.search(line)
+            if m:
+                current = {"name": m.group("name"),
+                           "afi": REFRESH_AFIS.get(afi, afi),
+                           "loaded": None,
+                           "error": None}
+                results.append(current)
+            if current is None:
+                continue
+            m = ENTRIES_RE.search(line)
+            if m:
+                current["loaded"] = int(m.group("entries"))
+            if FAILED_RE.search(line):
+                current["error"] = line.strip()
+    return results
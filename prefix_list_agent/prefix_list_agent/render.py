@@ -0,0 +1,134 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""prefix_list_agent off-box rendering and bundle building."""
+
+import argparse
+import collections
+import json
+import logging
+import os
+import sys
+import typing
+
+from .bundle import BUNDLE_SUFFIX, Bundle
+from .manifest import Manifest
+from .types import Configured, RptkPrefixes
+from .worker import PrefixListWorker
+
+AFIS = ("ipv4", "ipv6")
+
+
+def load_targets(path: str) -> Configured:
+    """Load the prefix-lists to render from a targets file.
+
+    Each line holds the fields ``policy``, ``object``, ``afi`` and ``file``,
+    separated by whitespace. Blank lines and lines starting with ``#`` are
+    ignored.
+    """
+    configured: Configured = dict()
+    with open(path) as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                policy, obj, afi, file = line.split()
+            except ValueError:
+                raise ValueError(f"{path}:{lineno}: expected 4 fields")
+            if afi not in AFIS:
+                raise ValueError(f"{path}:{lineno}: invalid afi '{afi}'")
+            if os.path.basename(file) != file or file.startswith("."):
+                raise ValueError(f"{path}:{lineno}: invalid file '{file}'")
+            objs = configured.setdefault(policy, collections.defaultdict(dict))
+            objs[obj][afi] = file
+    return configured
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> int:
+    """Render prefix-lists into a source directory tree and manifest."""
+    parser = argparse.ArgumentParser(
+        prog="prefix-list-render",
+        description="Render the prefix-list source directory off-box.",
+    )
+    parser.add_argument("-e", "--rptk-endpoint", required=True,
+                        help="RPTK Web API endpoint URL")
+    parser.add_argument("-t", "--targets", required=True,
+                        help="file of '<policy> <object> <afi> <file>' lines")
+    parser.add_argument("-o", "--output-dir", required=True,
+                        help="source directory to render into")
+    parser.add_argument("-v", "--verbose", action="count", default=0,
+                        help="increase logging verbosity")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=max(logging.WARNING - 10 * args.verbose,
+                                  logging.DEBUG))
+    try:
+        configured = load_targets(args.targets)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    os.makedirs(args.output_dir, exist_ok=True)
+    worker = PrefixListWorker(rptk_endpoint=args.rptk_endpoint,
+                              source_dir=args.output_dir,
+                              update_delay=None,
+                              eapi=None)
+    stats = worker.render(configured)
+    for name, value in worker.counters.items():
+        stats[name] = round(value, 3)
+    Manifest(args.output_dir).write(worker.lists, stats)
+    json.dump(stats, sys.stdout, indent=1, sort_keys=True)
+    sys.stdout.write("\n")
+    return 1 if stats["failed"] else 0
+
+
+def bundle(argv: typing.Optional[typing.List[str]] = None) -> int:
+    """Build a pre-resolved IRR data bundle per policy."""
+    parser = argparse.ArgumentParser(
+        prog="prefix-list-bundle",
+        description="Build pre-resolved IRR data bundles off-box.",
+    )
+    parser.add_argument("-e", "--rptk-endpoint", required=True,
+                        help="RPTK Web API endpoint URL")
+    parser.add_argument("-t", "--targets", required=True,
+                        help="file of '<policy> <object> <afi> <file>' lines")
+    parser.add_argument("-o", "--output-dir", required=True,
+                        help="directory to write '<policy>.zip' bundles to")
+    parser.add_argument("-v", "--verbose", action="count", default=0,
+                        help="increase logging verbosity")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=max(logging.WARNING - 10 * args.verbose,
+                                  logging.DEBUG))
+    try:
+        configured = load_targets(args.targets)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    os.makedirs(args.output_dir, exist_ok=True)
+    worker = PrefixListWorker(rptk_endpoint=args.rptk_endpoint,
+                              source_dir=args.output_dir,
+                              update_delay=None,
+                              eapi=None)
+    data: typing.Dict[str, RptkPrefixes] = {policy: dict()
+                                            for policy in configured}
+    for _, unit_data in worker.iter_data(configured):
+        for policy, objs in unit_data.items():
+            data[policy].update(objs)
+    stats = {"objects": 0, "missing": 0, "changed": 0}
+    for policy, objs in data.items():
+        stats["objects"] += len(objs)
+        stats["missing"] += len(configured[policy]) - len(objs)
+        path = os.path.join(args.output_dir, f"{policy}{BUNDLE_SUFFIX}")
+        stats["changed"] += int(Bundle.write(path, objs))
+    json.dump(stats, sys.stdout, indent=1, sort_keys=True)
+    sys.stdout.write("\n")
+    return 1 if stats["missing"] else 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
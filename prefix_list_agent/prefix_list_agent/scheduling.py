@@ -0,0 +1,175 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""prefix_list_agent scheduling and throttling."""
+
+import hashlib
+import os
+import time
+import typing
+
+from .base import PrefixListBase
+
+# 'ionice' scheduling classes
+IO_CLASSES = {"best-effort": 2, "idle": 3}
+
+LOADAVG_FILE = "/proc/loadavg"
+PRESSURE_FILE = "/proc/pressure/cpu"
+
+# seconds between checks of system load while throttled
+THROTTLE_POLL = 1.0
+
+# maximum seconds to pause for at a time, so that a run always progresses
+THROTTLE_MAX_WAIT = 30.0
+
+
+def parse_cpus(s: str) -> typing.Set[int]:
+    """Parse a CPU list such as '0-1,3' into a set of CPU numbers."""
+    cpus: typing.Set[int] = set()
+    for item in s.split(","):
+        first, sep, last = item.strip().partition("-")
+        if sep:
+            cpus.update(range(int(first), int(last) + 1))
+        else:
+            cpus.add(int(first))
+    if not cpus:
+        raise ValueError(f"empty CPU list '{s}'")
+    return cpus
+
+
+def phase_offset(seed: str, span: int) -> int:
+    """Get a deterministic offset in the range 0 - 'span' from 'seed'.
+
+    The offset is stable across restarts, but differs between seeds, e.g.
+    the hostnames of the switches in a fleet.
+    """
+    if span <= 0:
+        return 0
+    digest = hashlib.sha256(seed.encode()).digest()
+    return int.from_bytes(digest[:8], "big") % span
+
+
+class TokenBucket(object):
+    """Client-side token bucket rate limiter.
+
+    Tokens accumulate at 'rate' per second, up to 'burst' (one second's worth
+    by default). Taking more tokens than are available waits for the deficit
+    to be refilled, so requests larger than 'burst' are still allowed.
+    """
+
+    def __init__(self,
+                 rate: float,
+                 burst: typing.Optional[float] = None) -> None:
+        """Initialise a TokenBucket instance."""
+        self.rate = rate
+        self.burst = burst if burst is not None else rate
+        self.tokens = self.burst
+        self.last = time.monotonic()
+
+    def take(self, n: float = 1) -> float:
+        """Take 'n' tokens, waiting until they are available.
+
+        Returns the number of seconds waited for.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst,
+                          self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        self.tokens -= n
+        if self.tokens >= 0:
+            return 0.0
+        wait = -self.tokens / self.rate
+        time.sleep(wait)
+        return wait
+
+
+class Throttle(PrefixListBase):
+    """Pause the worker while the control-plane CPU is busy.
+
+    The CPU is busy if the 1-minute load average per CPU exceeds 'load', or
+    the share of time that runnable tasks were stalled waiting for a CPU over
+    the last 10 seconds exceeds 'pressure' percent (where pressure stall
+    information is available).
+    """
+
+    def __init__(self,
+                 load: typing.Optional[float] = None,
+                 pressure: typing.Optional[float] = None) -> None:
+        """Initialise a Throttle instance."""
+        PrefixListBase.__init__(self)
+        self.load = load
+        self.pressure = pressure
+        self.ncpus = os.cpu_count() or 1
+
+    @staticmethod
+    def read(path: str) -> typing.Optional[str]:
+        """Read a '/proc' file, if it exists."""
+        try:
+            with open(path) as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def current_load(self) -> typing.Optional[float]:
+        """Get the 1-minute load average per CPU."""
+        content = self.read(LOADAVG_FILE)
+        if content is None:
+            return None
+        return float(content.split()[0]) / self.ncpus
+
+    def current_pressure(self) -> typing.Optional[float]:
+        """Get the 10-second CPU pressure stall average (percent)."""
+        content = self.read(PRESSURE_FILE)
+        if content is None:
+            return None
+        for line in content.splitlines():
+            fields = line.split()
+            if fields and fields[0] == "some":
+                for field in fields[1:]:
+                    key, _, value = field.partition("=")
+                    if key == "avg10":
+                        return float(value)
+        return None
+
+    def busy(self) -> bool:
+        """Check whether the CPU is too busy for the worker to proceed."""
+        if self.load is not None:
+            load = self.current_load()
+            if load is not None and load > self.load:
+                self.debug(f"Load average per CPU {load:.2f} > {self.load}")
+                return True
+        if self.pressure is not None:
+            pressure = self.current_pressure()
+            if pressure is not None and pressure > self.pressure:
+                self.debug(f"CPU pressure {pressure:.2f}% > {self.pressure}%")
+                return True
+        return False
+
+    def wait(self,
+             check: typing.Callable[[], None],
+             max_wait: typing.Optional[float] = None) -> float:
+        """Pause while the CPU is busy, calling 'check' between polls.
+
+        The pause is limited to 'THROTTLE_MAX_WAIT', or to 'max_wait' seconds
+        (such as the time remaining until a deadline) if that is shorter.
+
+        Returns the number of seconds paused for.
+        """
+        limit = THROTTLE_MAX_WAIT
+        if max_wait is not None:
+            limit = max(min(limit, max_wait), 0.0)
+        t0 = time.monotonic()
+        waited = 0.0
+        while waited < limit and self.busy():
+            check()
+            time.sleep(min(THROTTLE_POLL, limit - waited))
+            waited = time.monotonic() - t0
+        return waited
@@ -0,0 +1,86 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""prefix_list_agent warm-start snapshots."""
+
+import os
+import tarfile
+import typing
+
+from .base import PrefixListBase
+
+
+class Snapshot(PrefixListBase):
+    """Compressed archive of the contents of the source directory."""
+
+    def __init__(self, path: str) -> None:
+        """Initialise a Snapshot instance."""
+        PrefixListBase.__init__(self)
+        self.path = path
+
+    @staticmethod
+    def included(name: str) -> bool:
+        """Check whether a file should be included in the snapshot."""
+        return not (name.startswith(".") or name.endswith(".tmp"))
+
+    def save(self, source_dir: str) -> int:
+        """Archive the prefix-list files in 'source_dir'.
+
+        Returns the number of files archived.
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        count = 0
+        try:
+            with tarfile.open(tmp_path, "w:gz") as tar:
+                for root, dirs, files in os.walk(source_dir):
+                    dirs[:] = sorted(d for d in dirs if self.included(d))
+                    for name in sorted(filter(self.included, files)):
+                        path = os.path.join(root, name)
+                        tar.add(path, os.path.relpath(path, source_dir))
+                        count += 1
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self.info(f"Saved {count} prefix-lists to snapshot {self.path}")
+        return count
+
+    def restore(self, source_dir: str) -> typing.List[str]:
+        """Restore prefix-list files that are missing from 'source_dir'.
+
+        Files that already exist are left untouched. Returns the paths of
+        the files restored.
+        """
+        if not os.path.exists(self.path):
+            self.info(f"No snapshot found at {self.path}")
+            return []
+        restored = []
+        root = os.path.realpath(source_dir)
+        with tarfile.open(self.path, "r:gz") as tar:
+            for member in tar:
+                dest = os.path.realpath(os.path.join(root, member.name))
+                if not member.isfile() or not dest.startswith(root + os.sep):
+                    self.warning(f"Skipping snapshot member {member.name}")
+                    continue
+                if os.path.exists(dest):
+                    continue
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                src = tar.extractfile(member)
+                assert src is not None  # noqa: S101
+                with src, open(dest, "wb") as f:
+                    f.write(src.read())
+                restored.append(dest)
+        self.info(f"Restored {len(restored)} prefix-lists from {self.path}")
+        return restored
@@ -0,0 +1,109 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""prefix_list_agent status publication."""
+
+import typing
+
+import eossdk
+
+from .base import PrefixListBase
+
+KEY_MAX_LEN = 512
+VAL_MAX_LEN = 10 * 1024
+
+
+def shard_key(key: str, index: int) -> str:
+    """Get the status key of a value shard."""
+    if index == 0:
+        return key
+    return f"{key}#{index}"
+
+
+class StatusPublisher(PrefixListBase):
+    """Publish agent status key-value-pairs via the agent manager.
+
+    The last published value of each key is cached, so that only keys whose
+    values have changed are written. Values longer than the SDK limit are
+    split across the keys ``<key>``, ``<key>#1``, ``<key>#2``, etc.
+    """
+
+    def __init__(self, agent_mgr: eossdk.AgentMgr) -> None:
+        """Initialise a StatusPublisher instance."""
+        PrefixListBase.__init__(self)
+        self.agent_mgr = agent_mgr
+        self.published: typing.Dict[str, str] = dict()
+        self.shards: typing.Dict[str, int] = dict()
+        self.groups: typing.Dict[str, typing.Set[str]] = dict()
+
+    def get(self, key: str) -> str:
+        """Get the value of a status key."""
+        try:
+            return self.published[key]
+        except KeyError:
+            pass
+        chunks = []
+        index = 0
+        while True:
+            chunk = self.agent_mgr.status(shard_key(key, index))
+            if not chunk:
+                break
+            chunks.append(chunk)
+            index += 1
+        return "".join(chunks)
+
+    def set(self, key: str, val: typing.Optional[str]) -> bool:
+        """Set the value of a status key, if it has changed."""
+        if val is None:
+            return self.delete(key)
+        if self.published.get(key) == val:
+            return False
+        if len(shard_key(key, len(val) // VAL_MAX_LEN)) > KEY_MAX_LEN:
+            raise ValueError(f"status key '{key[:32]}...' is too long")
+        chunks = [val[i:i + VAL_MAX_LEN]
+                  for i in range(0, len(val), VAL_MAX_LEN)] or [val]
+        self.debug(f"setting state '{key}' = '{val[:80]}' "
+                   f"({len(chunks)} shards)")
+        for index, chunk in enumerate(chunks):
+            self.agent_mgr.status_set(shard_key(key, index), chunk)
+        for index in range(len(chunks), self.shards.get(key, 1)):
+            self.agent_mgr.status_del(shard_key(key, index))
+        self.published[key] = val
+        self.shards[key] = len(chunks)
+        return True
+
+    def delete(self, key: str) -> bool:
+        """Delete a status key."""
+        self.debug(f"deleting state key {key}")
+        for index in range(self.shards.pop(key, 1)):
+            self.agent_mgr.status_del(shard_key(key, index))
+        return self.published.pop(key, None) is not None
+
+    def publish(self,
+                group: str,
+                values: typing.Mapping[str, typing.Optional[str]]) -> int:
+        """Publish a group of status keys.
+
+        Keys that were published as part of the group previously, but are
+        missing from ``values``, are deleted.
+
+        Returns the number of keys written or deleted.
+        """
+        changed = 0
+        for key in self.groups.get(group, set()) - set(values):
+            changed += int(self.delete(key))
+        for key, val in values.items():
+            try:
+                changed += int(self.set(key, val))
+            except ValueError as e:
+                self.err(e)
+        self.groups[group] = {k for k, v in values.items() if v is not None}
+        return changed
@@ -29,7 +29,9 @@ Configured = typing.Dict[
 
 Objects = typing.Set[str]
 
-Stats = typing.Dict[str, int]
+StatsVal = typing.Union[int, float]
+
+Stats = typing.Dict[str, StatsVal]
 
 RptkPrefixEntry = typing.Dict[  # prefix
     str,
@@ -38,12 +40,14 @@ RptkPrefixEntry = typing.Dict[  # prefix
 
 RptkPrefixEntries = typing.List[RptkPrefixEntry]
 
+RptkPrefixFamilies = typing.Dict[
+    str,  # afi
+    RptkPrefixEntries,
+]
+
 RptkPrefixes = typing.Dict[
     str,  # object
-    typing.Dict[
-        str,  # afi
-        RptkPrefixEntries,
-    ],
+    RptkPrefixFamilies,
 ]
 
 RptkResult = typing.Union[Policies, RptkPrefixes]
@@ -54,3 +58,27 @@ Data = typing.Dict[
 ]
 
 EapiResponse = typing.Any
+
+RunRecord = typing.Dict[str, typing.Any]
+
+ListRecord = typing.Dict[str, typing.Any]
+
+ListRecords = typing.Dict[
+    str,  # policy/name/afi
+    ListRecord,
+]
+
+WorkerResult = typing.Tuple[
+    Stats,
+    ListRecords,
+    typing.Optional[str],  # negotiated rptk format
+]
+
+PriorityRules = typing.List[
+    typing.Tuple[
+        str,  # pattern
+        int,  # tier
+    ],
+]
+
+RefreshResult = typing.Dict[str, typing.Any]
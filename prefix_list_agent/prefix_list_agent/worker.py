@@ -12,28 +12,78 @@
 """prefix_list_agent worker functions."""
 
 import collections
-import json
+import contextlib
+import fnmatch
+import hashlib
 import multiprocessing
 import multiprocessing.connection
 import os
+import queue
 import re
+import resource
+import shutil
 import signal
+import socket
+import subprocess  # noqa: S404
 import sys
+import threading
 import time
 import typing
 import urllib.error
 import urllib.request
 
-import eossdk
-
 from .base import PrefixListBase
-from .exceptions import TermException, handle_sigterm
-from .types import (Configured, Data, EapiResponse, Objects, Policies,
-                    RptkPrefixEntries, RptkPrefixEntry, RptkPrefixes,
-                    RptkResult, Stats)
+from .bundle import BUNDLE_SUFFIX, Bundle
+from .checkpoint import Checkpoint, file_digest
+from .exceptions import (CancelledException, CeilingExceeded,
+                         DeadlineExceeded, TermException, handle_sigterm)
+from .formats import (DECODERS, DEFAULT_FORMAT, JSON_BACKEND, json_loads,
+                      select)
+from .loaded import Digests, LoadedDigests
+from .manifest import MANIFEST_FILE, Manifest
+from .orphans import OrphanCollector
+from .profiler import Profiler
+from .refresh import parse_refresh_messages
+from .scheduling import IO_CLASSES, Throttle, TokenBucket
+from .snapshot import Snapshot
+from .types import (Configured, Data, EapiResponse, ListRecords, Objects,
+                    Policies, PriorityRules, RefreshResult,
+                    RptkPrefixEntries, RptkPrefixEntry, RptkPrefixFamilies,
+                    RptkPrefixes, RptkResult, Stats, StatsVal, WorkerResult)
+
+if typing.TYPE_CHECKING:
+    import eossdk
 
 PATH_RE = r"^file:{}/(?P<policy>\w+)/(?P<file>[-.:\w]+)$"
 
+CHECKPOINT_FILE = ".checkpoint"
+
+# digests of the prefix-list files last loaded by EOS
+LOADED_FILE = ".loaded"
+
+# directory under 'source_dir' in which downloaded bundles are cached
+BUNDLE_DIR = ".bundles"
+
+# directory under 'source_dir' in which a prebuilt tree is staged
+PREBUILT_DIR = ".prebuilt"
+
+# maximum number of fetched units waiting to be written
+PIPELINE_DEPTH = 2
+
+# interval (in seconds) at which waits on the pipeline queue are interrupted
+QUEUE_POLL_INTERVAL = 0.1
+
+# maximum size of the chunks in which RPTK responses are read
+RESPONSE_CHUNK_SIZE = 1 << 16
+
+# priority tier of prefix-lists not matched by any rule
+DEFAULT_TIER = 5
+
+Unit = typing.Tuple[Configured, Data]
+
+Group = typing.Tuple[int, str, typing.FrozenSet[str],
+                     typing.DefaultDict[str, typing.Dict[str, str]]]
+
 
 class PrefixListWorker(multiprocessing.Process, PrefixListBase):
     """Worker to fetch and process IRR data."""
@@ -42,8 +92,29 @@ class PrefixListWorker(multiprocessing.Process, PrefixListBase):
                  rptk_endpoint: str,
                  source_dir: str,
                  update_delay: typing.Optional[int],
-                 eapi: eossdk.EapiMgr,
+                 eapi: "eossdk.EapiMgr",
                  *args: typing.Any,
+                 profile_mode: typing.Optional[str] = None,
+                 profile_path: typing.Optional[str] = None,
+                 snapshot_file: typing.Optional[str] = None,
+                 checkpoint_age: typing.Optional[int] = None,
+                 priorities: typing.Optional[PriorityRules] = None,
+                 nice: typing.Optional[int] = None,
+                 io_class: typing.Optional[str] = None,
+                 cpus: typing.Optional[typing.Set[int]] = None,
+                 throttle: typing.Optional[Throttle] = None,
+                 orphan_grace: typing.Optional[int] = None,
+                 rptk_timeout: typing.Optional[float] = None,
+                 run_deadline: typing.Optional[int] = None,
+                 max_entries: typing.Optional[int] = None,
+                 max_response_bytes: typing.Optional[int] = None,
+                 entry_budget: typing.Optional[int] = None,
+                 rptk_rate: typing.Optional[float] = None,
+                 rptk_bandwidth: typing.Optional[int] = None,
+                 bundle_url: typing.Optional[str] = None,
+                 prebuilt_url: typing.Optional[str] = None,
+                 rptk_format: typing.Optional[str] = None,
+                 negotiated_format: typing.Optional[str] = None,
                  **kwargs: typing.Any) -> None:
         """Initialise an PrefixListWorker instance."""
         super(PrefixListWorker, self).__init__(*args, **kwargs)
@@ -52,9 +123,50 @@ class PrefixListWorker(multiprocessing.Process, PrefixListBase):
         self.source_dir = source_dir
         self.update_delay = update_delay
         self.eapi = eapi
+        self.profile_mode = profile_mode
+        self.profile_path = profile_path
+        self.active_profiler: typing.Optional[Profiler] = None
+        self.snapshot_file = snapshot_file
+        self.checkpoint_age = checkpoint_age
+        self.priorities = priorities or list()
+        self.nice = nice
+        self.io_class = io_class
+        self.cpus = cpus
+        self.throttle = throttle
+        self.orphan_grace = orphan_grace
+        self.rptk_timeout = rptk_timeout
+        self.run_deadline = run_deadline
+        self.deadline: typing.Optional[float] = None
+        self.max_entries = max_entries
+        self.max_response_bytes = max_response_bytes
+        self.entry_budget = entry_budget
+        self.oversized: typing.Set[typing.Tuple[str, str]] = set()
+        # prefix-lists not fetched before the run deadline
+        self.skipped: Configured = dict()
+        self.request_bucket = (TokenBucket(rptk_rate)
+                               if rptk_rate is not None else None)
+        self.byte_bucket = (TokenBucket(rptk_bandwidth)
+                            if rptk_bandwidth is not None else None)
+        self.bundle_url = bundle_url
+        self.bundles: typing.Dict[str, typing.Optional[Bundle]] = dict()
+        self.prebuilt_url = prebuilt_url
+        self.journal: typing.Optional[Checkpoint] = None
+        self.loaded: Digests = dict()
+        self.rptk_format = DEFAULT_FORMAT
+        # format to use instead of JSON, if the endpoint offers it
+        self.preferred_format = rptk_format or DEFAULT_FORMAT
+        # format negotiated with the endpoint by this or a previous run
+        self.negotiated_format = negotiated_format
+        self.counters: Stats = collections.defaultdict(int)
+        # counters are updated by both the fetcher thread and the main thread
+        self.counters_lock = threading.Lock()
+        self.lists: ListRecords = dict()
+        self.list_keys: typing.Dict[typing.Tuple[str, str], str] = dict()
+        self.fetch_latency: typing.Dict[typing.Tuple[str, str], float] = dict()
         self.path_re = re.compile(PATH_RE.format(self.source_dir.rstrip("/")))
         self._p_err, self._c_err = multiprocessing.Pipe(duplex=False)
         self._p_data, self._c_data = multiprocessing.Pipe(duplex=False)
+        self._c_cancel, self._p_cancel = multiprocessing.Pipe(duplex=False)
 
     @property
     def p_err(self) -> multiprocessing.connection.Connection:
@@ -76,22 +188,56 @@ class PrefixListWorker(multiprocessing.Process, PrefixListBase):
         """Get 'c_data' connection."""
         return self._c_data
 
+    @property
+    def p_cancel(self) -> multiprocessing.connection.Connection:
+        """Get 'p_cancel' connection."""
+        return self._p_cancel
+
+    @property
+    def c_cancel(self) -> multiprocessing.connection.Connection:
+        """Get 'c_cancel' connection."""
+        return self._c_cancel
+
     def run(self) -> None:
         """Run the worker process."""
         self.info("Worker started")
         signal.signal(signal.SIGTERM, handle_sigterm)
+        t0 = time.monotonic()
+        if self.run_deadline is not None:
+            self.deadline = t0 + self.run_deadline
         try:
-            policies = self.get_policies()
-            configured = self.get_configured(policies)
-            data = self.get_data(configured)
-            stats, written_objs = self.write_results(configured, data)
-            self.refresh_all(written_objs)
-            self.c_data.send(stats)
+            self.apply_scheduling()
+            with self.profiler():
+                with self.phase("policies"):
+                    policies = self.get_policies()
+                self.check_cancelled()
+                with self.phase("discovery"):
+                    configured = self.get_configured(policies)
+                self.check_cancelled()
+                if self.prebuilt_url is not None:
+                    stats = self.install(configured)
+                else:
+                    stats = self.pipeline(configured)
+                self.count_refreshed()
+                self.check_budget()
+                self.check_cancelled()
+                with self.phase("gc"):
+                    removed = self.collect_orphans(configured)
+                with self.phase("snapshot"):
+                    self.save_snapshot(changed=bool(stats.get("changed") or
+                                                    removed))
+            self.count("run-time", time.monotonic() - t0)
+            for name, value in self.counters.items():
+                stats[name] = round(value, 3)
+            stats.update(self.resource_usage())
+            self.c_data.send((stats, self.lists, self.negotiated_format))
+        except CancelledException:
+            self.notice("Run cancelled: exiting.")
         except TermException:
             self.notice("Got SIGTERM signal: exiting.")
             if os.getpid() == self.pid:
                 sys.exit(127 + signal.SIGTERM)
-        except Exception as e:
+        except (Exception, DeadlineExceeded) as e:
             self.err(e)
             try:
                 self.c_err.send(e)
@@ -101,6 +247,139 @@ class PrefixListWorker(multiprocessing.Process, PrefixListBase):
             self.c_err.close()
             self.c_data.close()
 
+    @contextlib.contextmanager
+    def phase(self, name: str) -> typing.Iterator[None]:
+        """Measure the duration of a phase of the run."""
+        t0 = time.monotonic()
+        try:
+            yield
+        finally:
+            self.count(f"phase-{name}-time", time.monotonic() - t0)
+
+    def count(self, name: str, value: StatsVal = 1) -> None:
+        """Increment a resource accounting counter."""
+        with self.counters_lock:
+            self.counters[name] += value
+
+    @staticmethod
+    def resource_usage() -> Stats:
+        """Get resource usage of the worker process."""
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        return {"cpu-user": round(usage.ru_utime, 3),
+                "cpu-system": round(usage.ru_stime, 3),
+                "max-rss-kb": usage.ru_maxrss,
+                "ctx-switches-voluntary": usage.ru_nvcsw,
+                "ctx-switches-involuntary": usage.ru_nivcsw}
+
+    def apply_scheduling(self) -> None:
+        """Set the CPU and IO scheduling of the worker process.
+
+        Failures are logged, rather than failing the run.
+        """
+        if self.nice is not None:
+            try:
+                os.setpriority(os.PRIO_PROCESS, 0, self.nice)
+                self.info(f"Set worker nice level to {self.nice}")
+            except OSError as e:
+                self.warning(f"Failed to set worker nice level: {e}")
+        if self.cpus is not None:
+            try:
+                os.sched_setaffinity(0, self.cpus)
+                self.info(f"Set worker CPU affinity to {sorted(self.cpus)}")
+            except OSError as e:
+                self.warning(f"Failed to set worker CPU affinity: {e}")
+        if self.io_class is not None:
+            cmd = ["ionice", "-c", str(IO_CLASSES[self.io_class]),
+                   "-p", str(os.getpid())]
+            try:
+                subprocess.run(cmd, check=True, capture_output=True)  # noqa: S603, S607, E501
+                self.info(f"Set worker IO class to {self.io_class}")
+            except (OSError, subprocess.CalledProcessError) as e:
+                self.warning(f"Failed to set worker IO class: {e}")
+
+    def yield_cpu(self) -> None:
+        """Pause between objects while the control-plane CPU is busy.
+
+        The pause does not extend past the run deadline.
+        """
+        self.check_cancelled()
+        if self.throttle is None:
+            return
+        waited = self.throttle.wait(self.check_cancelled,
+                                    max_wait=self.remaining())
+        if waited:
+            self.count("throttled")
+            self.count("throttled-time", waited)
+
+    def profiler(self) -> typing.ContextManager[typing.Any]:
+        """Get a context manager to profile the run, if enabled."""
+        if self.profile_mode is None or self.profile_path is None:
+            return contextlib.nullcontext()
+        self.active_profiler = Profiler(self.profile_mode, self.profile_path)
+        return self.active_profiler
+
+    def profile_thread(self) -> typing.ContextManager[typing.Any]:
+        """Get a context manager to profile another thread of the run."""
+        if self.active_profiler is None:
+            return contextlib.nullcontext()
+        return self.active_profiler.thread()
+
+    def cancel(self) -> None:
+        """Request cancellation of the current run."""
+        try:
+            self.p_cancel.send(True)
+        except (OSError, ValueError) as e:
+            self.warning(f"Failed to send cancellation request: {e}")
+
+    @property
+    def cancelled(self) -> bool:
+        """Check whether cancellation of the current run has been requested."""
+        try:
+            return self.c_cancel.poll()
+        except (OSError, ValueError):
+            return False
+
+    def check_cancelled(self) -> None:
+        """Raise 'CancelledException' if cancellation has been requested."""
+        if self.cancelled:
+            raise CancelledException
+
+    def pause(self, seconds: float) -> None:
+        """Pause, raising 'CancelledException' if cancellation is requested."""
+        try:
+            self.c_cancel.poll(seconds)
+        except (OSError, ValueError):
+            time.sleep(seconds)
+        self.check_cancelled()
+
+    def remaining(self) -> typing.Optional[float]:
+        """Get the time remaining until the run deadline, if any."""
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    def past_deadline(self) -> bool:
+        """Check whether the run deadline has passed."""
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def check_deadline(self) -> None:
+        """Raise 'DeadlineExceeded' if the run deadline has passed."""
+        if self.past_deadline():
+            raise DeadlineExceeded(f"Run deadline of {self.run_deadline}s "
+                                   "exceeded")
+
+    def request_timeout(self) -> typing.Optional[float]:
+        """Get the timeout for the next request.
+
+        This is the configured request timeout, shortened so that the request
+        cannot run past the run deadline.
+        """
+        self.check_deadline()
+        timeouts = [t for t in (self.rptk_timeout, self.remaining())
+                    if t is not None]
+        return min(timeouts, default=None)
+
     def get_configured(self, policies: Policies) -> Configured:
         """Get the prefix-lists in running-config."""
         configured: Configured = {p: collections.defaultdict(dict)
@@ -136,23 +415,130 @@ class PrefixListWorker(multiprocessing.Process, PrefixListBase):
         cmd = f"refresh {afi} prefix-list"
         if prefix_list is not None:
             cmd += f" {prefix_list}"
+        t0 = time.monotonic()
         messages = self.eapi_request(cmd, result_node="messages",
                                      allow_empty=True)
+        latency = time.monotonic() - t0
         for msg in messages:
             for submsg in msg.replace("\nNum", " -").rstrip().split("\n"):
                 self.info(submsg)
+        self.record_refresh(parse_refresh_messages(messages, afi), latency)
+
+    def record_refresh(self,
+                       results: typing.List[RefreshResult],
+                       latency: float) -> None:
+        """Record the outcome of refreshing prefix-lists.
+
+        Results for prefix-lists not written by this run are ignored. If
+        several prefix-lists were refreshed by a single command, each is
+        recorded with the latency of that command.
+        """
+        for result in results:
+            key = self.list_keys.get((result["name"], result["afi"]))
+            if key is None:
+                continue
+            record = self.lists[key]
+            record["loaded"] = result["loaded"]
+            record["refresh-latency"] = round(latency, 3)
+            record["refresh-error"] = result["error"]
+            record["mismatch"] = (result["loaded"] is not None and
+                                  record["entries"] is not None and
+                                  result["loaded"] != record["entries"])
+
+    def count_refreshed(self) -> None:
+        """Count the outcomes of refreshing the prefix-lists of the run."""
+        for key, record in self.lists.items():
+            if "loaded" not in record:
+                continue
+            self.count("refresh-lists")
+            if record["loaded"] is not None:
+                self.count("refresh-loaded-entries", record["loaded"])
+            if record["refresh-error"] is not None:
+                self.count("refresh-failed")
+                self.warning(f"Failed to load {key}: "
+                             f"{record['refresh-error']}")
+            if record["mismatch"]:
+                self.count("refresh-mismatch")
+                self.warning(f"Loaded {record['loaded']} entries for {key}, "
+                             f"but wrote {record['entries']}")
 
     def refresh_all(self, written_objs: typing.Iterable[str]) -> None:
         """Refresh prefix-lists."""
         self.info("Refreshing source-based prefix-lists")
         for afi in ("ip", "ipv6"):
-            if self.update_delay is None:
+            if self.update_delay is None or self.past_deadline():
                 self.refresh_prefix_list(afi)
             else:
                 for prefix_list in written_objs:
+                    self.check_cancelled()
                     self.refresh_prefix_list(afi, prefix_list)
-                    time.sleep(self.update_delay)
+                    self.pause(self.update_delay)
         self.notice("Prefix-lists refreshed successfully")
+        self.record_loaded(written_objs)
+
+    def record_loaded(self, objs: typing.Iterable[str]) -> None:
+        """Record the digests of the refreshed prefix-lists of 'objs'.
+
+        Prefix-lists that EOS reported failing to load are forgotten, so
+        that they are refreshed again by the next run.
+        """
+        objs = set(objs)
+        for key, record in self.lists.items():
+            if record["name"] not in objs or record["digest"] is None:
+                continue
+            if record.get("refresh-error") is None:
+                self.loaded[key] = record["digest"]
+            else:
+                self.loaded.pop(key, None)
+        try:
+            LoadedDigests(os.path.join(self.source_dir,
+                                       LOADED_FILE)).save(self.loaded)
+        except OSError as e:
+            self.err(f"Failed to save loaded digests: {e}")
+
+    def check_budget(self) -> None:
+        """Count the total entries written, against the 'entry_budget'."""
+        total = sum(record["entries"] for record in self.lists.values()
+                    if record["error"] is None and record["entries"])
+        self.count("total-entries", total)
+        if self.entry_budget is not None and total > self.entry_budget:
+            self.warning(f"Wrote {total} entries in total, exceeding the "
+                         f"budget of {self.entry_budget}")
+            self.count("budget-exceeded")
+
+    def collect_orphans(self, configured: Configured) -> int:
+        """Remove prefix-list files that are no longer configured.
+
+        Returns the number of files removed.
+        """
+        if self.orphan_grace is None:
+            return 0
+        expected = {f"{policy}/{file}"
+                    for policy, objs in configured.items()
+                    for config in objs.values()
+                    for file in config.values()}
+        try:
+            removed, reclaimed = OrphanCollector(
+                self.source_dir, self.orphan_grace,
+            ).collect(expected)
+        except Exception as e:
+            self.err(f"Failed to collect orphaned files: {e}")
+            return 0
+        self.count("gc-removed", removed)
+        self.count("gc-reclaimed-bytes", reclaimed)
+        return removed
+
+    def save_snapshot(self, changed: bool) -> None:
+        """Save a snapshot of the source directory, if it has changed."""
+        if self.snapshot_file is None:
+            return
+        if not changed and os.path.exists(self.snapshot_file):
+            self.debug("Prefix-lists unchanged: not saving snapshot")
+            return
+        try:
+            Snapshot(self.snapshot_file).save(self.source_dir)
+        except Exception as e:
+            self.err(f"Failed to save snapshot: {e}")
 
     def get_policies(self) -> Policies:
         """Get the list of valid policy names from RPTK."""
@@ -162,47 +548,661 @@ class PrefixListWorker(multiprocessing.Process, PrefixListBase):
         self.debug(f"Got policies: {policies.keys()}")
         return typing.cast(Policies, policies)
 
-    def get_data(self, configured: Configured) -> Data:
-        """Get IRR data for the configured prefix-list objects."""
-        data = dict()
-        self.info("Querying for IRR data")
+    def pipeline(self, configured: Configured) -> Stats:
+        """Fetch, write and refresh prefix-lists as a pipeline.
+
+        IRR data is fetched in a separate thread, one policy (or object, if
+        the bulk query fails) at a time. Each unit of data is written as soon
+        as it arrives, while the next fetch is in flight.
+
+        Units are fetched in order of priority tier, and the prefix-lists of
+        a tier are refreshed together once all of its units are written, so
+        that a run without priority tiers refreshes each address family
+        once. The time taken to update each tier is counted as
+        'tier-<n>-time'.
+
+        Prefix-lists completed by an interrupted run are skipped, and are
+        refreshed with the first batch of the same or a later tier. The
+        checkpoint journal is cleared once all prefix-lists are done, and is
+        kept if the run deadline skipped any, for the next run to resume.
+        """
+        t0 = time.monotonic()
+        self.loaded = LoadedDigests(os.path.join(self.source_dir,
+                                                 LOADED_FILE)).load()
+        configured, stats, resumed = self.resume(configured)
+        units: "queue.Queue[typing.Union[Unit, BaseException, None]]" = \
+            queue.Queue(maxsize=PIPELINE_DEPTH)
+        stop = threading.Event()
+        fetcher = threading.Thread(target=self.fetch,
+                                   args=(configured, units, stop),
+                                   name="fetcher", daemon=True)
+        fetcher.start()
+        try:
+            done = False
+            pending: typing.Optional[Unit] = None
+            while not done:
+                written_objs, tier, pending, done = \
+                    self.write_batch(units, pending, stats)
+                self.check_cancelled()
+                for resumed_tier in sorted(resumed):
+                    if done or (tier is not None and resumed_tier <= tier):
+                        written_objs |= resumed.pop(resumed_tier)
+                if written_objs:
+                    with self.phase("refresh"):
+                        self.refresh_all(written_objs)
+                if tier is not None:
+                    with self.counters_lock:
+                        self.counters[f"tier-{tier}-time"] = \
+                            time.monotonic() - t0
+        finally:
+            stop.set()
+        fetcher.join()
+        self.record_skipped(stats)
+        if self.journal is not None and not self.skipped:
+            self.journal.clear()
+        return stats
+
+    def render(self, configured: Configured) -> Stats:
+        """Fetch and write prefix-lists, without refreshing them.
+
+        This is the off-box counterpart of 'pipeline', which needs neither EOS
+        SDK nor eAPI.
+        """
+        stats: Stats = {"succeeded": 0, "failed": 0, "changed": 0}
+        with self.phase("fetch"):
+            for unit in self.iter_data(configured):
+                with self.phase("write"):
+                    unit_stats, _ = self.write_results(*unit)
+                for name, value in unit_stats.items():
+                    stats[name] += value
+        self.record_skipped(stats)
+        self.check_budget()
+        return stats
+
+    def install(self, configured: Configured) -> Stats:
+        """Install and refresh prefix-lists rendered off-box.
+
+        The manifest and the configured prefix-list files are downloaded from
+        'prebuilt_url' into a staging directory, and are only moved into
+        'source_dir' once every downloaded file has been verified against the
+        manifest. Otherwise, the run fails and 'source_dir' is left as it was.
+
+        Prefix-lists missing from the manifest are counted as failed, and
+        their existing files are kept.
+        """
+        stats: Stats = {"succeeded": 0, "failed": 0, "changed": 0}
+        self.loaded = LoadedDigests(os.path.join(self.source_dir,
+                                                 LOADED_FILE)).load()
+        staging = os.path.join(self.source_dir, PREBUILT_DIR)
+        shutil.rmtree(staging, ignore_errors=True)
+        try:
+            with self.phase("fetch"):
+                targets = self.stage_prebuilt(configured, staging, stats)
+            invalid = Manifest(staging).verify(files=targets)
+            if invalid:
+                self.count("prebuilt-invalid", len(invalid))
+                raise ValueError(f"{len(invalid)} prebuilt files do not "
+                                 "match the manifest")
+            with self.phase("write"):
+                written_objs = self.install_prebuilt(targets, staging, stats)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        if written_objs:
+            with self.phase("refresh"):
+                self.refresh_all(written_objs)
+        return stats
+
+    def stage_prebuilt(self,
+                       configured: Configured,
+                       staging: str,
+                       stats: Stats) -> typing.Dict[str, typing.Dict[str, typing.Any]]:  # noqa: E501
+        """Download the configured prefix-lists of a prebuilt tree.
+
+        Returns the manifest entries of the downloaded files, keyed by their
+        path relative to 'staging', with the object and afi they are for.
+        """
+        self.fetch_prebuilt(MANIFEST_FILE, staging)
+        files = Manifest(staging).load()["files"]
+        targets = dict()
         for policy, objs in configured.items():
-            if not objs:
-                continue
-            self.info("Trying bulk query")
+            for obj, config in objs.items():
+                for afi, file in config.items():
+                    self.check_cancelled()
+                    path = f"{policy}/{file}"
+                    if path not in files:
+                        self.warning(f"{path} is missing from the manifest")
+                        self.count("prebuilt-missing")
+                        stats["failed"] += 1
+                        self.record_list(policy, obj, afi, file,
+                                         error="missing from manifest")
+                        continue
+                    self.fetch_prebuilt(path, staging)
+                    targets[path] = dict(files[path], policy=policy,
+                                         obj=obj, afi=afi, file=file)
+        return targets
+
+    def fetch_prebuilt(self, path: str, staging: str) -> None:
+        """Download a file of a prebuilt tree into 'staging'."""
+        url = "{}/{}".format(str(self.prebuilt_url).rstrip("/"), path)
+        self.info(f"Fetching {url}")
+        self.rate_limit(self.request_bucket, 1)
+        resp = urllib.request.urlopen(url,  # noqa: S310
+                                      timeout=self.request_timeout())
+        body = self.read_response(resp)
+        self.count("prebuilt-bytes", len(body))
+        dest = os.path.join(staging, path)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        with open(dest, "wb") as f:
+            f.write(body)
+
+    def install_prebuilt(self,
+                         targets: typing.Dict[str, typing.Dict[str, typing.Any]],  # noqa: E501
+                         staging: str,
+                         stats: Stats) -> Objects:
+        """Move verified prefix-list files from 'staging' into 'source_dir'.
+
+        Returns the objects whose prefix-lists need refreshing.
+        """
+        written_objs: Objects = set()
+        for path, target in targets.items():
+            dest = os.path.join(self.source_dir, path)
+            changed = file_digest(dest) != target["digest"]
+            if changed:
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                os.replace(os.path.join(staging, path), dest)
+            key = f"{target['policy']}/{target['obj']}/{target['afi']}"
+            if changed or self.loaded.get(key) != target["digest"]:
+                written_objs.add(target["obj"])
+            stats["succeeded"] += 1
+            stats["changed"] += int(changed)
+            self.record_list(target["policy"], target["obj"], target["afi"],
+                             target["file"], entries=target["entries"],
+                             digest=target["digest"], changed=changed)
+        return written_objs
+
+    def write_batch(self,
+                    units: "queue.Queue[typing.Union[Unit, BaseException, None]]",  # noqa: E501
+                    pending: typing.Optional[Unit],
+                    stats: Stats) -> typing.Tuple[Objects,
+                                                  typing.Optional[int],
+                                                  typing.Optional[Unit],
+                                                  bool]:
+        """Write the units of a priority tier.
+
+        The batch starts with the 'pending' unit, if any, and continues until
+        a unit of another tier arrives, or the last unit has been written.
+        'stats' is updated in place.
+
+        Returns the written objects, the tier of the batch, the first unit of
+        the next batch, and whether the last unit has been written.
+        """
+        written_objs: Objects = set()
+        tier: typing.Optional[int] = None
+        unit = pending if pending is not None else self.next_unit(units)
+        while True:
+            if unit is None:
+                return written_objs, tier, None, True
+            if isinstance(unit, BaseException):
+                raise unit
+            unit_tier = self.unit_tier(unit[0])
+            if tier is not None and unit_tier != tier:
+                return written_objs, tier, unit, False
+            tier = unit_tier
+            self.check_cancelled()
+            with self.phase("write"):
+                unit_stats, unit_objs = self.write_results(*unit)
+            for name, value in unit_stats.items():
+                stats[name] += value
+            written_objs |= unit_objs
+            unit = self.next_unit(units)
+
+    def next_unit(self,
+                  units: "queue.Queue[typing.Union[Unit, BaseException, None]]",  # noqa: E501
+                  ) -> typing.Union[Unit, BaseException, None]:
+        """Wait for the next item in 'units', checking for cancellation."""
+        while True:
             try:
-                result = self.get_data_bulk(policy, objs)
-                data.update({policy: result})
-                continue
-            except Exception as e:
-                self.err(e)
-            self.info("Failing back to indiviual queries")
-            data[policy] = dict()
-            for obj in objs:
+                return units.get(timeout=QUEUE_POLL_INTERVAL)
+            except queue.Empty:
+                self.check_cancelled()
+
+    def resume(self,
+               configured: Configured) -> typing.Tuple[Configured, Stats,
+                                                       typing.Dict[int,
+                                                                   Objects]]:
+        """Skip the prefix-lists completed by an interrupted run.
+
+        An object is skipped if all of its prefix-list files are recorded in
+        the checkpoint journal, and are unchanged since they were written.
+        The journal is only used if it was written by a run against the same
+        RPTK endpoint, for the same address families.
+
+        Returns the remaining prefix-lists, the statistics for the skipped
+        prefix-lists, and the skipped objects, keyed by priority tier.
+        """
+        stats: Stats = {"succeeded": 0, "failed": 0, "changed": 0}
+        resumed: typing.Dict[int, Objects] = dict()
+        if not self.checkpoint_age:
+            self.journal = None
+            return configured, stats, resumed
+        self.journal = Checkpoint(self.checkpoint_path(), self.checkpoint_age,
+                                  header=self.checkpoint_header(configured))
+        done = self.journal.load()
+        if not done:
+            return configured, stats, resumed
+        remaining: Configured = dict()
+        for policy, objs in configured.items():
+            remaining[policy] = collections.defaultdict(dict)
+            for obj, config in objs.items():
+                records = {afi: done.get(f"{policy}/{obj}/{afi}")
+                           for afi in config}
+                if not all(self.is_complete(policy, file, records[afi])
+                           for afi, file in config.items()):
+                    remaining[policy][obj] = config
+                    continue
+                for afi, file in config.items():
+                    record = typing.cast(typing.Dict[str, typing.Any],
+                                         records[afi])
+                    self.record_list(policy, obj, afi, file,
+                                     entries=record["entries"],
+                                     digest=record["digest"],
+                                     changed=record["changed"])
+                    stats["succeeded"] += 1
+                    stats["changed"] += int(record["changed"])
+                resumed.setdefault(self.tier(policy, obj), set()).add(obj)
+        self.count("resumed", stats["succeeded"])
+        self.notice(f"Resuming run: skipping {stats['succeeded']} "
+                    "prefix-lists completed by a previous run")
+        return remaining, stats, resumed
+
+    def checkpoint_path(self) -> str:
+        """Get the path of the checkpoint journal."""
+        return os.path.join(self.source_dir, CHECKPOINT_FILE)
+
+    def checkpoint_header(self,
+                          configured: Configured) -> typing.Dict[str,
+                                                                 typing.Any]:
+        """Describe the run for the checkpoint journal header."""
+        afis = sorted({afi for objs in configured.values()
+                       for config in objs.values() for afi in config})
+        return {"endpoint": self.rptk_endpoint, "afis": afis}
+
+    def clear_checkpoint(self) -> None:
+        """Discard the checkpoint journal of an interrupted run."""
+        self.info("Clearing checkpoint journal")
+        Checkpoint(self.checkpoint_path(), 0).clear()
+
+    def is_complete(self,
+                    policy: str,
+                    file: str,
+                    record: typing.Optional[typing.Dict[str, typing.Any]]) -> bool:  # noqa: E501
+        """Check whether a checkpoint record matches a prefix-list file."""
+        if record is None or record.get("file") != file:
+            return False
+        path = os.path.join(self.source_dir, policy, file)
+        return bool(file_digest(path) == record.get("digest"))
+
+    def fetch(self,
+              configured: Configured,
+              units: "queue.Queue[typing.Union[Unit, BaseException, None]]",
+              stop: threading.Event) -> None:
+        """Feed units of IRR data into the 'units' queue."""
+        def put(item: typing.Union[Unit, BaseException, None]) -> bool:
+            while not stop.is_set():
                 try:
-                    result = self.get_data_obj(policy, obj)
-                except Exception as e:
-                    self.err(e)
+                    units.put(item, timeout=QUEUE_POLL_INTERVAL)
+                    return True
+                except queue.Full:
                     continue
-                data[policy].update(result)
+            return False
+        try:
+            with self.profile_thread(), self.phase("fetch"):
+                for unit in self.iter_data(configured):
+                    if not put(unit):
+                        return
+        except BaseException as e:  # noqa: B036
+            # re-raised by the consumer
+            put(e)
+        else:
+            put(None)
+
+    def get_data(self, configured: Configured) -> Data:
+        """Get IRR data for the configured prefix-list objects."""
+        data: Data = dict()
+        for _, unit_data in self.iter_data(configured):
+            for policy, result in unit_data.items():
+                data.setdefault(policy, dict()).update(result)
         return data
 
+    def iter_data(self, configured: Configured) -> typing.Iterator[Unit]:
+        """Get IRR data for the configured prefix-list objects.
+
+        Data is yielded per policy, or per object if the bulk query for a
+        policy fails, together with the prefix-lists that it is for. Higher
+        priority tiers are yielded first.
+
+        If the run deadline passes, the objects not yet fetched are skipped
+        and counted, so that the data already fetched is still written. The
+        skipped prefix-lists are kept in 'skipped'.
+        """
+        fetched: typing.Set[typing.Tuple[str, str]] = set()
+        try:
+            self.rptk_format = self.negotiate_format()
+            self.info("Querying for IRR data")
+            for _, policy, afis, objs in self.group_by_tier(configured):
+                for unit in self.iter_data_group(policy, objs, afis):
+                    fetched.update((policy, obj)
+                                   for obj in unit[0].get(policy, ()))
+                    yield unit
+        except DeadlineExceeded as e:
+            for policy, objs in configured.items():
+                for obj, config in objs.items():
+                    if (policy, obj) not in fetched:
+                        self.skipped.setdefault(
+                            policy, collections.defaultdict(dict),
+                        )[obj] = config
+            skipped = sum(len(objs) for objs in self.skipped.values())
+            self.warning(f"{e}: skipping {skipped} objects")
+            self.count("deadline-exceeded")
+            self.count("deadline-skipped", skipped)
+        finally:
+            self.close_bundles()
+
+    def tier(self, policy: str, obj: str) -> int:
+        """Get the priority tier of an object's prefix-lists.
+
+        Rules are tried in order, and match either the policy name or
+        '<policy>/<object>'.
+        """
+        for pattern, tier in self.priorities:
+            if "/" not in pattern:
+                subject = policy
+            else:
+                subject = f"{policy}/{obj}"
+            if fnmatch.fnmatchcase(subject, pattern):
+                return tier
+        return DEFAULT_TIER
+
+    def unit_tier(self, configured: Configured) -> int:
+        """Get the priority tier of a unit of prefix-lists."""
+        return min((self.tier(policy, obj)
+                    for policy, objs in configured.items() for obj in objs),
+                   default=DEFAULT_TIER)
+
+    def group_by_tier(self, configured: Configured) -> typing.List[Group]:
+        """Group configured objects by priority tier, policy and AFIs.
+
+        Groups are returned in order of tier, lowest first.
+        """
+        groups: typing.List[Group] = list()
+        for policy, policy_objs in configured.items():
+            tiers: typing.Dict[int,
+                               typing.DefaultDict[str,
+                                                  typing.Dict[str, str]]]
+            tiers = dict()
+            for obj, config in policy_objs.items():
+                tier_objs = tiers.setdefault(self.tier(policy, obj),
+                                             collections.defaultdict(dict))
+                tier_objs[obj] = config
+            for tier, tier_objs in tiers.items():
+                for afis, objs in self.group_by_afi(tier_objs).items():
+                    groups.append((tier, policy, afis, objs))
+        groups.sort(key=lambda group: group[0])
+        return groups
+
+    def iter_data_group(self,
+                        policy: str,
+                        objs: typing.DefaultDict[str, typing.Dict[str, str]],
+                        afis: typing.FrozenSet[str]) -> typing.Iterator[Unit]:
+        """Get IRR data for a group of objects configured for 'afis'.
+
+        If 'bundle_url' is set, the objects are first looked up in the bundle
+        for the policy, and only those missing from it are queried.
+        """
+        self.yield_cpu()
+        if self.bundle_url is not None:
+            bundled, result, objs = self.get_data_bundle(policy, objs)
+            if bundled:
+                yield {policy: bundled}, {policy: result}
+        if objs:
+            yield from self.iter_data_rptk(policy, objs, afis)
+
+    def iter_data_rptk(self,
+                       policy: str,
+                       objs: typing.DefaultDict[str, typing.Dict[str, str]],
+                       afis: typing.FrozenSet[str]) -> typing.Iterator[Unit]:
+        """Query RPTK for a group of objects configured for 'afis'."""
+        afi = next(iter(afis)) if len(afis) == 1 else None
+        if afi is not None:
+            self.count("afi-filtered", len(objs))
+        self.info("Trying bulk query")
+        t0 = time.monotonic()
+        try:
+            result = self.get_data_bulk(policy, objs, afi=afi)
+            latency = time.monotonic() - t0
+            self.fetch_latency.update({(policy, obj): latency
+                                       for obj in objs})
+            yield {policy: objs}, {policy: self.filter_afis(result, afis)}
+            return
+        except Exception as e:
+            self.err(e)
+        self.info("Failing back to indiviual queries")
+        for obj in objs:
+            self.yield_cpu()
+            t0 = time.monotonic()
+            try:
+                result = self.get_data_obj(policy, obj, afi=afi)
+                self.fetch_latency[(policy, obj)] = time.monotonic() - t0
+            except CeilingExceeded as e:
+                self.warning(f"Skipping {obj}/{policy}: {e}")
+                self.oversized.add((policy, obj))
+                result = dict()
+            except Exception as e:
+                self.err(e)
+                result = dict()
+            obj_config = collections.defaultdict(dict, {obj: objs[obj]})
+            yield {policy: obj_config}, {policy: self.filter_afis(result,
+                                                                  afis)}
+
+    @staticmethod
+    def group_by_afi(
+        objs: typing.DefaultDict[str, typing.Dict[str, str]],
+    ) -> typing.Dict[typing.FrozenSet[str],
+                     typing.DefaultDict[str, typing.Dict[str, str]]]:
+        """Group configured objects by the set of AFIs they are used for."""
+        groups: typing.Dict[typing.FrozenSet[str],
+                            typing.DefaultDict[str, typing.Dict[str, str]]]
+        groups = dict()
+        for obj, config in objs.items():
+            group = groups.setdefault(frozenset(config),
+                                      collections.defaultdict(dict))
+            group[obj] = config
+        return groups
+
+    def filter_afis(self,
+                    result: RptkPrefixes,
+                    afis: typing.FrozenSet[str]) -> RptkPrefixes:
+        """Drop data for AFIs that are not configured.
+
+        This is only needed if the RPTK endpoint ignored the 'afi' query
+        parameter, in which case the number of unused entries is counted.
+        """
+        for obj, obj_data in result.items():
+            unused = set(obj_data) - afis
+            if unused:
+                self.count("afi-unused-entries",
+                           sum(len(obj_data[afi]) for afi in unused))
+                result[obj] = {afi: obj_data[afi] for afi in afis
+                               if afi in obj_data}
+        return result
+
+    def negotiate_format(self) -> str:
+        """Select the RPTK response format to use for prefix data.
+
+        JSON is used unless another format is preferred. The endpoint is
+        only asked for its formats if no format has been negotiated yet. A
+        failure to negotiate is not remembered, so that the next run tries
+        again.
+        """
+        if self.negotiated_format is not None:
+            return self.negotiated_format
+        if self.preferred_format == DEFAULT_FORMAT:
+            return DEFAULT_FORMAT
+        try:
+            offered = self.rptk_request("/formats")
+        except Exception as e:
+            self.warning(f"Failed to get RPTK formats: {e}")
+            return DEFAULT_FORMAT
+        rptk_format = select(offered, self.preferred_format)
+        self.info(f"Using RPTK response format '{rptk_format}'")
+        self.negotiated_format = rptk_format
+        return rptk_format
+
+    def get_data_bundle(
+        self,
+        policy: str,
+        objs: typing.DefaultDict[str, typing.Dict[str, str]],
+    ) -> typing.Tuple[typing.DefaultDict[str, typing.Dict[str, str]],
+                      RptkPrefixes,
+                      typing.DefaultDict[str, typing.Dict[str, str]]]:
+        """Get IRR data for 'objs' from the bundle for 'policy'.
+
+        Only the members for the configured objects are read from the
+        bundle. An object is only taken from the bundle if it has data for
+        all of its configured AFIs. Returns the objects found, their data for
+        the configured AFIs, and the objects that must still be queried from
+        RPTK.
+        """
+        if policy not in self.bundles:
+            self.bundles[policy] = self.fetch_bundle(policy)
+        bundle = self.bundles[policy]
+        if bundle is None:
+            return collections.defaultdict(dict), dict(), objs
+        bundled: typing.DefaultDict[str, typing.Dict[str, str]]
+        bundled = collections.defaultdict(dict)
+        remaining: typing.DefaultDict[str, typing.Dict[str, str]]
+        remaining = collections.defaultdict(dict)
+        result: RptkPrefixes = dict()
+        t0 = time.monotonic()
+        for obj, config in objs.items():
+            entries = self.read_bundle(bundle, obj)
+            if entries is None or not all(afi in entries for afi in config):
+                remaining[obj] = config
+                continue
+            bundled[obj] = config
+            result[obj] = {afi: entries[afi] for afi in config}
+        latency = time.monotonic() - t0
+        self.fetch_latency.update({(policy, obj): latency
+                                   for obj in bundled})
+        self.count("bundle-objects", len(bundled))
+        self.count("bundle-missing", len(remaining))
+        if remaining:
+            self.info(f"{len(remaining)} objects of {policy} not in bundle")
+        return bundled, result, remaining
+
+    def read_bundle(self,
+                    bundle: Bundle,
+                    obj: str) -> typing.Optional[RptkPrefixFamilies]:
+        """Read the member for 'obj' from a bundle, if it has one."""
+        try:
+            return bundle.get(obj)
+        except Exception as e:
+            self.err(f"Failed to read {obj} from bundle: {e}")
+            return None
+
+    def fetch_bundle(self, policy: str) -> typing.Optional[Bundle]:
+        """Fetch the pre-resolved IRR data bundle for 'policy'.
+
+        The bundle is cached under 'source_dir', and revalidated using its
+        HTTP entity tag, so that it is only downloaded when its version has
+        changed. Failures are logged, and 'None' returned, so that the
+        objects are queried from RPTK instead.
+        """
+        cache_dir = os.path.join(self.source_dir, BUNDLE_DIR)
+        path = os.path.join(cache_dir, f"{policy}{BUNDLE_SUFFIX}")
+        etag_path = f"{path}.etag"
+        url = "{}/{}{}".format(str(self.bundle_url).rstrip("/"),
+                               policy, BUNDLE_SUFFIX)
+        headers = dict()
+        if os.path.exists(path) and os.path.exists(etag_path):
+            with open(etag_path) as f:
+                headers["If-None-Match"] = f.read().strip()
+        self.info(f"Fetching IRR data bundle from {url}")
+        self.rate_limit(self.request_bucket, 1)
+        timeout = self.request_timeout()
+        t0 = time.monotonic()
+        try:
+            req = urllib.request.Request(url, headers=headers)  # noqa: S310
+            resp = urllib.request.urlopen(req, timeout=timeout)  # noqa: S310
+            body = self.read_response(resp)
+            etag = resp.headers.get("ETag")
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(body)
+            Bundle(tmp_path).close()
+            os.replace(tmp_path, path)
+            if etag:
+                with open(etag_path, "w") as f:
+                    f.write(etag)
+            elif os.path.exists(etag_path):
+                os.remove(etag_path)
+            self.count("bundle-bytes", len(body))
+        except urllib.error.HTTPError as e:
+            if e.code != 304:
+                self.warning(f"Failed to fetch bundle for {policy}: "
+                             f"{e.code} {e.reason}")
+                self.count("bundle-failures")
+                return None
+            self.info(f"Bundle for {policy} unchanged")
+            self.count("bundle-unchanged")
+        except Exception as e:
+            self.warning(f"Failed to fetch bundle for {policy}: {e}")
+            self.count("bundle-failures")
+            return None
+        finally:
+            self.count("bundle-requests")
+            self.count("bundle-time", time.monotonic() - t0)
+        try:
+            bundle = Bundle(path)
+        except Exception as e:
+            self.warning(f"Failed to open bundle for {policy}: {e}")
+            self.count("bundle-failures")
+            return None
+        self.info(f"Using bundle version {bundle.version} for {policy}")
+        return bundle
+
+    def close_bundles(self) -> None:
+        """Close the bundles opened during the run."""
+        for bundle in self.bundles.values():
+            if bundle is not None:
+                bundle.close()
+        self.bundles.clear()
+
     def get_data_bulk(self,
                       policy: str,
-                      objs: typing.Iterable[str]) -> RptkPrefixes:
+                      objs: typing.Iterable[str],
+                      afi: typing.Optional[str] = None) -> RptkPrefixes:
         """Get IRR data in bulk."""
-        url_path = f"/json/query?policy={policy}&" + \
+        url_path = f"/{self.rptk_format}/query?policy={policy}&" + \
                    "&".join([f"objects={obj}" for obj in objs])
+        if afi is not None:
+            url_path += f"&afi={afi}"
         self.info(f"Trying to get prefix data from {url_path}")
-        result = self.rptk_request(url_path)
+        result = self.rptk_request(url_path, self.rptk_format)
         self.debug("Got prefix data")
         return typing.cast(RptkPrefixes, result)
 
-    def get_data_obj(self, policy: str, obj: str) -> RptkPrefixes:
+    def get_data_obj(self,
+                     policy: str,
+                     obj: str,
+                     afi: typing.Optional[str] = None) -> RptkPrefixes:
         """Get IRR data for a single object."""
-        url_path = f"/json/{obj}/{policy}"
+        url_path = f"/{self.rptk_format}/{obj}/{policy}"
+        if afi is not None:
+            url_path += f"?afi={afi}"
         self.info(f"Trying to get prefix data from {url_path}")
-        result = self.rptk_request(url_path)
+        result = self.rptk_request(url_path, self.rptk_format)
         self.debug("Got prefix data")
         return typing.cast(RptkPrefixes, result)
 
@@ -210,7 +1210,7 @@ class PrefixListWorker(multiprocessing.Process, PrefixListBase):
                       configured: Configured,
                       data: Data) -> typing.Tuple[Stats, Objects]:
         """Write prefix-list data to files."""
-        stats = {"succeeded": 0, "failed": 0}
+        stats: Stats = {"succeeded": 0, "failed": 0, "changed": 0}
         written_objs = set()
         for policy, objs in configured.items():
             self.info(f"Writing files for policy {policy}")
@@ -222,36 +1222,180 @@ class PrefixListWorker(multiprocessing.Process, PrefixListBase):
                 self.info(f"Creating directory {policy_dir}")
                 os.makedirs(policy_dir)
             for obj, config in objs.items():
+                self.yield_cpu()
                 self.info(f"Trying to write files for {obj}/{policy}")
-                if obj in data[policy]:
-                    for afi, file in config.items():
-                        path = os.path.join(policy_dir, file)
-                        entries = data[policy][obj][afi]
-                        try:
-                            self.write_prefix_list(path, entries, afi)
-                        except Exception:  # pragma: no cover
-                            stats["failed"] += 1
-                            continue
-                        stats["succeeded"] += 1
+                obj_data = data.get(policy, {}).get(obj, {})
+                for afi, file in config.items():
+                    # only changed or unloaded prefix-lists need refreshing
+                    if self.write_list(policy, obj, afi, file,
+                                       obj_data.get(afi), stats):
                         written_objs.add(obj)
-                else:
-                    self.warning(f"No prefix data for {obj}/{policy}")
-                    stats["failed"] += len(config)
         return stats, written_objs
 
+    def write_list(self,
+                   policy: str,
+                   obj: str,
+                   afi: str,
+                   file: str,
+                   entries: typing.Optional[RptkPrefixEntries],
+                   stats: Stats) -> bool:
+        """Write a prefix-list file, updating 'stats' with the outcome.
+
+        Returns whether the prefix-list needs refreshing: that is, whether
+        the contents of the file changed, or differ from those that EOS last
+        loaded successfully.
+        """
+        if (policy, obj) in self.oversized:
+            stats["failed"] += 1
+            self.count("ceiling-exceeded")
+            self.record_list(policy, obj, afi, file,
+                             error="response ceiling exceeded")
+            return False
+        if entries is None:
+            self.warning(f"No {afi} prefix data for {obj}/{policy}")
+            stats["failed"] += 1
+            self.record_list(policy, obj, afi, file, error="no prefix data")
+            return False
+        path = os.path.join(self.source_dir, policy, file)
+        try:
+            entries = self.normalise_entries(entries, afi)
+        except ValueError:
+            stats["failed"] += 1
+            self.count("invalid-entries")
+            self.record_list(policy, obj, afi, file, error="invalid entries")
+            return False
+        if self.max_entries is not None and len(entries) > self.max_entries:
+            self.warning(f"{afi} prefix data for {obj}/{policy} has "
+                         f"{len(entries)} entries, exceeding the ceiling of "
+                         f"{self.max_entries}: keeping the existing file")
+            stats["failed"] += 1
+            self.count("ceiling-exceeded")
+            self.record_list(policy, obj, afi, file,
+                             error="entry ceiling exceeded")
+            return False
+        try:
+            changed, digest = self.write_prefix_list(path, entries, afi)
+        except Exception:  # pragma: no cover
+            stats["failed"] += 1
+            self.record_list(policy, obj, afi, file, error="write failed")
+            return False
+        stats["succeeded"] += 1
+        stats["changed"] += int(changed)
+        if self.journal is not None:
+            self.journal.record(f"{policy}/{obj}/{afi}", file=file,
+                                digest=digest, entries=len(entries),
+                                changed=changed)
+        self.record_list(policy, obj, afi, file, entries=len(entries),
+                         digest=digest, changed=changed)
+        return changed or self.loaded.get(f"{policy}/{obj}/{afi}") != digest
+
+    def record_skipped(self, stats: Stats) -> None:
+        """Record the prefix-lists skipped at the run deadline as failed."""
+        for policy, objs in self.skipped.items():
+            for obj, config in objs.items():
+                for afi, file in config.items():
+                    stats["failed"] += 1
+                    self.record_list(policy, obj, afi, file,
+                                     error="deadline exceeded")
+
+    def record_list(self,
+                    policy: str,
+                    name: str,
+                    afi: str,
+                    file: str,
+                    entries: typing.Optional[int] = None,
+                    digest: typing.Optional[str] = None,
+                    changed: bool = False,
+                    error: typing.Optional[str] = None) -> None:
+        """Record the outcome of updating a prefix-list."""
+        key = f"{policy}/{name}/{afi}"
+        self.list_keys[(name, afi)] = key
+        self.lists[key] = {
+            "policy": policy,
+            "name": name,
+            "afi": afi,
+            "file": file,
+            "entries": entries,
+            "digest": digest,
+            "changed": changed,
+            "latency": self.fetch_latency.get((policy, name)),
+            "tier": self.tier(policy, name),
+            "error": error,
+        }
+
+    def normalise_entries(self,
+                          entries: RptkPrefixEntries,
+                          afi: str) -> RptkPrefixEntries:
+        """Sort prefix entries into a canonical order, removing duplicates.
+
+        Entries are ordered by network address, prefix length and then
+        'ge' and 'le' bounds, so that the rendered prefix-list depends only on
+        the set of entries received, and not on their order.
+
+        Raises 'ValueError' if any entry is not a valid prefix of 'afi'.
+        """
+        family = socket.AF_INET6 if afi == "ipv6" else socket.AF_INET
+        # packed sort keys are much cheaper to compare than tuples
+        keyed: typing.Dict[bytes, RptkPrefixEntry] = dict()
+        for entry in entries:
+            try:
+                prefix = typing.cast(str, entry["prefix"])
+                address, _, length = prefix.partition("/")
+                if entry["exact"]:
+                    bounds = b"\0\0"
+                else:
+                    bounds = bytes((
+                        typing.cast(int, entry.get("greater-equal", -1)) + 1,
+                        typing.cast(int, entry.get("less-equal", -1)) + 1,
+                    ))
+                key = (socket.inet_pton(family, address) +
+                       bytes((int(length),)) + bounds)
+            except (KeyError, OSError, ValueError) as e:
+                self.err(f"Invalid {afi} prefix entry {entry}: {e}")
+                raise ValueError(f"Invalid {afi} prefix entry") from e
+            keyed.setdefault(key, entry)
+        duplicates = len(entries) - len(keyed)
+        if duplicates:
+            self.debug(f"Removed {duplicates} duplicate entries")
+            self.count("duplicate-entries", duplicates)
+        return [keyed[key] for key in sorted(keyed)]
+
     def write_prefix_list(self,
                           path: str,
                           entries: RptkPrefixEntries,
-                          afi: str) -> None:
-        """Write prefix-list to file."""
+                          afi: str) -> typing.Tuple[bool, str]:
+        """Write prefix-list to file.
+
+        The prefix-list is rendered in memory, and is only written if it
+        differs from the contents of ``path``. The data is written to a
+        temporary file which then replaces ``path``, so that an interrupted
+        write never leaves a partial prefix-list behind.
+
+        Returns whether the contents of ``path`` changed, and the SHA-256
+        digest of the rendered prefix-list.
+        """
         self.info(f"Trying to write {path}")
+        data = "".join(self.prefix_list_line(i, p)
+                       for i, p in enumerate(entries)).encode()
+        digest = hashlib.sha256(data).hexdigest()
+        if file_digest(path) == digest:
+            self.debug(f"{path} is unchanged")
+            return False, digest
+        tmp_path = f"{path}.tmp"
         try:
-            with open(path, "w") as f:
-                for i, p in enumerate(entries):
-                    f.write(self.prefix_list_line(i, p))
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
         except Exception as e:
             self.err(f"Failed to write {path}: {e}")
             raise e
+        self.count("written-bytes", len(data))
+        return True, digest
 
     def prefix_list_line(self, index: int, entry: RptkPrefixEntry) -> str:
         """Generate a line in a prefix-list."""
@@ -270,11 +1414,15 @@ class PrefixListWorker(multiprocessing.Process, PrefixListBase):
                      allow_empty: bool = False) -> EapiResponse:
         """Get call an enable-mode eAPI command."""
         self.debug(f"Calling eAPI command {cmd}")
+        t0 = time.monotonic()
         try:
             resp = self.eapi.run_show_cmd(cmd)
         except Exception as e:
             self.err(f"eAPI request failed: {e}")
             raise e
+        finally:
+            self.count("eapi-calls")
+            self.count("eapi-time", time.monotonic() - t0)
         if resp.success():
             data = self.json_load(resp.responses()[0])
         else:
@@ -293,52 +1441,133 @@ class PrefixListWorker(multiprocessing.Process, PrefixListBase):
         self.debug("eAPI request successful")
         return result
 
-    def rptk_request(self, url_path: str) -> RptkResult:
-        """Perform a query against the RPTK endpoint."""
+    def rptk_request(self,
+                     url_path: str,
+                     rptk_format: typing.Optional[str] = None) -> RptkResult:
+        """Perform a query against the RPTK endpoint.
+
+        The response is decoded as 'rptk_format', or JSON if not given.
+        """
         url = "{}/{}".format(self.rptk_endpoint.rstrip("/"),
                              url_path.lstrip("/"))
         self.debug(f"Querying RPTK endpoint at {url}")
+        self.rate_limit(self.request_bucket, 1)
+        timeout = self.request_timeout()
+        t0 = time.monotonic()
         try:
             # TODO: construct url properly
-            resp = urllib.request.urlopen(url)  # noqa: S310
+            resp = urllib.request.urlopen(url, timeout=timeout)  # noqa: S310
+            body = self.read_response(resp)
+        except socket.timeout as e:
+            self.err(f"Request timed out after {timeout}s")
+            self.count("rptk-timeouts")
+            raise e
         except urllib.error.HTTPError as e:
             self.err(f"Request failed: {e.code} {e.reason}")
             raise e
         except urllib.error.URLError as e:
             self.err(f"Request failed: {e}")
+            if isinstance(e.reason, socket.timeout):
+                self.count("rptk-timeouts")
             raise e
+        finally:
+            self.count("rptk-requests")
+            self.count("rptk-time", time.monotonic() - t0)
         self.debug(f"Request successful: {resp.getcode()}")
-        result = self.json_load(resp)
+        self.count("rptk-bytes", len(body))
+        t0 = time.monotonic()
+        try:
+            if rptk_format is None or rptk_format == DEFAULT_FORMAT:
+                result = self.json_load(body)
+            else:
+                result = self.decode(rptk_format, body)
+        finally:
+            self.count("rptk-parse-time", time.monotonic() - t0)
         return typing.cast(RptkResult, result)
 
-    def json_load(self,
-                  obj: typing.Union[str, typing.TextIO]) -> typing.Any:
-        """Deserialise JSON from a string or file-like object."""
-        def fail(e: Exception) -> None:
-            self.err(f"Failed to deserialise response: {e}")
+    def read_response(self, resp: typing.Any) -> bytes:
+        """Read the body of an RPTK response.
+
+        The body is read in chunks as they arrive, and the response is
+        abandoned as soon as the run deadline passes, so that a slowly
+        trickling response cannot hold the run past its deadline.
+
+        If 'max_response_bytes' is set, the response is also abandoned as
+        soon as it exceeds the ceiling, without buffering the remainder. If
+        'rptk_bandwidth' is set, reading is paced to that many bytes per
+        second.
+        """
+        ceiling = self.max_response_bytes
+        # 'read1' returns whatever has arrived, rather than waiting for a
+        # full chunk
+        read = getattr(resp, "read1", resp.read)
+        chunks: typing.List[bytes] = list()
+        size = 0
+        headers = getattr(resp, "headers", None)
+        length = headers.get("Content-Length") if headers else None
+        oversized = (ceiling is not None and length is not None and
+                     int(length) > ceiling)
+        try:
+            while not oversized:
+                self.check_deadline()
+                chunk = read(RESPONSE_CHUNK_SIZE)
+                if not chunk:
+                    return b"".join(chunks)
+                size += len(chunk)
+                oversized = ceiling is not None and size > ceiling
+                chunks.append(chunk)
+                self.rate_limit(self.byte_bucket, len(chunk))
+        except DeadlineExceeded:
+            resp.close()
+            raise
+        resp.close()
+        raise CeilingExceeded("Response exceeds the ceiling of "
+                              f"{ceiling} bytes")
+
+    def rate_limit(self,
+                   bucket: typing.Optional[TokenBucket],
+                   n: int) -> None:
+        """Take 'n' tokens from a rate limiting bucket, if configured."""
+        if bucket is None:
+            return
+        waited = bucket.take(n)
+        if waited:
+            self.count("rptk-rate-limited")
+            self.count("rptk-rate-limited-time", waited)
+
+    def decode(self, rptk_format: str, body: bytes) -> RptkPrefixes:
+        """Decode a response in a non-JSON RPTK format."""
+        self.debug(f"Decoding '{rptk_format}' response")
+        try:
+            return DECODERS[rptk_format](body)
+        except Exception as e:
+            self.err(f"Failed to decode '{rptk_format}' response: {e}")
             raise e
 
-        self.debug("Deserialising JSON response")
+    def json_load(self,
+                  obj: typing.Union[str, bytes, typing.TextIO]) -> typing.Any:
+        """Deserialise JSON from a string, bytes or file-like object.
+
+        The fastest available JSON backend is used, which decodes 'bytes'
+        without first converting them to 'str' where it can.
+        """
+        self.debug(f"Deserialising JSON response using '{JSON_BACKEND}'")
         try:
-            self.debug("Trying 'json.load' method")
-            result = json.load(typing.cast(typing.TextIO, obj))
-        except AttributeError:
-            self.debug("Object has no 'read' method")
-            self.debug("Trying 'json.loads' method")
-            try:
-                result = json.loads(typing.cast(str, obj))
-            except Exception as e:
-                fail(e)
+            if hasattr(obj, "read"):
+                self.debug("Reading response from file-like object")
+                obj = typing.cast(typing.TextIO, obj).read()
+            result = json_loads(obj)
         except Exception as e:
-            fail(e)
+            self.err(f"Failed to deserialise response: {e}")
+            raise e
         self.debug("Successfully deserialised JSON")
         return result
 
     @property
-    def data(self) -> typing.Optional[Stats]:
+    def data(self) -> typing.Optional[WorkerResult]:
         """Get data from the worker."""
         if self.p_data.poll():
-            return typing.cast(Stats, self.p_data.recv())
+            return typing.cast(WorkerResult, self.p_data.recv())
         return None
 
     @property
@@ -11,12 +11,33 @@
 # the License.
 """PrefixListAgent CLI plugin handlers."""
 
+import datetime
+import io
+import json
+import re
 import sys
-from typing import Any, Dict, Optional, Text  # noqa: F401
+from typing import Any, Dict, List, Optional, Text  # noqa: F401
 
 import CliExtension
 
 
+def agent_status(daemon):
+    # type: (Any) -> Dict[Text, Text]
+    """Get the agent status, re-assembling values sharded across keys."""
+    status = {}  # type: Dict[Text, Text]
+    shards = {}  # type: Dict[Text, Dict[int, Text]]
+    for key, value in daemon.status.statusIter():
+        base, sep, index = key.rpartition("#")
+        if sep and index.isdigit():
+            shards.setdefault(base, {})[int(index)] = value
+        else:
+            status[key] = value
+    for key, chunks in shards.items():
+        status[key] = status.get(key, "") + "".join(chunks[i]
+                                                    for i in sorted(chunks))
+    return status
+
+
 class ShowPrefixListAgent(CliExtension.ShowCommandClass):  # type: ignore[misc]
     """Handlers for `show prefix-list-agent` command."""
 
@@ -30,8 +51,7 @@ class ShowPrefixListAgent(CliExtension.ShowCommandClass):  # type: ignore[misc]
         result = {"enabled": daemon.config.isEnabled(),
                   "config": {key: value for key, value
                              in daemon.config.configIter()},
-                  "status": {key: value for key, value
-                             in daemon.status.statusIter()}}
+                  "status": agent_status(daemon)}
         return result
 
     def render(self, data):
@@ -52,6 +72,167 @@ class ShowPrefixListAgent(CliExtension.ShowCommandClass):  # type: ignore[misc]
             sys.stdout.write("Not running\n")
 
 
+class ShowPrefixListAgentHistory(CliExtension.ShowCommandClass):  # type: ignore[misc]  # noqa: E501
+    """Handlers for `show prefix-list-agent history` command."""
+
+    def handler(self, ctx):
+        # type: (Any) -> Optional[Dict[Text, Any]]
+        """Handle `show prefix-list-agent history` command."""
+        daemon = ctx.getDaemon("PrefixListAgent")
+        if daemon is None:
+            ctx.addError("Unable to get daemon info")
+            return None
+        status = agent_status(daemon)
+        path = status.get("history-file")
+        runs = []  # type: List[Dict[Text, Any]]
+        if path:
+            try:
+                with io.open(path, encoding="utf-8") as f:
+                    runs = json.load(f)
+            except (EnvironmentError, ValueError) as e:
+                ctx.addError("Unable to read run history: {}".format(e))
+                return None
+        self.detail = "detail" in ctx.args
+        return {"runs": list(reversed(runs))}
+
+    def render(self, data):
+        # type: (Dict[Text, Any]) -> None
+        """Render `show prefix-list-agent history` command output."""
+        if not data["runs"]:
+            sys.stdout.write("No run history\n")
+            return
+        if getattr(self, "detail", False):
+            for run in data["runs"]:
+                sys.stdout.write("Run started {}\n".format(run["start"]))
+                sys.stdout.write("----\n")
+                for key in ("end", "duration", "result", "error"):
+                    sys.stdout.write("{:24}: {}\n".format(key, run[key]))
+                for key, value in sorted(run["stats"].items()):
+                    sys.stdout.write("{:24}: {}\n".format(key, value))
+                sys.stdout.write("\n")
+            return
+        fmt = "{:26} {:>10} {:8} {:>9} {:>6} {:>7}\n"
+        sys.stdout.write(fmt.format("Start", "Duration", "Result",
+                                    "Succeeded", "Failed", "Changed"))
+        for run in data["runs"]:
+            stats = run["stats"]
+            sys.stdout.write(fmt.format(run["start"] or "-",
+                                        run["duration"] or "-",
+                                        run["result"] or "-",
+                                        stats.get("succeeded", "-"),
+                                        stats.get("failed", "-"),
+                                        stats.get("changed", "-")))
+
+
+def load_index(path):
+    # type: (Text) -> List[Dict[Text, Any]]
+    """Load the per-list records from the agent's list index."""
+    with io.open(path, encoding="utf-8") as f:
+        index = json.load(f)
+    fields = index["fields"]
+    return [dict(zip(fields, row)) for row in index["rows"]]
+
+
+def filter_lists(records, policy=None, name=None, failed=False):
+    # type: (List[Dict[Text, Any]], Optional[Text], Optional[Any], bool) -> List[Dict[Text, Any]]  # noqa: E501
+    """Select the per-list records matching the given filters.
+
+    A prefix-list has failed if it could not be written, or if EOS failed to
+    load it when it was refreshed.
+    """
+    return [record for record in records
+            if (policy is None or record["policy"] == policy) and
+            (name is None or name.search(record["name"])) and
+            (not failed or record_error(record) is not None)]
+
+
+def record_error(record):
+    # type: (Dict[Text, Any]) -> Optional[Text]
+    """Get the error of a per-list record, including a refresh error."""
+    return record["error"] or record.get("refresh-error")
+
+
+def format_timestamp(ts):
+    # type: (Optional[float]) -> Text
+    """Format a POSIX timestamp for display."""
+    if ts is None:
+        return "-"
+    return datetime.datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class ShowPrefixListAgentLists(CliExtension.ShowCommandClass):  # type: ignore[misc]  # noqa: E501
+    """Handlers for `show prefix-list-agent lists` command."""
+
+    def handler(self, ctx):
+        # type: (Any) -> Optional[Dict[Text, Any]]
+        """Handle `show prefix-list-agent lists` command."""
+        daemon = ctx.getDaemon("PrefixListAgent")
+        if daemon is None:
+            ctx.addError("Unable to get daemon info")
+            return None
+        status = agent_status(daemon)
+        path = status.get("index-file")
+        records = []  # type: List[Dict[Text, Any]]
+        if path:
+            try:
+                records = load_index(path)
+            except (EnvironmentError, ValueError, KeyError) as e:
+                ctx.addError("Unable to read list index: {}".format(e))
+                return None
+        name = None
+        if "<regex>" in ctx.args:
+            try:
+                name = re.compile(ctx.args["<regex>"])
+            except re.error as e:
+                ctx.addError("Invalid name pattern: {}".format(e))
+                return None
+        records = filter_lists(records,
+                               policy=ctx.args.get("<policy>"),
+                               name=name,
+                               failed="failed" in ctx.args)
+        offset = int(ctx.args.get("<offset>", 0))
+        limit = ctx.args.get("<limit>")
+        end = None if limit is None else offset + int(limit)
+        self.detail = "detail" in ctx.args
+        return {"total": len(records),
+                "offset": offset,
+                "lists": records[offset:end]}
+
+    def render(self, data):
+        # type: (Dict[Text, Any]) -> None
+        """Render `show prefix-list-agent lists` command output."""
+        if not data["lists"]:
+            sys.stdout.write("No matching prefix-lists\n")
+            return
+        if getattr(self, "detail", False):
+            for record in data["lists"]:
+                sys.stdout.write("Prefix-list {name} ({afi})\n"
+                                 .format(**record))
+                sys.stdout.write("----\n")
+                for key, value in sorted(record.items()):
+                    if key in ("changed-at", "updated"):
+                        value = format_timestamp(value)
+                    sys.stdout.write("{:12}: {}\n".format(key, value))
+                sys.stdout.write("\n")
+        else:
+            fmt = "{:16} {:32} {:5} {:>8} {:>8} {:19} {}\n"
+            sys.stdout.write(fmt.format("Policy", "Name", "AFI", "Entries",
+                                        "Latency", "Changed", "Error"))
+            for record in data["lists"]:
+                entries = record["entries"]
+                latency = record["latency"]
+                sys.stdout.write(fmt.format(
+                    record["policy"], record["name"], record["afi"],
+                    "-" if entries is None else entries,
+                    "-" if latency is None else round(latency, 3),
+                    format_timestamp(record["changed-at"]),
+                    record_error(record) or "",
+                ))
+        sys.stdout.write("\nShowing {} of {} prefix-lists\n".format(
+            len(data["lists"]), data["total"],
+        ))
+
+
 class PrefixListAgentCfgDisabled(CliExtension.CliCommandClass):  # type: ignore[misc]  # noqa: E501
     """Handlers for `[no] disabled` commands."""
 
@@ -109,6 +290,13 @@ class PrefixListAgentCfgInterval(PrefixListAgentCfg):
     arg_key = "<int>"
 
 
+class PrefixListAgentCfgJitter(PrefixListAgentCfgNullable):
+    """Handlers for `[no] refresh-jitter <int>` command."""
+
+    option_key = "refresh-jitter"
+    arg_key = "<int>"
+
+
 class PrefixListAgentCfgDelay(PrefixListAgentCfgNullable):
     """Handlers for `[no] update-delay <int>` command."""
 
@@ -116,10 +304,196 @@ class PrefixListAgentCfgDelay(PrefixListAgentCfgNullable):
     arg_key = "<int>"
 
 
+class PrefixListAgentCfgHistoryFile(PrefixListAgentCfg):
+    """Handlers for `history-file <path>` command."""
+
+    option_key = "history-file"
+    arg_key = "<path>"
+
+
+class PrefixListAgentCfgHistorySize(PrefixListAgentCfg):
+    """Handlers for `history-size <int>` command."""
+
+    option_key = "history-size"
+    arg_key = "<int>"
+
+
+class PrefixListAgentCfgProfileMode(PrefixListAgentCfgNullable):
+    """Handlers for `[no] profile-mode <mode>` command."""
+
+    option_key = "profile-mode"
+    arg_key = "<mode>"
+
+
+class PrefixListAgentCfgProfileInterval(PrefixListAgentCfgNullable):
+    """Handlers for `[no] profile-interval <int>` command."""
+
+    option_key = "profile-interval"
+    arg_key = "<int>"
+
+
+class PrefixListAgentCfgProfileDir(PrefixListAgentCfg):
+    """Handlers for `profile-directory <path>` command."""
+
+    option_key = "profile-directory"
+    arg_key = "<path>"
+
+
+class PrefixListAgentCfgSnapshotFile(PrefixListAgentCfg):
+    """Handlers for `snapshot-file <path>` command."""
+
+    option_key = "snapshot-file"
+    arg_key = "<path>"
+
+
+class PrefixListAgentCfgCheckpointAge(PrefixListAgentCfg):
+    """Handlers for `checkpoint-age <int>` command."""
+
+    option_key = "checkpoint-age"
+    arg_key = "<int>"
+
+
+class PrefixListAgentCfgPriorityTiers(PrefixListAgentCfgNullable):
+    """Handlers for `[no] priority-tiers <rules>` command."""
+
+    option_key = "priority-tiers"
+    arg_key = "<rules>"
+
+
+class PrefixListAgentCfgRptkTimeout(PrefixListAgentCfg):
+    """Handlers for `rptk-timeout <int>` command."""
+
+    option_key = "rptk-timeout"
+    arg_key = "<int>"
+
+
+class PrefixListAgentCfgRunDeadline(PrefixListAgentCfgNullable):
+    """Handlers for `[no] run-deadline <int>` command."""
+
+    option_key = "run-deadline"
+    arg_key = "<int>"
+
+
+class PrefixListAgentCfgMaxEntries(PrefixListAgentCfgNullable):
+    """Handlers for `[no] max-entries <int>` command."""
+
+    option_key = "max-entries"
+    arg_key = "<int>"
+
+
+class PrefixListAgentCfgMaxResponseBytes(PrefixListAgentCfgNullable):
+    """Handlers for `[no] max-response-bytes <int>` command."""
+
+    option_key = "max-response-bytes"
+    arg_key = "<int>"
+
+
+class PrefixListAgentCfgEntryBudget(PrefixListAgentCfgNullable):
+    """Handlers for `[no] entry-budget <int>` command."""
+
+    option_key = "entry-budget"
+    arg_key = "<int>"
+
+
+class PrefixListAgentCfgRptkRate(PrefixListAgentCfgNullable):
+    """Handlers for `[no] rptk-rate <rate>` command."""
+
+    option_key = "rptk-rate"
+    arg_key = "<rate>"
+
+
+class PrefixListAgentCfgRptkBandwidth(PrefixListAgentCfgNullable):
+    """Handlers for `[no] rptk-bandwidth <int>` command."""
+
+    option_key = "rptk-bandwidth"
+    arg_key = "<int>"
+
+
+class PrefixListAgentCfgRptkFormat(PrefixListAgentCfgNullable):
+    """Handlers for `[no] rptk-format <format>` command."""
+
+    option_key = "rptk-format"
+    arg_key = "<format>"
+
+
+class PrefixListAgentCfgBundleUrl(PrefixListAgentCfgNullable):
+    """Handlers for `[no] bundle-url <url>` command."""
+
+    option_key = "bundle-url"
+    arg_key = "<url>"
+
+
+class PrefixListAgentCfgPrebuiltUrl(PrefixListAgentCfgNullable):
+    """Handlers for `[no] prebuilt-url <url>` command."""
+
+    option_key = "prebuilt-url"
+    arg_key = "<url>"
+
+
+class PrefixListAgentCfgOrphanGrace(PrefixListAgentCfg):
+    """Handlers for `orphan-grace <int>` command."""
+
+    option_key = "orphan-grace"
+    arg_key = "<int>"
+
+
+class PrefixListAgentCfgWorkerNice(PrefixListAgentCfgNullable):
+    """Handlers for `[no] worker-nice <int>` command."""
+
+    option_key = "worker-nice"
+    arg_key = "<int>"
+
+
+class PrefixListAgentCfgWorkerIoClass(PrefixListAgentCfgNullable):
+    """Handlers for `[no] worker-io-class <class>` command."""
+
+    option_key = "worker-io-class"
+    arg_key = "<class>"
+
+
+class PrefixListAgentCfgWorkerCpus(PrefixListAgentCfgNullable):
+    """Handlers for `[no] worker-cpus <cpus>` command."""
+
+    option_key = "worker-cpus"
+    arg_key = "<cpus>"
+
+
+class PrefixListAgentCfgThrottleLoad(PrefixListAgentCfgNullable):
+    """Handlers for `[no] throttle-load <load>` command."""
+
+    option_key = "throttle-load"
+    arg_key = "<load>"
+
+
+class PrefixListAgentCfgThrottlePressure(PrefixListAgentCfgNullable):
+    """Handlers for `[no] throttle-pressure <int>` command."""
+
+    option_key = "throttle-pressure"
+    arg_key = "<int>"
+
+
+class PrefixListAgentCfgIndexFile(PrefixListAgentCfg):
+    """Handlers for `index-file <path>` command."""
+
+    option_key = "index-file"
+    arg_key = "<path>"
+
+
+class PrefixListAgentCfgMetricsFile(PrefixListAgentCfgNullable):
+    """Handlers for `[no] metrics-file <path>` command."""
+
+    option_key = "metrics-file"
+    arg_key = "<path>"
+
+
 def Plugin(ctx):  # noqa: N802
     # type: (Any) -> None
     """Initialise CLI plugin."""
     CliExtension.registerCommand("show_prefix_list_agent", ShowPrefixListAgent)
+    CliExtension.registerCommand("show_prefix_list_agent_history",
+                                 ShowPrefixListAgentHistory)
+    CliExtension.registerCommand("show_prefix_list_agent_lists",
+                                 ShowPrefixListAgentLists)
     CliExtension.registerCommand("cfg_prefix_list_agent_disabled",
                                  PrefixListAgentCfgDisabled)
     CliExtension.registerCommand("cfg_prefix_list_agent_endpoint",
@@ -128,5 +502,59 @@ def Plugin(ctx):  # noqa: N802
                                  PrefixListAgentCfgSrcDir)
     CliExtension.registerCommand("cfg_prefix_list_agent_interval",
                                  PrefixListAgentCfgInterval)
+    CliExtension.registerCommand("cfg_prefix_list_agent_jitter",
+                                 PrefixListAgentCfgJitter)
     CliExtension.registerCommand("cfg_prefix_list_agent_delay",
                                  PrefixListAgentCfgDelay)
+    CliExtension.registerCommand("cfg_prefix_list_agent_history_file",
+                                 PrefixListAgentCfgHistoryFile)
+    CliExtension.registerCommand("cfg_prefix_list_agent_history_size",
+                                 PrefixListAgentCfgHistorySize)
+    CliExtension.registerCommand("cfg_prefix_list_agent_profile_mode",
+                                 PrefixListAgentCfgProfileMode)
+    CliExtension.registerCommand("cfg_prefix_list_agent_profile_interval",
+                                 PrefixListAgentCfgProfileInterval)
+    CliExtension.registerCommand("cfg_prefix_list_agent_profile_dir",
+                                 PrefixListAgentCfgProfileDir)
+    CliExtension.registerCommand("cfg_prefix_list_agent_snapshot_file",
+                                 PrefixListAgentCfgSnapshotFile)
+    CliExtension.registerCommand("cfg_prefix_list_agent_checkpoint_age",
+                                 PrefixListAgentCfgCheckpointAge)
+    CliExtension.registerCommand("cfg_prefix_list_agent_priority_tiers",
+                                 PrefixListAgentCfgPriorityTiers)
+    CliExtension.registerCommand("cfg_prefix_list_agent_rptk_timeout",
+                                 PrefixListAgentCfgRptkTimeout)
+    CliExtension.registerCommand("cfg_prefix_list_agent_run_deadline",
+                                 PrefixListAgentCfgRunDeadline)
+    CliExtension.registerCommand("cfg_prefix_list_agent_max_entries",
+                                 PrefixListAgentCfgMaxEntries)
+    CliExtension.registerCommand("cfg_prefix_list_agent_max_response_bytes",
+                                 PrefixListAgentCfgMaxResponseBytes)
+    CliExtension.registerCommand("cfg_prefix_list_agent_entry_budget",
+                                 PrefixListAgentCfgEntryBudget)
+    CliExtension.registerCommand("cfg_prefix_list_agent_rptk_rate",
+                                 PrefixListAgentCfgRptkRate)
+    CliExtension.registerCommand("cfg_prefix_list_agent_rptk_bandwidth",
+                                 PrefixListAgentCfgRptkBandwidth)
+    CliExtension.registerCommand("cfg_prefix_list_agent_rptk_format",
+                                 PrefixListAgentCfgRptkFormat)
+    CliExtension.registerCommand("cfg_prefix_list_agent_bundle_url",
+                                 PrefixListAgentCfgBundleUrl)
+    CliExtension.registerCommand("cfg_prefix_list_agent_prebuilt_url",
+                                 PrefixListAgentCfgPrebuiltUrl)
+    CliExtension.registerCommand("cfg_prefix_list_agent_orphan_grace",
+                                 PrefixListAgentCfgOrphanGrace)
+    CliExtension.registerCommand("cfg_prefix_list_agent_worker_nice",
+                                 PrefixListAgentCfgWorkerNice)
+    CliExtension.registerCommand("cfg_prefix_list_agent_worker_io_class",
+                                 PrefixListAgentCfgWorkerIoClass)
+    CliExtension.registerCommand("cfg_prefix_list_agent_worker_cpus",
+                                 PrefixListAgentCfgWorkerCpus)
+    CliExtension.registerCommand("cfg_prefix_list_agent_throttle_load",
+                                 PrefixListAgentCfgThrottleLoad)
+    CliExtension.registerCommand("cfg_prefix_list_agent_throttle_pressure",
+                                 PrefixListAgentCfgThrottlePressure)
+    CliExtension.registerCommand("cfg_prefix_list_agent_index_file",
+                                 PrefixListAgentCfgIndexFile)
+    CliExtension.registerCommand("cfg_prefix_list_agent_metrics_file",
+                                 PrefixListAgentCfgMetricsFile)
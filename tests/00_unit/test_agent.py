@@ -18,6 +18,8 @@ import time
 from prefix_list_agent.agent import PrefixListAgent
 from prefix_list_agent.exceptions import (ConfigValueError, TermException,
                                           handle_sigterm)
+from prefix_list_agent.history import RunHistory
+from prefix_list_agent.index import ListIndex
 
 import pytest
 
@@ -63,6 +65,235 @@ class TestPrefixListAgent(object):
         """Test 'update_delay' getter."""
         assert agent.update_delay == value
 
+    @pytest.mark.parametrize(("agent", "value"),
+                             (({}, None),
+                              ({"profile-mode": "cpu"}, "cpu"),
+                              pytest.param({"profile-mode": "foo"}, None,
+                                  marks=pytest.mark.xfail(raises=ConfigValueError))),  # noqa: E501
+                             indirect=("agent",))
+    def test_property_profile_mode(self, agent, value):
+        """Test 'profile_mode' getter."""
+        assert agent.profile_mode == value
+
+    @pytest.mark.parametrize(("agent", "value"),
+                             (({}, None),
+                              ({"profile-interval": 10}, 10),
+                              pytest.param({"profile-interval": 0}, None,
+                                  marks=pytest.mark.xfail(raises=ConfigValueError))),  # noqa: E501
+                             indirect=("agent",))
+    def test_property_profile_interval(self, agent, value):
+        """Test 'profile_interval' getter."""
+        assert agent.profile_interval == value
+
+    @pytest.mark.parametrize(("agent", "value"),
+                             (({}, 900),
+                              ({"checkpoint-age": 0}, 0),
+                              pytest.param({"checkpoint-age": 86401}, None,
+                                  marks=pytest.mark.xfail(raises=ConfigValueError))),  # noqa: E501
+                             indirect=("agent",))
+    def test_property_checkpoint_age(self, agent, value):
+        """Test 'checkpoint_age' getter."""
+        assert agent.checkpoint_age == value
+
+    @pytest.mark.parametrize(("agent", "value"),
+                             (({}, []),
+                              ({"priority-tiers": "strict=0"},
+                               [("strict", 0)]),
+                              ({"priority-tiers": "loose/AS-CUST-*=1, *=9"},
+                               [("loose/AS-CUST-*", 1), ("*", 9)]),
+                              pytest.param({"priority-tiers": "strict"}, None,
+                                  marks=pytest.mark.xfail(raises=ConfigValueError)),  # noqa: E501
+                              pytest.param({"priority-tiers": "strict=10"}, None,  # noqa: E501
+                                  marks=pytest.mark.xfail(raises=ConfigValueError))),  # noqa: E501
+                             indirect=("agent",))
+    def test_property_priority_tiers(self, agent, value):
+        """Test 'priority_tiers' getter."""
+        assert agent.priority_tiers == value
+
+    @pytest.mark.parametrize(("agent", "value"),
+                             (({}, 60),
+                              ({"rptk-timeout": 30}, 30),
+                              pytest.param({"rptk-timeout": 0}, None,
+                                  marks=pytest.mark.xfail(raises=ConfigValueError))),  # noqa: E501
+                             indirect=("agent",))
+    def test_property_rptk_timeout(self, agent, value):
+        """Test 'rptk_timeout' getter."""
+        assert agent.rptk_timeout == value
+
+    @pytest.mark.parametrize(("agent", "value"),
+                             (({}, None),
+                              ({"run-deadline": 1800}, 1800),
+                              pytest.param({"run-deadline": 10}, None,
+                                  marks=pytest.mark.xfail(raises=ConfigValueError))),  # noqa: E501
+                             indirect=("agent",))
+    def test_property_run_deadline(self, agent, value):
+        """Test 'run_deadline' getter."""
+        assert agent.run_deadline == value
+
+    @pytest.mark.parametrize(("agent", "value"),
+                             (({}, None),
+                              ({"refresh-jitter": 600}, 600),
+                              pytest.param({"refresh-jitter": 86401}, None,
+                                  marks=pytest.mark.xfail(raises=ConfigValueError))),  # noqa: E501
+                             indirect=("agent",))
+    def test_property_refresh_jitter(self, agent, value):
+        """Test 'refresh_jitter' getter."""
+        assert agent.refresh_jitter == value
+
+    @pytest.mark.parametrize(("agent", "value"),
+                             (({}, None),
+                              ({"rptk-rate": "2.5"}, 2.5),
+                              pytest.param({"rptk-rate": "0.01"}, None,
+                                  marks=pytest.mark.xfail(raises=ConfigValueError))),  # noqa: E501
+                             indirect=("agent",))
+    def test_property_rptk_rate(self, agent, value):
+        """Test 'rptk_rate' getter."""
+        assert agent.rptk_rate == value
+
+    @pytest.mark.parametrize(("agent", "value"),
+                             (({}, None),
+                              ({"rptk-bandwidth": 1048576}, 1048576),
+                              pytest.param({"rptk-bandwidth": 1}, None,
+                                  marks=pytest.mark.xfail(raises=ConfigValueError))),  # noqa: E501
+                             indirect=("agent",))
+    def test_property_rptk_bandwidth(self, agent, value):
+        """Test 'rptk_bandwidth' getter."""
+        assert agent.rptk_bandwidth == value
+
+    @pytest.mark.parametrize(("agent", "value"),
+                             (({}, None),
+                              ({"bundle-url": "https://example.net/bundles"},
+                               "https://example.net/bundles"),
+                              pytest.param({"bundle-url": "/bundles"}, None,
+                                  marks=pytest.mark.xfail(raises=ConfigValueError))),  # noqa: E501
+                             indirect=("agent",))
+    def test_property_bundle_url(self, agent, value):
+        """Test 'bundle_url' getter."""
+        assert agent.bundle_url == value
+
+    @pytest.mark.parametrize(("agent", "value"),
+                             (({}, None),
+                              ({"prebuilt-url": "https://example.net/tree"},
+                               "https://example.net/tree"),
+                              pytest.param({"prebuilt-url": "/tree"}, None,
+                                  marks=pytest.mark.xfail(raises=ConfigValueError))),  # noqa: E501
+                             indirect=("agent",))
+    def test_property_prebuilt_url(self, agent, value):
+        """Test 'prebuilt_url' getter."""
+        assert agent.prebuilt_url == value
+
+    @pytest.mark.parametrize(("agent", "value"),
+                             (({}, None),
+                              ({"max-entries": 100000}, 100000),
+                              pytest.param({"max-entries": 0}, None,
+                                  marks=pytest.mark.xfail(raises=ConfigValueError))),  # noqa: E501
+                             indirect=("agent",))
+    def test_property_max_entries(self, agent, value):
+        """Test 'max_entries' getter."""
+        assert agent.max_entries == value
+
+    @pytest.mark.parametrize(("agent", "value"),
+                             (({}, None),
+                              ({"max-response-bytes": 65536}, 65536),
+                              pytest.param({"max-response-bytes": 1}, None,
+                                  marks=pytest.mark.xfail(raises=ConfigValueError))),  # noqa: E501
+                             indirect=("agent",))
+    def test_property_max_response_bytes(self, agent, value):
+        """Test 'max_response_bytes' getter."""
+        assert agent.max_response_bytes == value
+
+    @pytest.mark.parametrize(("agent", "value"),
+                             (({}, None),
+                              ({"entry-budget": 500000}, 500000),
+                              pytest.param({"entry-budget": 0}, None,
+                                  marks=pytest.mark.xfail(raises=ConfigValueError))),  # noqa: E501
+                             indirect=("agent",))
+    def test_property_entry_budget(self, agent, value):
+        """Test 'entry_budget' getter."""
+        assert agent.entry_budget == value
+
+    @pytest.mark.parametrize(("agent", "value"),
+                             (({}, 86400),
+                              ({"orphan-grace": 0}, 0),
+                              pytest.param({"orphan-grace": 2592001}, None,
+                                  marks=pytest.mark.xfail(raises=ConfigValueError))),  # noqa: E501
+                             indirect=("agent",))
+    def test_property_orphan_grace(self, agent, value):
+        """Test 'orphan_grace' getter."""
+        assert agent.orphan_grace == value
+
+    @pytest.mark.parametrize(("agent", "value"),
+                             (({}, None),
+                              ({"worker-nice": 10}, 10),
+                              pytest.param({"worker-nice": 20}, None,
+                                  marks=pytest.mark.xfail(raises=ConfigValueError))),  # noqa: E501
+                             indirect=("agent",))
+    def test_property_worker_nice(self, agent, value):
+        """Test 'worker_nice' getter."""
+        assert agent.worker_nice == value
+
+    @pytest.mark.parametrize(("agent", "value"),
+                             (({}, None),
+                              ({"worker-io-class": "idle"}, "idle"),
+                              pytest.param({"worker-io-class": "realtime"}, None,  # noqa: E501
+                                  marks=pytest.mark.xfail(raises=ConfigValueError))),  # noqa: E501
+                             indirect=("agent",))
+    def test_property_worker_io_class(self, agent, value):
+        """Test 'worker_io_class' getter."""
+        assert agent.worker_io_class == value
+
+    @pytest.mark.parametrize(("agent", "value"),
+                             (({}, None),
+                              ({"rptk-format": "plain"}, "plain"),
+                              pytest.param({"rptk-format": "yaml"}, None,
+                                  marks=pytest.mark.xfail(raises=ConfigValueError))),  # noqa: E501
+                             indirect=("agent",))
+    def test_property_rptk_format(self, agent, value):
+        """Test 'rptk_format' getter."""
+        assert agent.rptk_format == value
+
+    @pytest.mark.parametrize(("agent", "value"),
+                             (({}, None),
+                              ({"worker-cpus": "0-1,3"}, {0, 1, 3}),
+                              pytest.param({"worker-cpus": "foo"}, None,
+                                  marks=pytest.mark.xfail(raises=ConfigValueError))),  # noqa: E501
+                             indirect=("agent",))
+    def test_property_worker_cpus(self, agent, value):
+        """Test 'worker_cpus' getter."""
+        assert agent.worker_cpus == value
+
+    @pytest.mark.parametrize(("agent", "configured"),
+                             (({}, False),
+                              ({"throttle-load": "1.5"}, True),
+                              ({"throttle-pressure": 20}, True),
+                              pytest.param({"throttle-load": "0"}, None,
+                                  marks=pytest.mark.xfail(raises=ConfigValueError)),  # noqa: E501
+                              pytest.param({"throttle-pressure": 0}, None,
+                                  marks=pytest.mark.xfail(raises=ConfigValueError))),  # noqa: E501
+                             indirect=("agent",))
+    def test_throttle(self, agent, configured):
+        """Test case for 'throttle' method."""
+        throttle = agent.throttle()
+        assert (throttle is not None) == configured
+
+    @pytest.mark.parametrize(("agent", "expect"),
+                             (({}, [False, False, False, False]),
+                              ({"profile-mode": "cpu"},
+                               [True, False, False, False]),
+                              ({"profile-mode": "all", "profile-interval": 2},
+                               [False, True, False, True])),
+                             indirect=("agent",))
+    def test_profile_path(self, agent, expect):
+        """Test case for 'profile_path' method."""
+        result = []
+        for _ in expect:
+            agent.runs += 1
+            path = agent.profile_path()
+            if path is not None:
+                assert path.startswith(agent.profile_dir)
+            result.append(path is not None)
+        assert result == expect
+
     def test_property_status(self, agent):
         """Test 'status' getter and setter."""
         assert agent.status is None
@@ -92,6 +323,16 @@ class TestPrefixListAgent(object):
             setattr(agent, prop, "foo")
         assert getattr(agent, prop) == test_value
 
+    @pytest.mark.parametrize("init_worker", (True, False))
+    def test_property_running(self, agent, mocker, init_worker):
+        """Test 'running' getter."""
+        assert agent.running is False
+        if init_worker:
+            agent.init_worker()
+            mocker.patch.object(agent.worker, "is_alive", autospec=True,
+                                return_value=True)
+            assert agent.running is True
+
     def test_init_worker(self, agent):
         """Test case for `init_worker` method."""
         agent.init_worker()
@@ -108,6 +349,42 @@ class TestPrefixListAgent(object):
         for method in methods:
             getattr(agent, method).assert_called_once_with()
 
+    @pytest.mark.parametrize("agent", ({"rptk-endpoint": "https://example.com",
+                                        "refresh-jitter": 600},),
+                             indirect=True)
+    def test_start_jitter(self, agent, mocker):
+        """Test that the first run is delayed by the switch's offset."""
+        for method in ("init", "run", "sleep"):
+            mocker.patch.object(agent, method, autospec=True)
+        mocker.patch.object(agent, "schedule_offset", return_value=42)
+        agent.start()
+        agent.sleep.assert_called_once_with(42)
+        agent.run.assert_not_called()
+
+    @pytest.mark.parametrize("restored", ([], ["/tmp/prefix-lists/foo"]))  # noqa: S108, E501
+    def test_restore_snapshot(self, agent, mocker, restored):
+        """Test case for 'restore_snapshot' method."""
+        snapshot = mocker.patch("prefix_list_agent.agent.Snapshot",
+                                autospec=True)
+        snapshot.return_value.restore.return_value = restored
+        agent.restore_snapshot()
+        snapshot.return_value.restore.assert_called_once_with(agent.source_dir)
+        if restored:
+            agent.eapi_mgr.run_show_cmd.assert_any_call("refresh ip prefix-list")  # noqa: E501
+            agent.eapi_mgr.run_show_cmd.assert_any_call("refresh ipv6 prefix-list")  # noqa: E501
+        else:
+            agent.eapi_mgr.run_show_cmd.assert_not_called()
+
+    def test_restore_snapshot_error(self, agent, mocker):
+        """Test case for 'restore_snapshot' method failing."""
+        snapshot = mocker.patch("prefix_list_agent.agent.Snapshot",
+                                autospec=True)
+        snapshot.return_value.restore.side_effect = OSError
+        mocker.patch.object(agent, "err", autospec=True)
+        agent.restore_snapshot()
+        agent.err.assert_called_once()
+        agent.eapi_mgr.run_show_cmd.assert_not_called()
+
     @pytest.mark.parametrize("side_effect", ((None,), RuntimeError()))
     @pytest.mark.parametrize("agent",
                              ({}, {"rptk-endpoint": "https://example.com"}),
@@ -154,11 +431,16 @@ class TestPrefixListAgent(object):
     @pytest.mark.parametrize("stats", ({"foo": "bar"}, None))
     def test_success(self, agent, mocker, stats):
         """Test case for 'success' method."""
-        for method in ("report", "cleanup", "sleep"):
+        for method in ("report", "update_lists", "record_index",
+                       "record_history", "record_metrics", "cleanup",
+                       "sleep"):
             mocker.patch.object(agent, method, autospec=True)
         mock_worker = mocker.patch("prefix_list_agent.agent.PrefixListWorker",
                                    autospec=True)
-        mock_worker.return_value.data = stats
+        if stats is None:
+            mock_worker.return_value.data = None
+        else:
+            mock_worker.return_value.data = (stats, {}, "plain")
         agent._worker = mock_worker(rptk_endpoint=agent.rptk_endpoint,
                                     source_dir=agent.source_dir,
                                     update_delay=agent.update_delay,
@@ -166,6 +448,11 @@ class TestPrefixListAgent(object):
         agent.success()
         if stats is not None:
             agent.report.assert_called_once_with(**stats)
+            agent.update_lists.assert_called_once_with({})
+            agent.record_index.assert_called_once_with()
+            assert agent.negotiated_format == "plain"
+        agent.record_history.assert_called_once_with(stats=stats)
+        agent.record_metrics.assert_called_once_with(stats=stats)
         agent.cleanup.assert_called_once_with(process=agent.worker)
         agent.sleep.assert_called_once_with()
 
@@ -176,7 +463,8 @@ class TestPrefixListAgent(object):
     def test_failure(self, agent, mocker, local_err, worker_err,
                      worker_process, restart):
         """Test case for 'failure' method."""
-        for method in ("err", "restart", "cleanup", "sleep"):
+        for method in ("err", "restart", "record_history", "record_metrics",
+                       "cleanup", "sleep"):
             mocker.patch.object(agent, method, autospec=True)
         mock_worker = mocker.patch("prefix_list_agent.agent.PrefixListWorker",
                                    autospec=True)
@@ -191,6 +479,7 @@ class TestPrefixListAgent(object):
             process = None
             if local_err is None:
                 pytest.xfail()
+        agent.negotiated_format = "plain"
         agent.failure(err=local_err, process=process, restart=restart)
         if local_err is None:
             agent.err.assert_called_once_with(worker_err)
@@ -201,12 +490,113 @@ class TestPrefixListAgent(object):
         else:
             agent.cleanup.assert_called_once_with(process=process)
             agent.sleep.assert_called_once_with()
+        assert agent.negotiated_format is None
+
+    @pytest.mark.parametrize("err", (None, RuntimeError("test_error")))
+    def test_record_history(self, agent, mocker, tmp_path, err):
+        """Test case for 'record_history' method."""
+        path = tmp_path / "history.json"
+        mocker.patch.object(PrefixListAgent, "history_file",
+                            new_callable=mocker.PropertyMock,
+                            return_value=str(path))
+        agent.last_start = datetime.datetime.now()
+        agent.last_end = agent.last_start + datetime.timedelta(seconds=2)
+        agent.result = "ok" if err is None else "failed"
+        agent.record_history(stats={"succeeded": 1}, err=err)
+        agent.record_history(stats={"succeeded": 2}, err=err)
+        records = RunHistory(str(path), 10).load()
+        assert [r["stats"]["succeeded"] for r in records] == [1, 2]
+        assert records[0]["duration"] == 2
+        assert records[0]["result"] == agent.result
+        assert records[0]["error"] == (None if err is None else str(err))
+        assert agent.status_get(str, "history-file") == str(path)
+
+    def test_record_index(self, agent, mocker, tmp_path):
+        """Test case for 'record_index' method."""
+        path = tmp_path / "lists.json"
+        mocker.patch.object(PrefixListAgent, "index_file",
+                            new_callable=mocker.PropertyMock,
+                            return_value=str(path))
+        agent.lists = {"p/FOO/ipv4": {"policy": "p", "name": "FOO",
+                                      "afi": "ipv4", "entries": 1}}
+        agent.record_index()
+        assert ListIndex(str(path)).load()["p/FOO/ipv4"]["entries"] == 1
+        assert agent.status_get(str, "index-file") == str(path)
+
+    def test_record_index_error(self, agent, mocker):
+        """Test case for 'record_index' method failing."""
+        index = mocker.patch("prefix_list_agent.agent.ListIndex",
+                             autospec=True)
+        index.return_value.write.side_effect = OSError
+        mocker.patch.object(agent, "err", autospec=True)
+        agent.record_index()
+        agent.err.assert_called_once()
+
+    def test_record_history_error(self, agent, mocker):
+        """Test case for 'record_history' method failing."""
+        history = mocker.patch("prefix_list_agent.agent.RunHistory",
+                               autospec=True)
+        history.return_value.append.side_effect = OSError
+        mocker.patch.object(agent, "err", autospec=True)
+        agent.record_history()
+        agent.err.assert_called_once()
+
+    def test_update_lists(self, agent):
+        """Test case for 'update_lists' method."""
+        def record(**kwargs):
+            r = {"entries": 1, "changed": False, "error": None}
+            r.update(kwargs)
+            return r
+        agent.update_lists({"p/FOO/ipv4": record(changed=True),
+                            "p/BAR/ipv4": record(changed=True),
+                            "p/BAZ/ipv4": record()})
+        first = dict(agent.lists)
+        assert first["p/FOO/ipv4"]["changed-at"] is not None
+        assert first["p/BAZ/ipv4"]["changed-at"] is None
+        agent.update_lists({"p/FOO/ipv4": record(),
+                            "p/BAR/ipv4": record(entries=None,
+                                                 error="no prefix data")})
+        assert set(agent.lists) == {"p/FOO/ipv4", "p/BAR/ipv4"}
+        foo, bar = agent.lists["p/FOO/ipv4"], agent.lists["p/BAR/ipv4"]
+        assert foo["updated"] >= first["p/FOO/ipv4"]["updated"]
+        assert foo["changed-at"] == first["p/FOO/ipv4"]["changed-at"]
+        assert bar["entries"] == 1
+        assert bar["updated"] == first["p/BAR/ipv4"]["updated"]
+
+    @pytest.mark.parametrize("configured", (True, False))
+    def test_record_metrics(self, agent, mocker, tmp_path, configured):
+        """Test case for 'record_metrics' method."""
+        path = tmp_path / "metrics.prom"
+        mocker.patch.object(PrefixListAgent, "metrics_file",
+                            new_callable=mocker.PropertyMock,
+                            return_value=str(path) if configured else None)
+        agent.result = "ok"
+        agent.record_metrics(stats={"succeeded": 1})
+        assert path.exists() is configured
+        if configured:
+            assert "prefix_list_agent_last_run_success 1" in path.read_text()
+            assert agent.status_get(str, "metrics-file") == str(path)
+
+    def test_record_metrics_error(self, agent, mocker):
+        """Test case for 'record_metrics' method failing."""
+        mocker.patch.object(PrefixListAgent, "metrics_file",
+                            new_callable=mocker.PropertyMock,
+                            return_value="/foo/metrics.prom")
+        exporter = mocker.patch("prefix_list_agent.agent.MetricsExporter",
+                                autospec=True)
+        exporter.return_value.write.side_effect = OSError
+        mocker.patch.object(agent, "err", autospec=True)
+        agent.record_metrics()
+        agent.err.assert_called_once()
 
     def test_report(self, agent):
         """Test case for 'report' method."""
         stats = {"foo": 1, "bar": "baz"}
         agent.report(**stats)
         assert agent.agent_mgr.status_set.call_count == len(stats)
+        agent.report(foo=1)
+        assert agent.agent_mgr.status_set.call_count == len(stats)
+        agent.agent_mgr.status_del.assert_called_once_with("bar")
 
     @pytest.mark.parametrize("unwatch_err", ((None,), RuntimeError()))
     @pytest.mark.parametrize("catch_sigterm", (True, False))
@@ -243,6 +633,31 @@ class TestPrefixListAgent(object):
                                                  .format(worker.__class__.__name__))  # noqa: E501
         assert 5 <= agent.info.call_count <= 9
 
+    def test_cleanup_cancel(self, agent, worker, mocker):
+        """Test case for cooperative cancellation during 'cleanup'."""
+        def run():
+            while not worker.cancelled:
+                time.sleep(0.1)
+        mocker.patch.object(worker, "run", autospec=True, side_effect=run)
+        mocker.patch.object(worker, "terminate", autospec=True)
+        worker.start()
+        agent.cleanup(worker)
+        worker.terminate.assert_not_called()
+        assert worker.exitcode == 0
+
+    def test_cleanup_clear_checkpoint(self, agent, worker, mocker, tmp_path):
+        """Test that a cancelled run's checkpoint journal is discarded."""
+        mocker.patch.object(worker, "run", autospec=True)
+        mocker.patch.object(worker, "source_dir", str(tmp_path))
+        journal = tmp_path / ".checkpoint"
+        journal.write_text("{}\n")
+        worker.start()
+        worker.join()
+        agent.cleanup(worker)
+        assert journal.exists()
+        agent.cleanup(worker, clear_checkpoint=True)
+        assert not journal.exists()
+
     def test_cleanup_noop(self, agent, mocker):
         """Test case for noop-'cleanup'."""
         for method in ("err", "notice", "info"):
@@ -250,6 +665,32 @@ class TestPrefixListAgent(object):
         agent.cleanup(None)
         assert agent.info.call_count == 3
 
+    @pytest.mark.parametrize(("agent", "now", "delay"),
+                             (({"refresh-jitter": 600}, 7200.0, 3642.0),
+                              ({"refresh-jitter": 600}, 5000.0, 2242.0),
+                              ({"refresh-jitter": 600}, 5500.0, 5342.0),
+                              ({}, 5500.0, 3600)),
+                             indirect=("agent",))
+    def test_next_delay(self, agent, mocker, now, delay):
+        """Test case for 'next_delay' method."""
+        mocker.patch("time.time", return_value=now)
+        mocker.patch.object(agent, "schedule_offset", return_value=42)
+        assert agent.next_delay() == delay
+
+    @pytest.mark.parametrize(("agent", "span"),
+                             (({}, 0),
+                              ({"refresh-jitter": 600}, 600),
+                              ({"refresh-jitter": 7200}, 3600)),
+                             indirect=("agent",))
+    def test_schedule_offset(self, agent, mocker, span):
+        """Test case for 'schedule_offset' method."""
+        mocker.patch("socket.gethostname", return_value="switch-1")
+        phase_offset = mocker.patch("prefix_list_agent.agent.phase_offset",
+                                    autospec=True, return_value=42)
+        assert agent.schedule_offset() == (42 if span else 0)
+        if span:
+            phase_offset.assert_called_once_with("switch-1", span)
+
     def test_sleep(self, agent, mocker):
         """Test case for 'sleep' method."""
         mocker.patch("eossdk.now", autospec=True, return_value=0)
@@ -300,6 +741,36 @@ class TestPrefixListAgent(object):
         if not enabled:
             agent.shutdown.assert_called_once_with()
 
+    @pytest.mark.parametrize("name", ("rptk-endpoint", "source-directory",
+                                      "refresh-interval", "rptk-format"))
+    @pytest.mark.parametrize("running", (True, False))
+    def test_on_agent_option(self, agent, mocker, name, running):
+        """Test case for 'on_agent_option' method."""
+        for method in ("cleanup", "run"):
+            mocker.patch.object(agent, method, autospec=True)
+        mocker.patch.object(PrefixListAgent, "running",
+                            new_callable=mocker.PropertyMock,
+                            return_value=running)
+        agent.init_worker()
+        agent.profile_next = False
+        agent.negotiated_format = "plain"
+        agent.on_agent_option(name, "foo")
+        assert agent.profile_next is False
+        assert (agent.negotiated_format is None) == (name in ("rptk-endpoint", "rptk-format"))  # noqa: E501
+        if running and name in ("rptk-endpoint", "source-directory"):
+            agent.cleanup.assert_called_once_with(process=agent.worker,
+                                                  clear_checkpoint=True)
+            agent.run.assert_called_once_with()
+        else:
+            agent.cleanup.assert_not_called()
+            agent.run.assert_not_called()
+
+    def test_on_agent_option_profile(self, agent):
+        """Test case for re-arming one-shot profiling."""
+        agent.profile_next = False
+        agent.on_agent_option("profile-mode", "cpu")
+        assert agent.profile_next is True
+
     def test_on_timeout(self, agent, mocker):
         """Test case for 'on_timeout' method."""
         mocker.patch.object(agent, "run", autospec=True)
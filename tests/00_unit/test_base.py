@@ -11,7 +11,9 @@
 # the License.
 """Tests for prefix_list_agent.agent module."""
 
-from prefix_list_agent.base import PrefixListBase
+import logging
+
+from prefix_list_agent.base import LogTracer, PrefixListBase
 
 import pytest
 
@@ -34,3 +36,14 @@ class TestPrefixListBase(object):
         method = getattr(base, level)
         method("message")
         assert base.tracer.trace.call_count == 1
+
+    def test_log_tracer(self, caplog):
+        """Test tracing via 'logging' when EOS SDK is unavailable."""
+        tracer = LogTracer("Test")
+        with caplog.at_level(logging.DEBUG):
+            tracer.trace(3, "error message")
+            tracer.trace(7, "debug message")
+        assert [(r.name, r.levelno) for r in caplog.records] == [
+            ("prefix_list_agent.Test", logging.ERROR),
+            ("prefix_list_agent.Test", logging.DEBUG),
+        ]
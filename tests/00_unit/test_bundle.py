@@ -0,0 +1,63 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Tests for prefix_list_agent.bundle module."""
+
+import zipfile
+
+from prefix_list_agent.bundle import Bundle
+
+import pytest
+
+DATA = {
+    "AS-FOO": {"ipv4": [{"prefix": "192.0.2.0/24", "exact": True}]},
+    "AS-BAR": {"ipv6": [{"prefix": "2001:db8::/32", "exact": True}]},
+}
+
+
+class TestBundle(object):
+    """Test cases for Bundle object."""
+
+    def test_write(self, tmp_path):
+        """Test writing and reading a bundle."""
+        path = str(tmp_path / "strict.zip")
+        assert Bundle.write(path, DATA)
+        with Bundle(path) as bundle:
+            assert len(bundle.version) == 16
+            assert bundle.get("AS-FOO") == DATA["AS-FOO"]
+            assert bundle.get("AS-BAZ") is None
+        with zipfile.ZipFile(path) as archive:
+            assert archive.namelist() == ["AS-BAR.json", "AS-FOO.json"]
+
+    def test_write_unchanged(self, tmp_path):
+        """Test that a bundle is only rewritten if its data changes."""
+        path = tmp_path / "strict.zip"
+        assert Bundle.write(str(path), DATA)
+        content = path.read_bytes()
+        assert not Bundle.write(str(path), dict(DATA))
+        assert path.read_bytes() == content
+        assert Bundle.write(str(path), {"AS-FOO": DATA["AS-FOO"]})
+        assert path.read_bytes() != content
+
+    def test_write_invalid(self, tmp_path):
+        """Test that an invalid existing bundle is replaced."""
+        path = tmp_path / "strict.zip"
+        path.write_text("not a bundle")
+        assert Bundle.write(str(path), DATA)
+        with Bundle(str(path)) as bundle:
+            assert bundle.get("AS-BAR") == DATA["AS-BAR"]
+
+    def test_open_invalid(self, tmp_path):
+        """Test opening an invalid bundle."""
+        path = tmp_path / "strict.zip"
+        path.write_text("not a bundle")
+        with pytest.raises(zipfile.BadZipFile):
+            Bundle(str(path))
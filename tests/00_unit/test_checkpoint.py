@@ -0,0 +1,66 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Tests for prefix_list_agent.checkpoint module."""
+
+import hashlib
+import time
+
+from prefix_list_agent.checkpoint import Checkpoint, file_digest
+
+
+class TestCheckpoint(object):
+    """Test cases for Checkpoint object."""
+
+    def test_file_digest(self, tmp_path):
+        """Test digesting file contents."""
+        path = tmp_path / "foo"
+        assert file_digest(str(path)) is None
+        path.write_bytes(b"foo\n")
+        assert file_digest(str(path)) == hashlib.sha256(b"foo\n").hexdigest()
+
+    def test_load_missing(self, tmp_path):
+        """Test loading a non-existent journal."""
+        assert Checkpoint(str(tmp_path / ".checkpoint"), 60).load() == {}
+
+    def test_record_load(self, tmp_path, mocker):
+        """Test recording and loading completed prefix-lists."""
+        path = tmp_path / ".checkpoint"
+        checkpoint = Checkpoint(str(path), 60)
+        checkpoint.record("strict/AS-FOO/ipv4", digest="old")
+        checkpoint.record("strict/AS-FOO/ipv4", digest="new")
+        checkpoint.record("strict/AS-BAR/ipv4", digest="bar")
+        with open(path, "a") as f:
+            f.write('{"key": "strict/AS-BAZ/ipv4", "dig')
+        records = checkpoint.load()
+        assert set(records) == {"strict/AS-FOO/ipv4", "strict/AS-BAR/ipv4"}
+        assert records["strict/AS-FOO/ipv4"]["digest"] == "new"
+        mocker.patch.object(time, "time", return_value=time.time() + 120)
+        assert checkpoint.load() == {}
+
+    def test_load_stale(self, tmp_path):
+        """Test discarding a journal with a different header."""
+        path = tmp_path / ".checkpoint"
+        Checkpoint(str(path), 60, header={"endpoint": "foo"}).record(
+            "strict/AS-FOO/ipv4", digest="foo")
+        assert path.read_text().startswith('{"header": {"endpoint": "foo"}}')
+        assert Checkpoint(str(path), 60, header={"endpoint": "foo"}).load()
+        assert Checkpoint(str(path), 60, header={"endpoint": "bar"}).load() == {}  # noqa: E501
+        assert not path.exists()
+
+    def test_clear(self, tmp_path):
+        """Test clearing the journal."""
+        path = tmp_path / ".checkpoint"
+        checkpoint = Checkpoint(str(path), 60)
+        checkpoint.clear()
+        checkpoint.record("strict/AS-FOO/ipv4", digest="foo")
+        checkpoint.clear()
+        assert not path.exists()
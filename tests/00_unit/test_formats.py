@@ -0,0 +1,120 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Tests for prefix_list_agent.formats module."""
+
+import json
+
+from prefix_list_agent.formats import (DECODERS, JSON_BACKEND, JSON_BACKENDS,
+                                       decode_json, decode_plain,
+                                       encode_plain,
+                                       register, select)
+
+import pytest
+
+DATA = {
+    "AS-FOO": {
+        "ipv4": [{"prefix": "192.0.2.0/24", "exact": True}],
+        "ipv6": [{"prefix": "2001:db8::/32", "exact": False,
+                  "greater-equal": 40, "less-equal": 48}],
+    },
+    "AS-BAR": {
+        "ipv4": [{"prefix": "198.51.100.0/24", "exact": True},
+                 {"prefix": "203.0.113.0/24", "exact": False,
+                  "less-equal": 32}],
+        "ipv6": [],
+    },
+}
+
+# 'DATA' as rendered by RPTK's 'plain.j2' template
+PLAIN = (b"irr object: AS-FOO\n"
+         b"ipv4 prefixes:\n"
+         b" 192.0.2.0/24\n"
+         b"ipv6 prefixes:\n"
+         b" 2001:db8::/32 ge 40 le 48\n"
+         b"\n"
+         b"irr object: AS-BAR\n"
+         b"ipv4 prefixes:\n"
+         b" 198.51.100.0/24\n"
+         b" 203.0.113.0/24 le 32\n"
+         b"ipv6 prefixes:\n"
+         b" none\n"
+         b"\n")
+
+
+class TestFormats(object):
+    """Test cases for RPTK response formats."""
+
+    @pytest.mark.parametrize(("offered", "preferred", "expected"), (
+        (("json", "plain"), "json", "json"),
+        (("json", "plain"), "plain", "plain"),
+        (("json",), "plain", "json"),
+        (("yaml", "plain"), "yaml", "json"),
+        ((), "plain", "json"),
+    ))
+    def test_select(self, offered, preferred, expected):
+        """Test selecting the preferred format."""
+        assert select(offered, preferred) == expected
+
+    def test_select_default(self):
+        """Test that JSON is selected unless another format is preferred."""
+        assert select(("json", "plain")) == "json"
+
+    def test_register(self, mocker):
+        """Test registering a decoder."""
+        mocker.patch.dict(DECODERS)
+
+        @register("test")
+        def decode_test(body):
+            return {}
+        assert DECODERS["test"] is decode_test
+        assert select(("json", "plain", "test")) == "json"
+        assert select(("json", "plain", "test"), "test") == "test"
+
+    def test_decode_json(self):
+        """Test decoding JSON responses."""
+        assert decode_json(json.dumps(DATA).encode()) == DATA
+
+    @pytest.mark.parametrize("backend", JSON_BACKENDS)
+    @pytest.mark.parametrize("body", (json.dumps(DATA),
+                                      json.dumps(DATA).encode()))
+    def test_json_backends(self, backend, body):
+        """Test decoding JSON with each available backend."""
+        assert JSON_BACKENDS[backend](body) == DATA
+
+    @pytest.mark.parametrize("backend", JSON_BACKENDS)
+    def test_json_backends_invalid(self, backend):
+        """Test that each available backend raises 'ValueError'."""
+        with pytest.raises(ValueError):
+            JSON_BACKENDS[backend](b"foo")
+
+    def test_json_backend(self):
+        """Test that the most preferred backend is used."""
+        assert JSON_BACKEND == list(JSON_BACKENDS)[-1]
+
+    def test_plain_round_trip(self):
+        """Test encoding and decoding plain responses."""
+        assert decode_plain(encode_plain(DATA)) == DATA
+
+    def test_decode_plain(self):
+        """Test decoding a plain response as rendered by RPTK."""
+        assert decode_plain(PLAIN) == DATA
+
+    @pytest.mark.parametrize("body", (
+        b"ipv4 prefixes:\n 192.0.2.0/24\n",
+        b"irr object: AS-FOO\nipv4 prefixes:\n 192.0.2.0/24 ge\n",
+        b"irr object: AS-FOO\nipv4 prefixes:\n 192.0.2.0/24 eq 24\n",
+        b"irr object: AS-FOO\nipv4 prefixes:\n 192.0.2.0/24 le x\n",
+    ))
+    def test_decode_plain_invalid(self, body):
+        """Test decoding a malformed plain response."""
+        with pytest.raises(ValueError):
+            decode_plain(body)
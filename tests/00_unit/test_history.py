@@ -0,0 +1,40 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Tests for prefix_list_agent.history module."""
+
+from prefix_list_agent.history import RunHistory
+
+
+class TestRunHistory(object):
+    """Test cases for RunHistory object."""
+
+    def test_load_missing(self, tmp_path):
+        """Test loading a non-existent history file."""
+        history = RunHistory(str(tmp_path / "history.json"), 3)
+        assert history.load() == []
+
+    def test_load_invalid(self, tmp_path):
+        """Test loading an invalid history file."""
+        path = tmp_path / "history.json"
+        for content in ("foo", "{}"):
+            path.write_text(content)
+            history = RunHistory(str(path), 3)
+            assert history.load() == []
+
+    def test_append(self, tmp_path):
+        """Test appending to a bounded history."""
+        path = tmp_path / "subdir" / "history.json"
+        history = RunHistory(str(path), 3)
+        for i in range(5):
+            history.append({"run": i})
+        assert history.load() == [{"run": 2}, {"run": 3}, {"run": 4}]
+        assert sorted(p.name for p in path.parent.iterdir()) == ["history.json"]  # noqa: E501
@@ -0,0 +1,55 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Tests for prefix_list_agent.index module."""
+
+import json
+
+from prefix_list_agent.index import INDEX_FIELDS, ListIndex
+
+
+class TestListIndex(object):
+    """Test cases for ListIndex object."""
+
+    def test_load_missing(self, tmp_path):
+        """Test loading a non-existent index file."""
+        index = ListIndex(str(tmp_path / "lists.json"))
+        assert index.load() == {}
+
+    def test_load_invalid(self, tmp_path):
+        """Test loading an invalid index file."""
+        path = tmp_path / "lists.json"
+        for content in ("foo", "{}", "[]"):
+            path.write_text(content)
+            assert ListIndex(str(path)).load() == {}
+
+    def test_write(self, tmp_path):
+        """Test writing and re-loading the index."""
+        path = tmp_path / "subdir" / "lists.json"
+        lists = {
+            "strict/AS-FOO/ipv4": {"policy": "strict", "name": "AS-FOO",
+                                   "afi": "ipv4", "entries": 2,
+                                   "error": None},
+            "loose/AS-BAR/ipv6": {"policy": "loose", "name": "AS-BAR",
+                                  "afi": "ipv6", "entries": None,
+                                  "error": "no prefix data"},
+        }
+        index = ListIndex(str(path))
+        index.write(lists)
+        content = json.loads(path.read_text())
+        assert content["fields"] == list(INDEX_FIELDS)
+        assert [row[1] for row in content["rows"]] == ["AS-BAR", "AS-FOO"]
+        loaded = index.load()
+        assert set(loaded) == set(lists)
+        for key, record in lists.items():
+            for field, value in record.items():
+                assert loaded[key][field] == value
+        assert sorted(p.name for p in path.parent.iterdir()) == ["lists.json"]
@@ -0,0 +1,32 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Tests for prefix_list_agent.loaded module."""
+
+from prefix_list_agent.loaded import LoadedDigests
+
+
+class TestLoadedDigests(object):
+    """Test cases for LoadedDigests object."""
+
+    def test_save_load(self, tmp_path):
+        """Test saving and loading digests."""
+        loaded = LoadedDigests(str(tmp_path / ".loaded"))
+        assert loaded.load() == {}
+        loaded.save({"strict/AS-FOO/ipv4": "foo"})
+        assert loaded.load() == {"strict/AS-FOO/ipv4": "foo"}
+        assert [p.name for p in tmp_path.iterdir()] == [".loaded"]
+
+    def test_load_invalid(self, tmp_path):
+        """Test loading a corrupt file."""
+        path = tmp_path / ".loaded"
+        path.write_text('{"strict/AS-FOO')
+        assert LoadedDigests(str(path)).load() == {}
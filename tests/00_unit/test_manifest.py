@@ -0,0 +1,72 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Tests for prefix_list_agent.manifest module."""
+
+import json
+
+from prefix_list_agent.checkpoint import file_digest
+from prefix_list_agent.manifest import MANIFEST_FILE, Manifest
+
+import pytest
+
+
+class TestManifest(object):
+    """Test cases for Manifest object."""
+
+    @staticmethod
+    def render(path):
+        """Write a prefix-list file and its per-list records."""
+        (path / "strict").mkdir()
+        (path / "strict" / "as-foo-4").write_text("seq 1 permit 192.0.2.0/24")
+        lists = {
+            "strict/AS-FOO/ipv4": {
+                "policy": "strict", "name": "AS-FOO", "afi": "ipv4",
+                "file": "as-foo-4", "entries": 1, "error": None,
+                "digest": file_digest(str(path / "strict" / "as-foo-4")),
+            },
+            "strict/AS-FOO/ipv6": {
+                "policy": "strict", "name": "AS-FOO", "afi": "ipv6",
+                "file": "as-foo-6", "entries": None, "digest": None,
+                "error": "no prefix data",
+            },
+        }
+        return lists
+
+    def test_write(self, tmp_path):
+        """Test writing a manifest."""
+        Manifest(str(tmp_path)).write(self.render(tmp_path), {"failed": 1})
+        content = json.loads((tmp_path / MANIFEST_FILE).read_text())
+        assert set(content["files"]) == {"strict/as-foo-4"}
+        assert content["stats"] == {"failed": 1}
+
+    def test_verify(self, tmp_path):
+        """Test verifying a rendered tree against its manifest."""
+        manifest = Manifest(str(tmp_path))
+        manifest.write(self.render(tmp_path), {})
+        assert manifest.verify() == []
+        (tmp_path / "strict" / "as-foo-4").write_text("")
+        assert manifest.verify() == ["strict/as-foo-4"]
+        (tmp_path / "strict" / "as-foo-4").unlink()
+        assert manifest.verify() == ["strict/as-foo-4"]
+
+    def test_verify_files(self, tmp_path):
+        """Test verifying selected files against the manifest."""
+        manifest = Manifest(str(tmp_path))
+        manifest.write(self.render(tmp_path), {})
+        assert manifest.verify(files=["strict/as-foo-4"]) == []
+        assert manifest.verify(files=["strict/as-foo-6"]) == ["strict/as-foo-6"]  # noqa: E501
+
+    def test_load_version(self, tmp_path):
+        """Test loading a manifest of an unsupported version."""
+        (tmp_path / MANIFEST_FILE).write_text('{"version": 0}')
+        with pytest.raises(ValueError):
+            Manifest(str(tmp_path)).load()
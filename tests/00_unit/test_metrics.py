@@ -0,0 +1,76 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Tests for prefix_list_agent.metrics module."""
+
+import datetime
+
+from prefix_list_agent.metrics import MetricsExporter, escape
+
+
+class TestMetricsExporter(object):
+    """Test cases for MetricsExporter object."""
+
+    def test_escape(self):
+        """Test escaping of label values."""
+        assert escape('a\\b"c\nd') == 'a\\\\b\\"c\\nd'
+
+    def test_render(self, tmp_path):  # noqa: R701
+        """Test rendering of metrics."""
+        start = datetime.datetime(2020, 1, 1)
+        end = start + datetime.timedelta(seconds=5)
+        stats = {"succeeded": 2, "phase-fetch-time": 1.5}
+        lists = {"p/AS-FOO/ipv4": {"policy": "p", "name": "AS-FOO",
+                                   "afi": "ipv4", "entries": 10,
+                                   "latency": 0.25, "error": None,
+                                   "updated": end.timestamp(),
+                                   "loaded": 10, "refresh-latency": 0.5}}
+        exporter = MetricsExporter(str(tmp_path / "metrics.prom"))
+        text = exporter.render(runs=3, result="ok", start=start, end=end,
+                               stats=stats, lists=lists,
+                               now=end.timestamp() + 60)
+        lines = text.splitlines()
+        labels = 'policy="p",name="AS-FOO",afi="ipv4"'
+        assert "# TYPE prefix_list_agent_runs counter" in lines
+        assert "prefix_list_agent_runs_total 3" in lines
+        assert "prefix_list_agent_last_run_success 1" in lines
+        assert "prefix_list_agent_last_run_duration_seconds 5.0" in lines
+        assert 'prefix_list_agent_last_run_phase_duration_seconds{phase="fetch"} 1.5' in lines  # noqa: E501
+        assert 'prefix_list_agent_last_run_stat{stat="succeeded"} 2' in lines
+        assert f"prefix_list_agent_prefix_list_entries{{{labels}}} 10" in lines
+        assert f"prefix_list_agent_prefix_list_age_seconds{{{labels}}} 60.0" in lines  # noqa: E501
+        assert f"prefix_list_agent_prefix_list_fetch_seconds{{{labels}}} 0.25" in lines  # noqa: E501
+        assert f"prefix_list_agent_prefix_list_error{{{labels}}} 0" in lines
+        assert f"prefix_list_agent_prefix_list_loaded_entries{{{labels}}} 10" in lines  # noqa: E501
+        assert f"prefix_list_agent_prefix_list_refresh_seconds{{{labels}}} 0.5" in lines  # noqa: E501
+        assert lines[-1] == "# EOF"
+
+    def test_render_failed(self, tmp_path):
+        """Test rendering of metrics for a failed run."""
+        exporter = MetricsExporter(str(tmp_path / "metrics.prom"))
+        text = exporter.render(runs=1, result="failed", start=None,
+                               end=None, stats=None, lists={})
+        assert text == ("# TYPE prefix_list_agent_runs counter\n"
+                        "# HELP prefix_list_agent_runs Update runs started since agent start.\n"  # noqa: E501
+                        "prefix_list_agent_runs_total 1\n"
+                        "# TYPE prefix_list_agent_last_run_success gauge\n"
+                        "# HELP prefix_list_agent_last_run_success Whether the last update run succeeded.\n"  # noqa: E501
+                        "prefix_list_agent_last_run_success 0\n"
+                        "# EOF\n")
+
+    def test_write(self, tmp_path):
+        """Test atomically writing the metrics file."""
+        path = tmp_path / "subdir" / "metrics.prom"
+        exporter = MetricsExporter(str(path))
+        exporter.write(runs=1, result="ok", start=None, end=None,
+                       stats=None, lists={})
+        assert path.read_text().endswith("# EOF\n")
+        assert sorted(p.name for p in path.parent.iterdir()) == ["metrics.prom"]  # noqa: E501
@@ -0,0 +1,102 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Tests for prefix_list_agent.orphans module."""
+
+import json
+
+from prefix_list_agent.orphans import ORPHANS_FILE, OrphanCollector
+
+
+class TestOrphanCollector(object):
+    """Test cases for OrphanCollector object."""
+
+    @staticmethod
+    def tree(path):
+        """Create a source directory with current and orphaned files."""
+        for file in ("strict/as-foo-4", "strict/as-old-4", "old/as-bar-4"):
+            (path / file).parent.mkdir(exist_ok=True)
+            (path / file).write_text("seq 1 permit 192.0.2.0/24\n")
+        (path / "strict" / ".hidden").write_text("")
+        (path / ".checkpoint").write_text("")
+
+    def test_find(self, tmp_path):
+        """Test finding orphaned files."""
+        self.tree(tmp_path)
+        collector = OrphanCollector(str(tmp_path), 0)
+        assert collector.find({"strict/as-foo-4"}) == {"strict/as-old-4",
+                                                       "old/as-bar-4"}
+
+    def test_collect(self, tmp_path):
+        """Test removing orphaned files immediately."""
+        self.tree(tmp_path)
+        collector = OrphanCollector(str(tmp_path), 0)
+        removed, reclaimed = collector.collect({"strict/as-foo-4"})
+        assert removed == 2
+        assert reclaimed == 2 * len("seq 1 permit 192.0.2.0/24\n")
+        assert (tmp_path / "strict" / "as-foo-4").exists()
+        assert not (tmp_path / "strict" / "as-old-4").exists()
+        assert not (tmp_path / "old").exists()
+        assert (tmp_path / ".checkpoint").exists()
+        assert collector.load() == {}
+
+    def test_collect_grace(self, tmp_path, mocker):
+        """Test that orphans are kept until the grace period has passed."""
+        self.tree(tmp_path)
+        collector = OrphanCollector(str(tmp_path), 60)
+        now = mocker.patch("time.time", return_value=1000.0)
+        assert collector.collect({"strict/as-foo-4"}) == (0, 0)
+        assert set(collector.load()) == {"strict/as-old-4", "old/as-bar-4"}
+        # a re-configured file is forgotten
+        now.return_value = 1030.0
+        assert collector.collect({"strict/as-foo-4",
+                                  "old/as-bar-4"}) == (0, 0)
+        assert set(collector.load()) == {"strict/as-old-4"}
+        now.return_value = 1060.0
+        removed, _ = collector.collect({"strict/as-foo-4", "old/as-bar-4"})
+        assert removed == 1
+        assert (tmp_path / "old" / "as-bar-4").exists()
+
+    def test_collect_grace_dirs(self, tmp_path, mocker):
+        """Test that empty directories are kept until the grace period has passed."""  # noqa: E501
+        self.tree(tmp_path)
+        (tmp_path / "empty").mkdir()
+        collector = OrphanCollector(str(tmp_path), 60)
+        now = mocker.patch("time.time", return_value=1000.0)
+        collector.collect({"strict/as-foo-4", "strict/as-old-4",
+                           "old/as-bar-4"})
+        assert set(collector.load()) == {"empty/"}
+        assert (tmp_path / "empty").exists()
+        # emptied by removing its orphans, which starts its grace period
+        now.return_value = 1030.0
+        collector.collect({"strict/as-foo-4", "strict/as-old-4"})
+        now.return_value = 1090.0
+        assert collector.collect({"strict/as-foo-4",
+                                  "strict/as-old-4"}) == (1, len("seq 1 permit 192.0.2.0/24\n"))  # noqa: E501
+        assert not (tmp_path / "empty").exists()
+        assert (tmp_path / "old").exists()
+        assert set(collector.load()) == {"old/"}
+        now.return_value = 1150.0
+        collector.collect({"strict/as-foo-4", "strict/as-old-4"})
+        assert not (tmp_path / "old").exists()
+        assert collector.load() == {}
+
+    def test_load_invalid(self, tmp_path):
+        """Test loading an invalid state file."""
+        for content in ("foo", "[]"):
+            (tmp_path / ORPHANS_FILE).write_text(content)
+            assert OrphanCollector(str(tmp_path), 0).load() == {}
+
+    def test_save(self, tmp_path):
+        """Test saving the state file."""
+        OrphanCollector(str(tmp_path), 0).save({"strict/as-foo-4": 1.0})
+        state = json.loads((tmp_path / ORPHANS_FILE).read_text())
+        assert state == {"strict/as-foo-4": 1.0}
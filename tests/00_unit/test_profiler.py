@@ -0,0 +1,64 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Tests for prefix_list_agent.profiler module."""
+
+import pstats
+import threading
+import tracemalloc
+
+from prefix_list_agent.profiler import Profiler
+
+import pytest
+
+
+def work():
+    """Do some work to profile."""
+    return [str(i) for i in range(1000)]
+
+
+class TestProfiler(object):
+    """Test cases for Profiler object."""
+
+    @pytest.mark.parametrize(("mode", "suffixes"), (
+        ("cpu", (".pstats",)),
+        ("memory", (".tracemalloc", ".tracemalloc.txt")),
+        ("all", (".pstats", ".tracemalloc", ".tracemalloc.txt")),
+    ))
+    def test_profile(self, tmp_path, mode, suffixes):
+        """Test profiling a block of code."""
+        path = tmp_path / "profiles" / "test"
+        with Profiler(mode, str(path)):
+            _ = [str(i) for i in range(1000)]
+        assert not tracemalloc.is_tracing()
+        written = sorted(p.name for p in path.parent.iterdir())
+        assert written == sorted(f"test{s}" for s in suffixes)
+
+    def test_invalid_mode(self, tmp_path):
+        """Test an invalid profile mode."""
+        with pytest.raises(ValueError):
+            Profiler("foo", str(tmp_path / "test"))
+
+    @pytest.mark.parametrize("mode", ("cpu", "memory"))
+    def test_profile_thread(self, tmp_path, mode):
+        """Test that other threads are included in the CPU profile."""
+        path = tmp_path / "test"
+
+        def target(profiler):
+            with profiler.thread():
+                work()
+        with Profiler(mode, str(path)) as profiler:
+            thread = threading.Thread(target=target, args=(profiler,))
+            thread.start()
+            thread.join()
+        if mode == "cpu":
+            stats = pstats.Stats(f"{path}.pstats")
+            assert any(func[2] == "work" for func in stats.stats)
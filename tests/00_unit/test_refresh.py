@@ -0,0 +1,54 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Tests for prefix_list_agent.refresh module."""
+
+from prefix_list_agent.refresh import parse_refresh_messages
+
+import pytest
+
+
+@pytest.mark.parametrize(("messages", "afi", "expect"), (
+    ([], "ip", []),
+    (["Dummy message"], "ip", []),
+    (["IPv4 prefix-list AS-FOO loaded successfully from "
+      "file:/tmp/prefix-lists/strict/as-foo\nNum. of entries loaded: 12"],
+     "ip",
+     [{"name": "AS-FOO", "afi": "ipv4", "loaded": 12, "error": None}]),
+    (["IPv6 prefix-list AS-FOO loaded successfully\n"
+      "Number of entries: 3\n"
+      "IPv6 prefix-list AS-BAR loaded successfully\n"
+      "Number of entries: 0",
+      "Failed to load prefix-list AS-BAZ: invalid entry at line 3"],
+     "ipv6",
+     [{"name": "AS-FOO", "afi": "ipv6", "loaded": 3, "error": None},
+      {"name": "AS-BAR", "afi": "ipv6", "loaded": 0, "error": None},
+      {"name": "AS-BAZ", "afi": "ipv6", "loaded": None,
+       "error": "Failed to load prefix-list AS-BAZ: invalid entry at line 3"}]),  # noqa: E501
+    # names, paths and warnings that contain error-like words
+    (["IPv4 prefix-list AS-ERROR-FILTER loaded successfully from "
+      "file:/mnt/flash/invalid/as-error-filter\nNum. of entries loaded: 4",
+      "IPv4 prefix-list AS-FOO loaded successfully from "
+      "file:/mnt/flash/strict/as-foo\n"
+      "! Ignored 2 duplicate entries\n"
+      "Num. of entries loaded: 10"],
+     "ip",
+     [{"name": "AS-ERROR-FILTER", "afi": "ipv4", "loaded": 4, "error": None},
+      {"name": "AS-FOO", "afi": "ipv4", "loaded": 10, "error": None}]),
+    (["% Error loading prefix-list AS-BAZ from file:/mnt/flash/strict/as-baz"
+      "\n% Invalid prefix 192.0.2.0/33 at line 3"],
+     "ip",
+     [{"name": "AS-BAZ", "afi": "ipv4", "loaded": None,
+       "error": "% Invalid prefix 192.0.2.0/33 at line 3"}]),
+))
+def test_parse_refresh_messages(messages, afi, expect):
+    """Test case for 'parse_refresh_messages' function."""
+    assert parse_refresh_messages(messages, afi) == expect
@@ -0,0 +1,87 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Tests for prefix_list_agent.render module."""
+
+import json
+
+from prefix_list_agent.bundle import Bundle
+from prefix_list_agent.manifest import MANIFEST_FILE
+from prefix_list_agent.render import bundle, load_targets, main
+
+import pytest
+
+
+class TestRender(object):
+    """Test cases for render module."""
+
+    def test_load_targets(self, tmp_path):
+        """Test loading a targets file."""
+        path = tmp_path / "targets"
+        path.write_text("# comment\n\n"
+                        "strict AS-FOO ipv4 as-foo-4\n"
+                        "strict AS-FOO ipv6 as-foo-6\n"
+                        "loose AS-BAR ipv4 as-bar-4\n")
+        assert load_targets(str(path)) == {
+            "strict": {"AS-FOO": {"ipv4": "as-foo-4", "ipv6": "as-foo-6"}},
+            "loose": {"AS-BAR": {"ipv4": "as-bar-4"}},
+        }
+
+    @pytest.mark.parametrize("line", ("strict AS-FOO ipv4",
+                                      "strict AS-FOO ip as-foo-4",
+                                      "strict AS-FOO ipv4 ../as-foo-4",
+                                      "strict AS-FOO ipv4 .checkpoint"))
+    def test_load_targets_invalid(self, tmp_path, line):
+        """Test loading an invalid targets file."""
+        path = tmp_path / "targets"
+        path.write_text(f"{line}\n")
+        with pytest.raises(ValueError):
+            load_targets(str(path))
+
+    @pytest.mark.parametrize("failed", (0, 1))
+    def test_main(self, tmp_path, mocker, capsys, failed):
+        """Test case for the 'prefix-list-render' entry point."""
+        targets = tmp_path / "targets"
+        targets.write_text("strict AS-FOO ipv4 as-foo-4\n")
+        output_dir = tmp_path / "out"
+        mocker.patch("prefix_list_agent.worker.PrefixListWorker.render",
+                     autospec=True,
+                     return_value={"succeeded": 1 - failed,
+                                   "failed": failed, "changed": 0})
+        rc = main(["-e", "http://127.0.0.1", "-t", str(targets),
+                   "-o", str(output_dir)])
+        assert rc == failed
+        assert json.loads(capsys.readouterr().out)["failed"] == failed
+        assert (output_dir / MANIFEST_FILE).exists()
+
+    @pytest.mark.parametrize("missing", (0, 1))
+    def test_bundle(self, tmp_path, mocker, capsys, missing):
+        """Test case for the 'prefix-list-bundle' entry point."""
+        targets = tmp_path / "targets"
+        targets.write_text("strict AS-FOO ipv4 as-foo-4\n"
+                           "strict AS-BAR ipv4 as-bar-4\n")
+        output_dir = tmp_path / "out"
+        data = {"AS-FOO": {"ipv4": [{"prefix": "192.0.2.0/24",
+                                     "exact": True}]},
+                "AS-BAR": {"ipv4": []}}
+        if missing:
+            del data["AS-BAR"]
+        mocker.patch("prefix_list_agent.worker.PrefixListWorker.iter_data",
+                     autospec=True,
+                     return_value=iter([({}, {"strict": data})]))
+        rc = bundle(["-e", "http://127.0.0.1", "-t", str(targets),
+                     "-o", str(output_dir)])
+        assert rc == missing
+        assert json.loads(capsys.readouterr().out) == {
+            "objects": 2 - missing, "missing": missing, "changed": 1,
+        }
+        with Bundle(str(output_dir / "strict.zip")) as b:
+            assert b.get("AS-FOO") == data["AS-FOO"]
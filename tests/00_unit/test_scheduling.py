@@ -0,0 +1,120 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Tests for prefix_list_agent.scheduling module."""
+
+from prefix_list_agent.scheduling import (LOADAVG_FILE, PRESSURE_FILE,
+                                          Throttle, TokenBucket, parse_cpus,
+                                          phase_offset)
+
+import pytest
+
+PRESSURE = ("some avg10={} avg60=0.50 avg300=0.10 total=12345\n"
+            "full avg10=0.00 avg60=0.00 avg300=0.00 total=0\n")
+
+
+@pytest.mark.parametrize(("s", "cpus"), (("0", {0}),
+                                         ("0-2", {0, 1, 2}),
+                                         ("0-1,3", {0, 1, 3}),
+                                         pytest.param("", None,
+                                             marks=pytest.mark.xfail(raises=ValueError)),  # noqa: E501
+                                         pytest.param("a", None,
+                                             marks=pytest.mark.xfail(raises=ValueError))))  # noqa: E501
+def test_parse_cpus(s, cpus):
+    """Test case for 'parse_cpus' function."""
+    assert parse_cpus(s) == cpus
+
+
+def test_phase_offset():
+    """Test case for 'phase_offset' function."""
+    offsets = {phase_offset(f"switch-{i}", 600) for i in range(100)}
+    assert all(0 <= offset < 600 for offset in offsets)
+    assert len(offsets) > 50
+    assert phase_offset("switch-0", 600) == phase_offset("switch-0", 600)
+    assert phase_offset("switch-0", 0) == 0
+
+
+class TestTokenBucket(object):
+    """Test cases for TokenBucket object."""
+
+    def test_take(self, mocker):
+        """Test that taking tokens waits once the burst is used up."""
+        mocker.patch("time.monotonic", return_value=100.0)
+        sleep = mocker.patch("time.sleep")
+        bucket = TokenBucket(rate=10)
+        assert bucket.take(10) == 0
+        assert bucket.take(5) == 0.5
+        sleep.assert_called_once_with(0.5)
+
+    def test_refill(self, mocker):
+        """Test that tokens are refilled over time, up to the burst."""
+        clock = mocker.patch("time.monotonic", return_value=100.0)
+        sleep = mocker.patch("time.sleep")
+        bucket = TokenBucket(rate=10, burst=20)
+        assert bucket.take(20) == 0
+        clock.return_value = 200.0
+        assert bucket.take(20) == 0
+        assert bucket.take(1) == 0.1
+        assert sleep.call_count == 1
+
+
+class TestThrottle(object):
+    """Test cases for Throttle object."""
+
+    @staticmethod
+    def proc(mocker, load, pressure):
+        """Patch the contents of the '/proc' files read by Throttle."""
+        files = {LOADAVG_FILE: f"{load} 0.50 0.25 1/100 1234\n",
+                 PRESSURE_FILE: None if pressure is None
+                 else PRESSURE.format(pressure)}
+        mocker.patch.object(Throttle, "read", side_effect=files.get)
+
+    @pytest.mark.parametrize(("load", "pressure", "busy"),
+                             ((0.5, 1.0, False),
+                              (8.0, 1.0, True),
+                              (0.5, 50.0, True),
+                              (0.5, None, False)))
+    def test_busy(self, mocker, load, pressure, busy):
+        """Test case for 'busy' method."""
+        self.proc(mocker, load, pressure)
+        throttle = Throttle(load=1.0, pressure=10)
+        throttle.ncpus = 2
+        assert throttle.busy() == busy
+
+    def test_busy_disabled(self, mocker):
+        """Test that a throttle without thresholds is never busy."""
+        self.proc(mocker, 100.0, 100.0)
+        assert not Throttle().busy()
+
+    def test_wait(self, mocker):
+        """Test case for 'wait' method."""
+        mocker.patch.object(Throttle, "busy", side_effect=(True, True, False))
+        mocker.patch("time.sleep")
+        check = mocker.Mock()
+        Throttle(load=1.0).wait(check)
+        assert check.call_count == 2
+
+    @pytest.mark.parametrize(("max_wait", "expect"), (
+        (None, 30.0),
+        (2.5, 2.5),
+        (-1.0, 0.0),
+    ))
+    def test_wait_max(self, mocker, max_wait, expect):
+        """Test that 'wait' pauses for no longer than 'max_wait'."""
+        clock = [0.0]
+
+        def sleep(seconds):
+            clock[0] += seconds
+        mocker.patch.object(Throttle, "busy", return_value=True)
+        mocker.patch("time.sleep", side_effect=sleep)
+        mocker.patch("time.monotonic", side_effect=lambda: clock[0])
+        waited = Throttle(load=1.0).wait(mocker.Mock(), max_wait=max_wait)
+        assert waited == pytest.approx(expect)
@@ -0,0 +1,58 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Tests for prefix_list_agent.snapshot module."""
+
+import tarfile
+
+from prefix_list_agent.snapshot import Snapshot
+
+
+class TestSnapshot(object):
+    """Test cases for Snapshot object."""
+
+    def test_restore_missing(self, tmp_path):
+        """Test restoring from a non-existent snapshot."""
+        snapshot = Snapshot(str(tmp_path / "snapshot.tar.gz"))
+        assert snapshot.restore(str(tmp_path / "src")) == []
+
+    def test_save_restore(self, tmp_path):
+        """Test saving and restoring the source directory."""
+        src = tmp_path / "src"
+        (src / "strict").mkdir(parents=True)
+        (src / "strict" / "as-foo-4").write_text("seq 1 permit 192.0.2.0/24\n")
+        (src / "strict" / "as-foo-6").write_text("seq 1 permit 2001:db8::/32\n")  # noqa: E501
+        (src / "strict" / "as-bar-4.tmp").write_text("partial")
+        (src / ".state").write_text("{}")
+        path = tmp_path / "flash" / "snapshot.tar.gz"
+        snapshot = Snapshot(str(path))
+        assert snapshot.save(str(src)) == 2
+        assert sorted(p.name for p in path.parent.iterdir()) == ["snapshot.tar.gz"]  # noqa: E501
+        dest = tmp_path / "dest"
+        (dest / "strict").mkdir(parents=True)
+        (dest / "strict" / "as-foo-6").write_text("newer\n")
+        restored = snapshot.restore(str(dest))
+        assert restored == [str(dest / "strict" / "as-foo-4")]
+        assert (dest / "strict" / "as-foo-4").read_text() == "seq 1 permit 192.0.2.0/24\n"  # noqa: E501
+        assert (dest / "strict" / "as-foo-6").read_text() == "newer\n"
+
+    def test_restore_unsafe(self, tmp_path, mocker):
+        """Test that members outside the source directory are skipped."""
+        outside = tmp_path / "outside"
+        outside.write_text("foo")
+        path = tmp_path / "snapshot.tar.gz"
+        with tarfile.open(str(path), "w:gz") as tar:
+            tar.add(str(outside), "../escaped")
+        snapshot = Snapshot(str(path))
+        mocker.patch.object(snapshot, "warning", autospec=True)
+        assert snapshot.restore(str(tmp_path / "src")) == []
+        snapshot.warning.assert_called_once()
+        assert not (tmp_path / "escaped").exists()
@@ -0,0 +1,70 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Tests for prefix_list_agent.status module."""
+
+from prefix_list_agent.status import (KEY_MAX_LEN, StatusPublisher,
+                                      VAL_MAX_LEN)
+
+import pytest
+
+
+@pytest.fixture
+def publisher(sdk):
+    """Provide a StatusPublisher instance with an empty status."""
+    sdk.state.clear()
+    return StatusPublisher(sdk.get_agent_mgr())
+
+
+class TestStatusPublisher(object):
+    """Test cases for StatusPublisher object."""
+
+    def test_set_unchanged(self, publisher):
+        """Test that unchanged values are not re-written."""
+        assert publisher.set("foo", "bar") is True
+        assert publisher.set("foo", "bar") is False
+        assert publisher.set("foo", "baz") is True
+        assert publisher.agent_mgr.status_set.call_count == 2
+        assert publisher.get("foo") == "baz"
+
+    def test_delete(self, publisher, sdk):
+        """Test deleting a status key."""
+        publisher.set("foo", "bar")
+        assert publisher.set("foo", None) is True
+        assert publisher.delete("foo") is False
+        assert "foo" not in sdk.state
+        assert publisher.get("foo") == ""
+
+    def test_shards(self, publisher, sdk):
+        """Test sharding of long values."""
+        val = "x" * (VAL_MAX_LEN * 2 + 1)
+        publisher.set("foo", val)
+        assert sorted(sdk.state) == ["foo", "foo#1", "foo#2"]
+        assert all(len(v) <= VAL_MAX_LEN for v in sdk.state.values())
+        publisher.published.clear()
+        assert publisher.get("foo") == val
+        publisher.set("foo", "bar")
+        assert sdk.state == {"foo": "bar"}
+
+    def test_key_too_long(self, publisher):
+        """Test that over-long keys are rejected."""
+        with pytest.raises(ValueError):
+            publisher.set("x" * (KEY_MAX_LEN + 1), "bar")
+
+    def test_publish(self, publisher, sdk, mocker):
+        """Test publishing a group of keys."""
+        mocker.patch.object(publisher, "err", autospec=True)
+        assert publisher.publish("test", {"foo": "1", "bar": "2"}) == 2
+        assert publisher.publish("test", {"foo": "1", "baz": "3"}) == 2
+        assert sdk.state == {"foo": "1", "baz": "3"}
+        assert publisher.publish("test", {"x" * (KEY_MAX_LEN + 1): "1"}) == 2
+        publisher.err.assert_called_once()
+        assert sdk.state == {}
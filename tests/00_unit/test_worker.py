@@ -14,31 +14,47 @@
 from __future__ import print_function
 
 import datetime
+import hashlib
 import io
 import json
+import multiprocessing
+import os
+import pstats
+import queue
 import signal
+import socket
+import threading
 import time
 import unittest.mock
 import urllib.error
 import urllib.request
 
-from prefix_list_agent.exceptions import TermException
+from prefix_list_agent.bundle import Bundle
+from prefix_list_agent.checkpoint import file_digest
+from prefix_list_agent.exceptions import (CancelledException,
+                                          CeilingExceeded, DeadlineExceeded,
+                                          TermException)
+from prefix_list_agent.manifest import Manifest
+from prefix_list_agent.scheduling import TokenBucket
 from prefix_list_agent.worker import PrefixListWorker
 
 import pytest
 
 
-@pytest.fixture(scope="module", params=("success", "sigterm", "error"))
-def write_results_side_effect(request):
-    """Provide a callable for use as a mock side effect for 'write_results'."""
+@pytest.fixture(scope="module",
+                params=("success", "sigterm", "cancel", "error"))
+def pipeline_side_effect(request):
+    """Provide a callable for use as a mock side effect for 'pipeline'."""
     class SideEffect:
         case = request.param
 
         def __call__(self, *args, **kwargs):
             if self.case == "success":
-                return ({"foo": "bar"}, set())
+                return {"foo": "bar"}
             elif self.case == "sigterm":
                 raise TermException
+            elif self.case == "cancel":
+                raise CancelledException
             else:
                 raise RuntimeError
 
@@ -52,44 +68,354 @@ class TestPrefixListWorker(object):
         """Test case for PrefixListWorker initialisation."""
         assert isinstance(worker, PrefixListWorker)
 
-    def test_run(self, worker, mocker, write_results_side_effect):
+    @pytest.mark.parametrize(("changed", "removed", "saved"), (
+        (0, 0, False),
+        (1, 0, True),
+        (0, 2, True),
+    ))
+    def test_run_snapshot(self, worker, mocker, changed, removed, saved):
+        """Test that a snapshot is saved after prefix-lists change or GC."""
+        for method in ("get_policies", "get_configured", "save_snapshot"):
+            mocker.patch.object(worker, method, autospec=True)
+        mocker.patch.object(worker, "pipeline", autospec=True,
+                            return_value={"changed": changed})
+        mocker.patch.object(worker, "collect_orphans", autospec=True,
+                            return_value=removed)
+        worker.run()
+        worker.save_snapshot.assert_called_once_with(changed=saved)
+        assert worker.data is not None
+
+    def test_run(self, worker, mocker, pipeline_side_effect):  # noqa: R701
         """Test case for 'run' method."""
-        for method in ("get_policies", "get_configured", "get_data",
-                       "refresh_all", "refresh_prefix_list", "notice"):
+        for method in ("get_policies", "get_configured", "notice"):
             mocker.patch.object(worker, method, autospec=True)
-        mocker.patch.object(worker, "write_results", autospec=True,
-                            side_effect=write_results_side_effect)
+        mocker.patch.object(worker, "pipeline", autospec=True,
+                            side_effect=pipeline_side_effect)
         worker.run()
-        if write_results_side_effect.case == "success":
-            assert worker.data == {"foo": "bar"}
-        elif write_results_side_effect.case == "sigterm":
+        if pipeline_side_effect.case == "success":
+            data, lists, rptk_format = worker.data
+            assert data["foo"] == "bar"
+            assert "cpu-user" in data and "max-rss-kb" in data
+            assert "phase-policies-time" in data
+            assert lists == {}
+            assert rptk_format is None
+        elif pipeline_side_effect.case == "sigterm":
             worker.notice.assert_called_once_with("Got SIGTERM signal: exiting.")  # noqa: E501
-        elif write_results_side_effect.case == "error":
+        elif pipeline_side_effect.case == "cancel":
+            worker.notice.assert_called_once_with("Run cancelled: exiting.")
+        elif pipeline_side_effect.case == "error":
             assert type(worker.error) is RuntimeError
         else:
-            raise ValueError(write_results_side_effect.case)
+            raise ValueError(pipeline_side_effect.case)
 
-    def test_start(self, worker, mocker, write_results_side_effect):
+    def test_start(self, worker, mocker, pipeline_side_effect):  # noqa: R701, E501
         """Test case for 'start' method."""
-        for method in ("get_policies", "get_configured", "get_data",
-                       "refresh_all", "refresh_prefix_list", "notice"):
+        for method in ("get_policies", "get_configured", "notice"):
             mocker.patch.object(worker, method, autospec=True)
-        mocker.patch.object(worker, "write_results", autospec=True,
-                            side_effect=write_results_side_effect)
+        mocker.patch.object(worker, "pipeline", autospec=True,
+                            side_effect=pipeline_side_effect)
         worker.start()
         time.sleep(1)
-        if write_results_side_effect.case == "success":
-            assert worker.data == {"foo": "bar"}
-        elif write_results_side_effect.case == "sigterm":
+        if pipeline_side_effect.case == "success":
+            stats, lists, _ = worker.data
+            assert stats["foo"] == "bar"
+        elif pipeline_side_effect.case == "sigterm":
             assert worker.exitcode == 127 + signal.SIGTERM
-        elif write_results_side_effect.case == "error":
+        elif pipeline_side_effect.case == "cancel":
+            assert worker.exitcode == 0
+            assert worker.data is None
+        elif pipeline_side_effect.case == "error":
             assert type(worker.error) is RuntimeError
         else:
-            raise ValueError(write_results_side_effect.case)
+            raise ValueError(pipeline_side_effect.case)
         if worker.is_alive():
             worker.terminate()
             worker.join()
 
+    def test_count(self, worker):
+        """Test case for 'count' method."""
+        worker.count("foo")
+        worker.count("foo")
+        worker.count("bar", 0.5)
+        assert worker.counters == {"foo": 2, "bar": 0.5}
+
+    def test_count_threads(self, worker):
+        """Test that counting from several threads loses no increments."""
+        def count():
+            for _ in range(10000):
+                worker.count("foo")
+        threads = [threading.Thread(target=count) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert worker.counters["foo"] == 40000
+
+    def test_phase(self, worker):
+        """Test case for 'phase' method."""
+        with pytest.raises(RuntimeError):
+            with worker.phase("foo"):
+                raise RuntimeError
+        assert worker.counters["phase-foo-time"] >= 0
+
+    def test_resource_usage(self, worker):
+        """Test case for 'resource_usage' method."""
+        usage = worker.resource_usage()
+        assert set(usage) == {"cpu-user", "cpu-system", "max-rss-kb",
+                              "ctx-switches-voluntary",
+                              "ctx-switches-involuntary"}
+        assert usage["max-rss-kb"] > 0
+
+    @pytest.mark.parametrize("profile_mode", (None, "cpu"))
+    def test_profiler(self, worker, mocker, tmp_path, profile_mode):
+        """Test case for 'profiler' method."""
+        mocker.patch.object(worker, "negotiate_format", autospec=True,
+                            return_value="json")
+        worker.profile_mode = profile_mode
+        worker.profile_path = str(tmp_path / "test")
+        with worker.profiler():
+            fetcher = threading.Thread(target=worker.fetch,
+                                       args=({}, queue.Queue(),
+                                             threading.Event()))
+            fetcher.start()
+            fetcher.join()
+        assert (tmp_path / "test.pstats").exists() is bool(profile_mode)
+        if profile_mode is not None:
+            stats = pstats.Stats(str(tmp_path / "test.pstats"))
+            assert any(func[2] == "iter_data" for func in stats.stats)
+
+    @pytest.mark.parametrize(("changed", "exists", "saved"), (
+        (True, True, True),
+        (False, True, False),
+        (False, False, True),
+    ))
+    def test_save_snapshot(self, worker, mocker, tmp_path, changed, exists,
+                           saved):
+        """Test case for 'save_snapshot' method."""
+        path = tmp_path / "snapshot.tar.gz"
+        if exists:
+            path.write_bytes(b"")
+        worker.snapshot_file = str(path)
+        snapshot = mocker.patch("prefix_list_agent.worker.Snapshot",
+                                autospec=True)
+        worker.save_snapshot(changed=changed)
+        assert snapshot.return_value.save.called is saved
+
+    def test_save_snapshot_error(self, worker, mocker, tmp_path):
+        """Test case for 'save_snapshot' method failing."""
+        worker.snapshot_file = str(tmp_path / "snapshot.tar.gz")
+        snapshot = mocker.patch("prefix_list_agent.worker.Snapshot",
+                                autospec=True)
+        snapshot.return_value.save.side_effect = OSError
+        mocker.patch.object(worker, "err", autospec=True)
+        worker.save_snapshot(changed=True)
+        worker.err.assert_called_once()
+
+    @pytest.mark.parametrize("fail", (False, True))
+    def test_apply_scheduling(self, worker, mocker, fail):
+        """Test case for 'apply_scheduling' method."""
+        side_effect = OSError if fail else None
+        setpriority = mocker.patch("os.setpriority", side_effect=side_effect)
+        setaffinity = mocker.patch("os.sched_setaffinity",
+                                   side_effect=side_effect)
+        run = mocker.patch("subprocess.run", side_effect=side_effect)
+        mocker.patch.object(worker, "warning", autospec=True)
+        mocker.patch.multiple(worker, nice=10, cpus={0}, io_class="idle")
+        worker.apply_scheduling()
+        setpriority.assert_called_once_with(os.PRIO_PROCESS, 0, 10)
+        setaffinity.assert_called_once_with(0, {0})
+        assert run.call_args.args[0][:3] == ["ionice", "-c", "3"]
+        assert worker.warning.call_count == (3 if fail else 0)
+
+    @pytest.mark.parametrize("waited", (0.0, 2.5))
+    @pytest.mark.parametrize("remaining", (None, 5.0))
+    def test_yield_cpu(self, worker, mocker, waited, remaining):
+        """Test case for 'yield_cpu' method."""
+        throttle = mocker.Mock()
+        throttle.wait.return_value = waited
+        mocker.patch.object(worker, "throttle", throttle)
+        mocker.patch.object(worker, "remaining", return_value=remaining)
+        worker.counters.clear()
+        worker.yield_cpu()
+        throttle.wait.assert_called_once_with(worker.check_cancelled,
+                                              max_wait=remaining)
+        assert worker.counters["throttled-time"] == waited
+        assert worker.counters["throttled"] == (1 if waited else 0)
+
+    @pytest.mark.parametrize(("timeout", "remaining", "expect"), (
+        (None, None, None),
+        (60, None, 60),
+        (60, 10.0, 10.0),
+        (5, 10.0, 5),
+        pytest.param(60, -1.0, None,
+                     marks=pytest.mark.xfail(raises=DeadlineExceeded,
+                                             strict=True)),
+    ))
+    def test_request_timeout(self, worker, mocker, timeout, remaining,
+                             expect):
+        """Test case for 'request_timeout' method."""
+        mocker.patch.object(worker, "rptk_timeout", timeout)
+        mocker.patch.object(worker, "remaining", return_value=remaining)
+        assert worker.request_timeout() == expect
+
+    def test_iter_data_deadline(self, worker, mocker):
+        """Test that objects are skipped once the run deadline passes."""
+        configured = {"strict": {"AS-FOO": {"ipv4": "as-foo-4"}},
+                      "loose": {"AS-BAR": {"ipv4": "as-bar-4"},
+                                "AS-BAZ": {"ipv4": "as-baz-4"}}}
+
+        def get_data_bulk(policy, objs, afi):
+            if policy == "loose":
+                raise DeadlineExceeded("Run deadline of 60s exceeded")
+            return {o: {afi: []} for o in objs}
+        mocker.patch.object(worker, "get_data_bulk", autospec=True,
+                            side_effect=get_data_bulk)
+        mocker.patch.object(worker, "negotiate_format", autospec=True,
+                            return_value="json")
+        mocker.patch.object(worker, "priorities", [("strict", 0)])
+        mocker.patch.object(worker, "skipped", {})
+        worker.counters.clear()
+        units = list(worker.iter_data(configured))
+        assert len(units) == 1
+        assert worker.counters["deadline-exceeded"] == 1
+        assert worker.counters["deadline-skipped"] == 2
+        assert worker.skipped == {"loose": configured["loose"]}
+
+    def test_iter_data_oversized(self, worker, mocker):
+        """Test that objects exceeding the response ceiling are skipped."""
+        configured = {"strict": {"AS-FOO": {"ipv4": "as-foo-4"},
+                                 "AS-BIG": {"ipv4": "as-big-4"}}}
+
+        def get_data_obj(policy, obj, afi):
+            if obj == "AS-BIG":
+                raise CeilingExceeded("Testing")
+            return {obj: {afi: []}}
+        mocker.patch.object(worker, "get_data_bulk", autospec=True,
+                            side_effect=CeilingExceeded("Testing"))
+        mocker.patch.object(worker, "get_data_obj", autospec=True,
+                            side_effect=get_data_obj)
+        mocker.patch.object(worker, "negotiate_format", autospec=True,
+                            return_value="json")
+        units = list(worker.iter_data(configured))
+        assert len(units) == 2
+        assert worker.oversized == {("strict", "AS-BIG")}
+
+    def test_iter_data_bundle(self, worker, mocker, tmp_path):
+        """Test that only objects missing from a bundle are queried."""
+        configured = {"strict": {"AS-FOO": {"ipv4": "as-foo-4"},
+                                 "AS-BAR": {"ipv4": "as-bar-4"}}}
+        path = str(tmp_path / "strict.zip")
+        Bundle.write(path, {"AS-FOO": {"ipv4": [{"prefix": "192.0.2.0/24"}],
+                                       "ipv6": []}})
+        bundle = Bundle(path)
+        mocker.patch.object(worker, "bundle_url", "http://127.0.0.1")
+        mocker.patch.object(worker, "fetch_bundle", autospec=True,
+                            return_value=bundle)
+        mocker.patch.object(worker, "get_data_bulk", autospec=True,
+                            side_effect=lambda p, objs, afi: {
+                                o: {afi: []} for o in objs
+                            })
+        mocker.patch.object(worker, "negotiate_format", autospec=True,
+                            return_value="json")
+        worker.counters.clear()
+        units = list(worker.iter_data(configured))
+        assert units[0][1] == {
+            "strict": {"AS-FOO": {"ipv4": [{"prefix": "192.0.2.0/24"}]}},
+        }
+        assert list(worker.get_data_bulk.call_args.args[1]) == ["AS-BAR"]
+        assert worker.counters["bundle-objects"] == 1
+        assert worker.counters["bundle-missing"] == 1
+        assert not worker.bundles
+        with pytest.raises(ValueError):
+            bundle.get("AS-FOO")
+
+    def test_iter_data_bundle_partial(self, worker, mocker, tmp_path):
+        """Test that objects missing a configured AFI from a bundle are queried."""  # noqa: E501
+        configured = {"strict": {"AS-FOO": {"ipv4": "as-foo-4",
+                                            "ipv6": "as-foo-6"},
+                                 "AS-BAR": {"ipv4": "as-bar-4",
+                                            "ipv6": "as-bar-6"}}}
+        path = str(tmp_path / "strict.zip")
+        # an ipv4-only entry for AS-FOO
+        Bundle.write(path, {"AS-FOO": {"ipv4": [{"prefix": "192.0.2.0/24"}]},
+                            "AS-BAR": {"ipv4": [{"prefix": "198.51.100.0/24"}],  # noqa: E501
+                                       "ipv6": []}})
+        mocker.patch.object(worker, "bundle_url", "http://127.0.0.1")
+        mocker.patch.object(worker, "fetch_bundle", autospec=True,
+                            return_value=Bundle(path))
+        mocker.patch.object(worker, "get_data_bulk", autospec=True,
+                            side_effect=lambda p, objs, afi: {
+                                o: {"ipv4": [], "ipv6": []} for o in objs
+                            })
+        mocker.patch.object(worker, "negotiate_format", autospec=True,
+                            return_value="json")
+        worker.counters.clear()
+        units = list(worker.iter_data(configured))
+        assert units[0][1] == {
+            "strict": {"AS-BAR": {"ipv4": [{"prefix": "198.51.100.0/24"}],
+                                  "ipv6": []}},
+        }
+        assert units[1][1] == {
+            "strict": {"AS-FOO": {"ipv4": [], "ipv6": []}},
+        }
+        assert list(worker.get_data_bulk.call_args.args[1]) == ["AS-FOO"]
+        assert worker.counters["bundle-objects"] == 1
+        assert worker.counters["bundle-missing"] == 1
+
+    @pytest.mark.parametrize(("entries", "budget", "exceeded"), (
+        (10, None, 0),
+        (10, 30, 0),
+        (10, 15, 1),
+    ))
+    def test_check_budget(self, worker, mocker, entries, budget, exceeded):
+        """Test case for 'check_budget' method."""
+        mocker.patch.object(worker, "entry_budget", budget)
+        worker.lists.clear()
+        worker.counters.clear()
+        for name in ("AS-FOO", "AS-BAR"):
+            worker.record_list("strict", name, "ipv4", name.lower(),
+                               entries=entries)
+        worker.record_list("strict", "AS-BAZ", "ipv4", "as-baz",
+                           error="entry ceiling exceeded")
+        worker.check_budget()
+        assert worker.counters["total-entries"] == entries * 2
+        assert worker.counters["budget-exceeded"] == exceeded
+
+    @pytest.mark.parametrize("grace", (None, 0))
+    def test_collect_orphans(self, worker, mocker, tmp_path, grace):
+        """Test case for 'collect_orphans' method."""
+        (tmp_path / "strict").mkdir()
+        (tmp_path / "strict" / "as-foo-4").write_text("foo")
+        (tmp_path / "strict" / "as-old-4").write_text("old")
+        mocker.patch.multiple(worker, source_dir=str(tmp_path),
+                              orphan_grace=grace)
+        worker.counters.clear()
+        removed = worker.collect_orphans({"strict": {"AS-FOO": {"ipv4": "as-foo-4"}}})  # noqa: E501
+        assert (tmp_path / "strict" / "as-foo-4").exists()
+        assert (tmp_path / "strict" / "as-old-4").exists() == (grace is None)
+        assert removed == (0 if grace is None else 1)
+        if grace is not None:
+            assert worker.counters["gc-removed"] == 1
+            assert worker.counters["gc-reclaimed-bytes"] == 3
+
+    def test_cancel(self, worker):
+        """Test case for 'cancel' method and 'cancelled' property."""
+        assert worker.cancelled is False
+        worker.check_cancelled()
+        worker.cancel()
+        assert worker.cancelled is True
+        with pytest.raises(CancelledException):
+            worker.check_cancelled()
+
+    def test_cancel_closed(self, worker, mocker):
+        """Test case for 'cancel' with closed connections."""
+        mocker.patch.object(worker, "warning", autospec=True)
+        worker.p_cancel.close()
+        worker.c_cancel.close()
+        worker.cancel()
+        worker.warning.assert_called_once()
+        assert worker.cancelled is False
+
     def test_get_configured(self, worker):
         """Test case for 'test_get_configured' method."""
         configured = worker.get_configured(["strict"])
@@ -109,6 +435,45 @@ class TestPrefixListWorker(object):
         if prefix_list is not None:
             assert cmd.endswith(prefix_list)
 
+    def test_refresh_prefix_list_results(self, worker, mocker):
+        """Test that refresh output is recorded per prefix-list."""
+        mocker.patch.object(worker, "eapi_request", autospec=True,
+                            return_value=["IPv4 prefix-list AS-FOO loaded "
+                                          "successfully\nNum. of entries "
+                                          "loaded: 2"])
+        mocker.patch.object(worker, "record_refresh", autospec=True)
+        worker.refresh_prefix_list("ip", "AS-FOO")
+        results, latency = worker.record_refresh.call_args.args
+        assert results == [{"name": "AS-FOO", "afi": "ipv4", "loaded": 2,
+                            "error": None}]
+        assert latency >= 0
+
+    def test_record_refresh(self, worker, mocker):
+        """Test case for 'record_refresh' and 'count_refreshed' methods."""
+        mocker.patch.object(worker, "lists", {})
+        mocker.patch.object(worker, "list_keys", {})
+        mocker.patch.object(worker, "warning", autospec=True)
+        for name in ("AS-FOO", "AS-BAR", "AS-BAZ"):
+            worker.record_list("strict", name, "ipv4", name.lower(),
+                               entries=2)
+        worker.record_refresh([
+            {"name": "AS-FOO", "afi": "ipv4", "loaded": 2, "error": None},
+            {"name": "AS-BAR", "afi": "ipv4", "loaded": 1, "error": None},
+            {"name": "AS-BAZ", "afi": "ipv4", "loaded": None,
+             "error": "Failed to load prefix-list AS-BAZ"},
+            {"name": "AS-QUX", "afi": "ipv4", "loaded": 5, "error": None},
+        ], 0.5)
+        assert worker.lists["strict/AS-FOO/ipv4"]["refresh-latency"] == 0.5
+        assert not worker.lists["strict/AS-FOO/ipv4"]["mismatch"]
+        assert worker.lists["strict/AS-BAR/ipv4"]["mismatch"]
+        worker.counters.clear()
+        worker.count_refreshed()
+        assert worker.counters["refresh-lists"] == 3
+        assert worker.counters["refresh-loaded-entries"] == 3
+        assert worker.counters["refresh-failed"] == 1
+        assert worker.counters["refresh-mismatch"] == 1
+        assert worker.warning.call_count == 2
+
     @pytest.mark.parametrize(("update_delay",), ((None,), (1,)))
     def test_refresh_all(self, worker, mocker, update_delay):
         """Test case for 'refresh_all' method."""
@@ -128,7 +493,7 @@ class TestPrefixListWorker(object):
             return wrapped
         m = unittest.mock.MagicMock()
         m.side_effect = func_wrapper(time.sleep, m)
-        mocker.patch.object(time, "sleep", m)
+        mocker.patch.object(worker, "pause", m)
         worker.update_delay = update_delay
         worker.refresh_all(test_objs)
         assert len(m.deltas) == m.call_count
@@ -146,10 +511,46 @@ class TestPrefixListWorker(object):
             worker.refresh_prefix_list.assert_called_with(test_afi,
                                                           test_objs[1])
 
+    def test_refresh_all_deadline(self, worker, mocker):
+        """Test that refreshes are not delayed past the run deadline."""
+        mocker.patch.object(worker, "refresh_prefix_list")
+        mocker.patch.object(worker, "past_deadline", return_value=True)
+        mocker.patch.object(worker, "pause")
+        worker.update_delay = 1
+        worker.refresh_all(["AS-FOO", "AS-BAR"])
+        assert worker.pause.call_count == 0
+        assert worker.refresh_prefix_list.call_count == 2
+
+    def test_refresh_all_cancel(self, worker, mocker):
+        """Test that a run is cancelled during the update delay."""
+        c_cancel, p_cancel = multiprocessing.Pipe(duplex=False)
+        mocker.patch.object(worker, "_c_cancel", c_cancel)
+        mocker.patch.object(worker, "refresh_prefix_list")
+        mocker.patch.object(worker, "update_delay", 30)
+        timer = threading.Timer(0.1, p_cancel.send, (True,))
+        timer.start()
+        t0 = time.monotonic()
+        with pytest.raises(CancelledException):
+            worker.refresh_all(["AS-FOO", "AS-BAR"])
+        assert time.monotonic() - t0 < 5
+        worker.refresh_prefix_list.assert_called_once_with("ip", "AS-FOO")
+        timer.join()
+
+    def test_next_unit_cancel(self, worker, mocker):
+        """Test that waiting for a unit is interrupted by cancellation."""
+        c_cancel, p_cancel = multiprocessing.Pipe(duplex=False)
+        mocker.patch.object(worker, "_c_cancel", c_cancel)
+        units = queue.Queue()
+        units.put(None)
+        assert worker.next_unit(units) is None
+        p_cancel.send(True)
+        with pytest.raises(CancelledException):
+            worker.next_unit(units)
+
     def test_get_policies(self, worker, mocker):
         """Test case for 'get_policies' method."""
         resp_data = {"strict": "strict descr", "loose": "loose descr"}
-        resp_fp = io.StringIO(json.dumps(resp_data))
+        resp_fp = io.BytesIO(json.dumps(resp_data).encode())
         return_value = urllib.request.addinfourl(url="/testing", code=200,
                                                  headers=None, fp=resp_fp)
         mocker.patch.object(urllib.request, "urlopen", autospec=True,
@@ -175,36 +576,355 @@ class TestPrefixListWorker(object):
                             side_effect=(data["strict"], RuntimeError))
         mocker.patch.object(worker, "get_data_obj", autospec=True,
                             side_effect=(data["loose"], RuntimeError))
+        mocker.patch.object(worker, "negotiate_format", autospec=True,
+                            return_value="json")
         result = worker.get_data(configured)
         assert result == data
         assert worker.get_data_bulk.call_count == 2
         assert worker.get_data_obj.call_count == 2
+        assert set(worker.fetch_latency) == {("strict", "AS-FOO"),
+                                             ("strict", "AS-BAR"),
+                                             ("loose", "AS-BAZ")}
+
+    def test_pipeline(self, worker, mocker):
+        """Test case for 'pipeline' method."""
+        units = [({"strict": {"AS-FOO": {}}}, {"strict": {}}),
+                 ({"loose": {"AS-BAR": {}}}, {"loose": {}}),
+                 ({"loose": {"AS-BAZ": {}}}, {"loose": {}})]
+        mocker.patch.object(worker, "iter_data", autospec=True,
+                            return_value=iter(units))
+        mocker.patch.object(worker, "write_results", autospec=True,
+                            side_effect=(({"succeeded": 2, "failed": 0,
+                                           "changed": 1}, {"AS-FOO"}),
+                                         ({"succeeded": 0, "failed": 2,
+                                           "changed": 0}, set()),
+                                         ({"succeeded": 2, "failed": 0,
+                                           "changed": 2}, {"AS-BAZ"})))
+        mocker.patch.object(worker, "refresh_all", autospec=True)
+        stats = worker.pipeline({})
+        assert stats == {"succeeded": 4, "failed": 2, "changed": 3}
+        assert [c.args for c in worker.write_results.call_args_list] == units
+        refreshed = set()
+        for c in worker.refresh_all.call_args_list:
+            refreshed |= c.args[0]
+        assert refreshed == {"AS-FOO", "AS-BAZ"}
+        assert worker.refresh_all.call_count == 1
+
+    @pytest.mark.parametrize(("policy", "obj", "tier"),
+                             (("strict", "AS-CUST-FOO", 0),
+                              ("strict", "AS-FOO", 5),
+                              ("loose", "AS-CUST-FOO", 0),
+                              ("loose", "AS-FOO", 1),
+                              ("loose", "AS-INTERNAL", 9)))
+    def test_tier(self, worker, mocker, policy, obj, tier):
+        """Test case for 'tier' method."""
+        mocker.patch.object(worker, "priorities",
+                            [("*/AS-CUST-*", 0), ("loose/AS-INT*", 9),
+                             ("loose", 1)])
+        assert worker.tier(policy, obj) == tier
+
+    def test_group_by_tier(self, worker, mocker):
+        """Test that groups are ordered by priority tier."""
+        mocker.patch.object(worker, "priorities", [("loose/AS-CUST-*", 0),
+                                                   ("strict", 9)])
+        configured = {"strict": {"AS-FOO": {"ipv4": "as-foo-4"}},
+                      "loose": {"AS-BAR": {"ipv4": "as-bar-4"},
+                                "AS-CUST-BAZ": {"ipv4": "as-cust-baz-4"}}}
+        groups = worker.group_by_tier(configured)
+        assert [(tier, policy, set(objs))
+                for tier, policy, _, objs in groups] == [
+            (0, "loose", {"AS-CUST-BAZ"}),
+            (5, "loose", {"AS-BAR"}),
+            (9, "strict", {"AS-FOO"}),
+        ]
+
+    def test_pipeline_tiers(self, worker, mocker):
+        """Test that units of different tiers are refreshed separately."""
+        mocker.patch.object(worker, "priorities", [("strict", 0)])
+        units = [({"strict": {"AS-FOO": {}}}, {"strict": {}}),
+                 ({"loose": {"AS-BAR": {}}}, {"loose": {}})]
+        mocker.patch.object(worker, "iter_data", autospec=True,
+                            return_value=iter(units))
+        mocker.patch.object(worker, "write_results", autospec=True,
+                            side_effect=lambda configured, data: (
+                                {"succeeded": 1, "failed": 0, "changed": 0},
+                                set(next(iter(configured.values()))),
+                            ))
+        mocker.patch.object(worker, "refresh_all", autospec=True)
+        worker.counters.clear()
+        worker.pipeline({})
+        assert [c.args[0] for c in worker.refresh_all.call_args_list] == [
+            {"AS-FOO"}, {"AS-BAR"},
+        ]
+        assert worker.counters["tier-0-time"] <= \
+            worker.counters["tier-5-time"]
+
+    def test_render(self, worker, mocker):
+        """Test case for 'render' method."""
+        units = [({"strict": {"AS-FOO": {}}}, {"strict": {}}),
+                 ({"loose": {"AS-BAR": {}}}, {"loose": {}})]
+        mocker.patch.object(worker, "iter_data", autospec=True,
+                            return_value=iter(units))
+        mocker.patch.object(worker, "write_results", autospec=True,
+                            return_value=({"succeeded": 1, "failed": 1,
+                                           "changed": 1}, {"AS-FOO"}))
+        mocker.patch.object(worker, "refresh_all", autospec=True)
+        mocker.patch.object(worker, "skipped",
+                            {"loose": {"AS-BAZ": {"ipv4": "as-baz-4"}}})
+        mocker.patch.object(worker, "lists", {})
+        stats = worker.render({})
+        assert stats == {"succeeded": 2, "failed": 3, "changed": 2}
+        assert worker.lists["loose/AS-BAZ/ipv4"]["error"] == \
+            "deadline exceeded"
+        worker.refresh_all.assert_not_called()
 
-    def test_get_data_bulk(self, worker, mocker):
+    def test_resume(self, worker, mocker, tmp_path):
+        """Test case for 'resume' method."""
+        worker.source_dir = str(tmp_path)
+        worker.checkpoint_age = 60
+        configured = {"strict": {"AS-FOO": {"ipv4": "as-foo-4",
+                                            "ipv6": "as-foo-6"},
+                                 "AS-BAR": {"ipv4": "as-bar-4"},
+                                 "AS-BAZ": {"ipv4": "as-baz-4"}}}
+        data = {"strict": {"AS-FOO": {"ipv4": [], "ipv6": []},
+                           "AS-BAR": {"ipv4": []},
+                           "AS-BAZ": {"ipv4": []}}}
+        configured_first = {"strict": {"AS-FOO": configured["strict"]["AS-FOO"],  # noqa: E501
+                                       "AS-BAR": configured["strict"]["AS-BAR"]}}  # noqa: E501
+        # an interrupted run: only the first two objects were completed
+        _, _, resumed = worker.resume(configured)
+        assert resumed == {}
+        worker.write_results(configured_first, data)
+        (tmp_path / "strict" / "as-bar-4").write_text("modified\n")
+        remaining, stats, resumed = worker.resume(configured)
+        assert resumed == {5: {"AS-FOO"}}
+        assert set(remaining["strict"]) == {"AS-BAR", "AS-BAZ"}
+        assert stats == {"succeeded": 2, "failed": 0, "changed": 2}
+        assert worker.lists["strict/AS-FOO/ipv6"]["entries"] == 0
+
+    def test_resume_disabled(self, worker, tmp_path):
+        """Test case for 'resume' method without checkpoints."""
+        worker.source_dir = str(tmp_path)
+        worker.checkpoint_age = 0
+        configured = {"strict": {"AS-FOO": {"ipv4": "as-foo-4"}}}
+        remaining, stats, resumed = worker.resume(configured)
+        assert remaining is configured
+        assert resumed == {}
+        assert worker.journal is None
+        assert list(tmp_path.iterdir()) == []
+
+    @pytest.mark.parametrize(("endpoint", "afis", "resumed"),
+                             (("http://rptk", ("ipv4",), {"AS-FOO"}),
+                              ("http://other", ("ipv4",), set()),
+                              ("http://rptk", ("ipv4", "ipv6"), set())))
+    def test_resume_stale(self, worker, tmp_path, endpoint, afis, resumed):
+        """Test that a journal written by a different run is discarded."""
+        worker.source_dir = str(tmp_path)
+        worker.checkpoint_age = 60
+        worker.rptk_endpoint = "http://rptk"
+        configured = {"strict": {"AS-FOO": {"ipv4": "as-foo-4"}}}
+        worker.resume(configured)
+        worker.write_results(configured, {"strict": {"AS-FOO": {"ipv4": []}}})
+        worker.rptk_endpoint = endpoint
+        configured["strict"]["AS-BAR"] = {afi: f"as-bar-{afi}" for afi in afis}
+        _, _, result = worker.resume(configured)
+        assert set().union(*result.values()) == resumed
+        assert (tmp_path / ".checkpoint").exists() == bool(resumed)
+
+    def test_pipeline_resumed_tiers(self, worker, mocker):
+        """Test that resumed objects are refreshed with their tier."""
+        mocker.patch.object(worker, "resume", autospec=True,
+                            return_value=({}, {"succeeded": 0, "failed": 0,
+                                               "changed": 0},
+                                          {0: {"AS-CUST"}, 5: {"AS-BAZ"},
+                                           9: {"AS-QUX"}}))
+        mocker.patch.object(worker, "priorities", [("strict", 0)])
+        units = [({"strict": {"AS-FOO": {}}}, {"strict": {}}),
+                 ({"loose": {"AS-BAR": {}}}, {"loose": {}})]
+        mocker.patch.object(worker, "iter_data", autospec=True,
+                            return_value=iter(units))
+        mocker.patch.object(worker, "write_results", autospec=True,
+                            side_effect=lambda configured, data: (
+                                {"succeeded": 1, "failed": 0, "changed": 0},
+                                set(next(iter(configured.values()))),
+                            ))
+        mocker.patch.object(worker, "refresh_all", autospec=True)
+        worker.pipeline({})
+        assert [c.args[0] for c in worker.refresh_all.call_args_list] == [
+            {"AS-FOO", "AS-CUST"}, {"AS-BAR", "AS-BAZ", "AS-QUX"},
+        ]
+
+    def test_pipeline_checkpoint(self, worker, mocker, tmp_path):
+        """Test that the checkpoint journal is cleared by a complete run."""
+        worker.source_dir = str(tmp_path)
+        worker.checkpoint_age = 60
+        unit = ({"strict": {"AS-FOO": {"ipv4": "as-foo-4"}}},
+                {"strict": {"AS-FOO": {"ipv4": []}}})
+        mocker.patch.object(worker, "iter_data", autospec=True,
+                            side_effect=lambda c: iter([unit]))
+        mocker.patch.object(worker, "refresh_all", autospec=True)
+        mocker.patch.object(worker, "skipped", {})
+        journal = tmp_path / ".checkpoint"
+        record = mocker.spy(worker, "write_results")
+        worker.pipeline(unit[0])
+        assert record.call_count == 1
+        assert not journal.exists()
+
+    def test_pipeline_deadline(self, worker, mocker, tmp_path):
+        """Test that prefix-lists skipped at the run deadline are failed."""
+        worker.source_dir = str(tmp_path)
+        worker.checkpoint_age = 60
+        configured = {"strict": {"AS-FOO": {"ipv4": "as-foo-4"},
+                                 "AS-BAR": {"ipv4": "as-bar-4",
+                                            "ipv6": "as-bar-6"}}}
+        unit = ({"strict": {"AS-FOO": configured["strict"]["AS-FOO"]}},
+                {"strict": {"AS-FOO": {"ipv4": []}}})
+
+        def iter_data(configured):
+            yield unit
+            worker.skipped["strict"] = {"AS-BAR": {"ipv4": "as-bar-4",
+                                                   "ipv6": "as-bar-6"}}
+        mocker.patch.object(worker, "iter_data", autospec=True,
+                            side_effect=iter_data)
+        mocker.patch.object(worker, "refresh_all", autospec=True)
+        mocker.patch.object(worker, "skipped", {})
+        mocker.patch.object(worker, "lists", {})
+        stats = worker.pipeline(configured)
+        assert stats == {"succeeded": 1, "failed": 2, "changed": 1}
+        assert worker.lists["strict/AS-BAR/ipv4"]["error"] == \
+            "deadline exceeded"
+        assert worker.lists["strict/AS-BAR/ipv6"]["error"] == \
+            "deadline exceeded"
+        assert worker.lists["strict/AS-FOO/ipv4"]["error"] is None
+        # the journal is kept, so that the next run resumes
+        _, _, resumed = worker.resume(configured)
+        assert resumed == {5: {"AS-FOO"}}
+
+    @pytest.mark.parametrize("exc", (RuntimeError, CancelledException))
+    def test_pipeline_error(self, worker, mocker, exc):
+        """Test case for 'pipeline' method with a failed fetch."""
+        def iter_data(configured):
+            yield {"strict": {"AS-FOO": {}}}, {"strict": {}}
+            raise exc
+        mocker.patch.object(worker, "iter_data", autospec=True,
+                            side_effect=iter_data)
+        mocker.patch.object(worker, "write_results", autospec=True,
+                            return_value=({"succeeded": 0}, set()))
+        with pytest.raises(exc):
+            worker.pipeline({})
+        worker.write_results.assert_called_once()
+
+    @pytest.mark.parametrize("afi", (None, "ipv4"))
+    def test_get_data_bulk(self, worker, mocker, afi):
         """Test case for 'get_data_obj' method."""
         policy = "strict"
         objs = ["AS-FOO", "AS-BAR"]
         resp_data = {obj: {"ipv4": [], "ipv6": []} for obj in objs}
-        resp_fp = io.StringIO(json.dumps(resp_data))
+        resp_fp = io.BytesIO(json.dumps(resp_data).encode())
         return_value = urllib.request.addinfourl(url="/testing", code=200,
                                                  headers=None, fp=resp_fp)
         mocker.patch.object(urllib.request, "urlopen", autospec=True,
                             return_value=return_value)
-        result = worker.get_data_bulk(policy, objs)
+        result = worker.get_data_bulk(policy, objs, afi=afi)
         assert result == resp_data
+        url = urllib.request.urlopen.call_args.args[0]
+        assert url.endswith("&afi=ipv4") is bool(afi)
 
-    def test_get_data_obj(self, worker, mocker):
+    @pytest.mark.parametrize("afi", (None, "ipv6"))
+    def test_get_data_obj(self, worker, mocker, afi):
         """Test case for 'get_data_obj' method."""
         policy = "strict"
         obj = "AS-FOO"
         resp_data = {obj: {"ipv4": [], "ipv6": []}}
-        resp_fp = io.StringIO(json.dumps(resp_data))
+        resp_fp = io.BytesIO(json.dumps(resp_data).encode())
         return_value = urllib.request.addinfourl(url="/testing", code=200,
                                                  headers=None, fp=resp_fp)
         mocker.patch.object(urllib.request, "urlopen", autospec=True,
                             return_value=return_value)
-        result = worker.get_data_obj(policy, obj)
+        result = worker.get_data_obj(policy, obj, afi=afi)
         assert result == resp_data
+        url = urllib.request.urlopen.call_args.args[0]
+        assert url.endswith("?afi=ipv6") is bool(afi)
+
+    @pytest.mark.parametrize(("offered", "expected"), (
+        ({"json": {}, "plain": {}}, "plain"),
+        ({"json": {}}, "json"),
+        (RuntimeError, "json"),
+    ))
+    def test_negotiate_format(self, worker, mocker, offered, expected):
+        """Test case for 'negotiate_format' method."""
+        mocker.patch.object(worker, "preferred_format", "plain")
+        if isinstance(offered, dict):
+            mocker.patch.object(worker, "rptk_request", autospec=True,
+                                return_value=offered)
+        else:
+            mocker.patch.object(worker, "rptk_request", autospec=True,
+                                side_effect=offered)
+        assert worker.negotiate_format() == expected
+        worker.rptk_request.assert_called_once_with("/formats")
+        assert worker.negotiated_format == (expected if isinstance(offered, dict) else None)  # noqa: E501
+
+    def test_negotiate_format_default(self, worker, mocker):
+        """Test that JSON is used without a request unless opted out of."""
+        mocker.patch.object(worker, "rptk_request", autospec=True)
+        assert worker.preferred_format == "json"
+        assert worker.negotiate_format() == "json"
+        worker.rptk_request.assert_not_called()
+
+    def test_negotiate_format_cached(self, worker, mocker):
+        """Test that a previously negotiated format is reused."""
+        mocker.patch.object(worker, "rptk_request", autospec=True)
+        mocker.patch.object(worker, "negotiated_format", "plain")
+        assert worker.negotiate_format() == "plain"
+        worker.rptk_request.assert_not_called()
+
+    @pytest.mark.parametrize("body", (
+        b"irr object: AS-FOO\nipv4 prefixes:\n 192.0.2.0/24\n",
+        pytest.param(b"AS-FOO ipv4\n", marks=pytest.mark.xfail(raises=ValueError)),  # noqa: E501
+    ))
+    def test_decode(self, worker, body):
+        """Test case for 'decode' method."""
+        result = worker.decode("plain", body)
+        assert result == {"AS-FOO": {"ipv4": [{"prefix": "192.0.2.0/24",
+                                               "exact": True}]}}
+
+    def test_group_by_afi(self, worker):
+        """Test case for 'group_by_afi' method."""
+        objs = {"AS-FOO": {"ipv4": "as-foo-4", "ipv6": "as-foo-6"},
+                "AS-BAR": {"ipv4": "as-bar-4"},
+                "AS-BAZ": {"ipv6": "as-baz-6"},
+                "AS-QUX": {"ipv4": "as-qux-4"}}
+        groups = worker.group_by_afi(objs)
+        assert {afis: set(group) for afis, group in groups.items()} == {
+            frozenset(("ipv4", "ipv6")): {"AS-FOO"},
+            frozenset(("ipv4",)): {"AS-BAR", "AS-QUX"},
+            frozenset(("ipv6",)): {"AS-BAZ"},
+        }
+
+    def test_iter_data_afi(self, worker, mocker):
+        """Test that single-AFI groups are queried for that AFI only."""
+        configured = {"strict": {"AS-FOO": {"ipv4": "as-foo-4"},
+                                 "AS-BAR": {"ipv6": "as-bar-6"}}}
+        mocker.patch.object(worker, "get_data_bulk", autospec=True,
+                            side_effect=lambda p, objs, afi: {
+                                o: {afi: []} for o in objs
+                            })
+        mocker.patch.object(worker, "negotiate_format", autospec=True,
+                            return_value="json")
+        units = list(worker.iter_data(configured))
+        assert len(units) == 2
+        afis = {c.kwargs["afi"] for c in worker.get_data_bulk.call_args_list}
+        assert afis == {"ipv4", "ipv6"}
+        assert worker.counters["afi-filtered"] == 2
+
+    def test_filter_afis(self, worker):
+        """Test case for 'filter_afis' method."""
+        result = {"AS-FOO": {"ipv4": [{"prefix": "192.0.2.0/24"}],
+                             "ipv6": [{"prefix": "2001:db8::/32"},
+                                      {"prefix": "2001:db8:f::/48"}]}}
+        filtered = worker.filter_afis(result, frozenset(("ipv4",)))
+        assert filtered == {"AS-FOO": {"ipv4": [{"prefix": "192.0.2.0/24"}]}}
+        assert worker.counters["afi-unused-entries"] == 2
 
     @pytest.mark.parametrize(("configured", "data"), (
         ({"strict": {"AS-FOO": {"ipv4": "as-foo-4", "ipv6": "as-foo-6"},
@@ -215,13 +935,139 @@ class TestPrefixListWorker(object):
                                 "ipv6": [{"prefix": "2001:db8::/32",
                                           "exact": True}]}}}),
     ))
-    def test_write_results(self, worker, mocker, configured, data):
+    def test_write_results(self, worker, mocker, tmp_path, configured, data):
         """Test case for 'write_results' method."""
+        worker.source_dir = str(tmp_path)
         mocker.patch("builtins.open", mocker.mock_open())
+        mocker.patch("os.replace", autospec=True)
+        mocker.patch("prefix_list_agent.worker.file_digest", autospec=True,
+                     return_value="digest")
         stats, written_objs = worker.write_results(configured, data)
         assert stats["succeeded"] == 2
         assert stats["failed"] == 2
+        assert stats["changed"] == 2
         assert len(written_objs) == 1
+        assert worker.lists["strict/AS-FOO/ipv4"]["entries"] == 1
+        assert worker.lists["strict/AS-FOO/ipv4"]["changed"] is True
+        assert worker.lists["strict/AS-FOO/ipv4"]["error"] is None
+        assert worker.lists["strict/AS-BAR/ipv6"]["error"] == "no prefix data"
+        assert worker.lists["strict/AS-BAR/ipv6"]["entries"] is None
+
+    @pytest.mark.parametrize(("max_entries", "oversized", "error"), (
+        (None, False, None),
+        (2, False, None),
+        (1, False, "entry ceiling exceeded"),
+        (None, True, "response ceiling exceeded"),
+    ))
+    def test_write_list_ceiling(self, worker, mocker, tmp_path, max_entries,
+                                oversized, error):
+        """Test that prefix-lists exceeding a ceiling are not written."""
+        path = tmp_path / "strict" / "as-foo-4"
+        path.parent.mkdir()
+        path.write_text("seq 1 permit 192.0.2.0/24\n")
+        entries = [{"prefix": "192.0.2.0/24", "exact": True},
+                   {"prefix": "198.51.100.0/24", "exact": True}]
+        mocker.patch.multiple(worker, source_dir=str(tmp_path),
+                              max_entries=max_entries,
+                              oversized=({("strict", "AS-FOO")}
+                                         if oversized else set()))
+        stats = {"succeeded": 0, "failed": 0, "changed": 0}
+        worker.counters.clear()
+        changed = worker.write_list("strict", "AS-FOO", "ipv4", "as-foo-4",
+                                    entries, stats)
+        assert changed is (error is None)
+        assert worker.lists["strict/AS-FOO/ipv4"]["error"] == error
+        assert stats["failed"] == (0 if error is None else 1)
+        assert worker.counters["ceiling-exceeded"] == (0 if error is None
+                                                       else 1)
+        if error is not None:
+            assert path.read_text() == "seq 1 permit 192.0.2.0/24\n"
+
+    def test_write_results_unchanged(self, worker, mocker, tmp_path):
+        """Test that unchanged prefix-lists are not refreshed."""
+        worker.source_dir = str(tmp_path)
+        mocker.patch.object(worker, "loaded", {})
+        configured = {"strict": {"AS-FOO": {"ipv4": "as-foo-4"}}}
+        entries = [{"prefix": "192.0.2.0/24", "exact": True},
+                   {"prefix": "198.51.100.0/24", "exact": True}]
+        _, written_objs = worker.write_results(
+            configured, {"strict": {"AS-FOO": {"ipv4": entries}}},
+        )
+        assert written_objs == {"AS-FOO"}
+        worker.record_loaded(written_objs)
+        stats, written_objs = worker.write_results(
+            configured, {"strict": {"AS-FOO": {"ipv4": entries[::-1]}}},
+        )
+        assert stats["succeeded"] == 1
+        assert stats["changed"] == 0
+        assert not written_objs
+
+    @pytest.mark.parametrize("error", (None, "% Invalid prefix"))
+    def test_write_results_retry(self, worker, mocker, tmp_path, error):
+        """Test that prefix-lists not loaded by EOS are refreshed again."""
+        worker.source_dir = str(tmp_path)
+        mocker.patch.object(worker, "loaded", {})
+        configured = {"strict": {"AS-FOO": {"ipv4": "as-foo-4"}}}
+        data = {"strict": {"AS-FOO": {"ipv4": [{"prefix": "192.0.2.0/24",
+                                                "exact": True}]}}}
+        _, written_objs = worker.write_results(configured, data)
+        # the refresh is interrupted before the prefix-list is loaded
+        _, written_objs = worker.write_results(configured, data)
+        assert written_objs == {"AS-FOO"}
+        worker.lists["strict/AS-FOO/ipv4"]["refresh-error"] = error
+        worker.record_loaded(written_objs)
+        saved = json.loads((tmp_path / ".loaded").read_text())
+        assert ("strict/AS-FOO/ipv4" in saved) is (error is None)
+        mocker.patch.object(worker, "loaded", saved)
+        _, written_objs = worker.write_results(configured, data)
+        assert bool(written_objs) is (error is not None)
+
+    @pytest.mark.parametrize("afi", ("ipv4", "ipv6"))
+    def test_normalise_entries(self, worker, afi):
+        """Test case for 'normalise_entries' method."""
+        if afi == "ipv4":
+            prefixes = ("10.0.0.0/8", "10.0.0.0/16", "192.0.2.0/24")
+        else:
+            prefixes = ("2001:db8::/32", "2001:db8::/48", "2001:db8:f::/48")
+        entries = [
+            {"prefix": prefixes[2], "exact": True},
+            {"prefix": prefixes[0], "exact": False, "less-equal": 24},
+            {"prefix": prefixes[1], "exact": True},
+            {"prefix": prefixes[0], "exact": True},
+            {"prefix": prefixes[0], "exact": False, "greater-equal": 12,
+             "less-equal": 24},
+            {"prefix": prefixes[2], "exact": True},
+        ]
+        worker.counters.clear()
+        result = worker.normalise_entries(entries, afi)
+        assert result == [entries[3], entries[1], entries[4], entries[2],
+                          entries[0]]
+        assert worker.normalise_entries(result[::-1], afi) == result
+        assert worker.counters["duplicate-entries"] == 1
+
+    @pytest.mark.parametrize("prefix", ("2001:db8::/32", "192.0.2.0",
+                                        "192.0.2.0/256"))
+    def test_normalise_entries_invalid(self, worker, prefix):
+        """Test that invalid prefix entries are rejected."""
+        with pytest.raises(ValueError):
+            worker.normalise_entries([{"prefix": prefix, "exact": True}],
+                                     "ipv4")
+
+    def test_write_list_invalid(self, worker, mocker, tmp_path):
+        """Test that prefix-lists with invalid entries are not written."""
+        (tmp_path / "strict").mkdir()
+        mocker.patch.object(worker, "source_dir", str(tmp_path))
+        stats = {"succeeded": 0, "failed": 0, "changed": 0}
+        worker.counters.clear()
+        changed = worker.write_list("strict", "AS-FOO", "ipv4", "as-foo-4",
+                                    [{"prefix": "2001:db8::/32",
+                                      "exact": True}], stats)
+        assert changed is False
+        assert stats["failed"] == 1
+        assert worker.counters["invalid-entries"] == 1
+        assert worker.lists["strict/AS-FOO/ipv4"]["error"] == \
+            "invalid entries"
+        assert not (tmp_path / "strict" / "as-foo-4").exists()
 
     @pytest.mark.parametrize(("entries", "side_effect"), (
         ([], None),
@@ -229,14 +1075,51 @@ class TestPrefixListWorker(object):
          {"prefix": "2001:db8:f00::/48", "exact": True}], None),
         pytest.param([], IOError, marks=pytest.mark.xfail(raises=IOError)),
     ))
-    def test_write_prefix_list(self, worker, mocker, entries, side_effect):
+    def test_write_prefix_list(self, worker, mocker, tmp_path, entries,
+                               side_effect):
         """Test case for 'write_prefix_list' method."""
-        m = mocker.patch("builtins.open", mocker.mock_open())
-        m.side_effect = side_effect
-        path = "/tmp/foo"  # noqa: S108
-        worker.write_prefix_list(path, entries, "ipv6")
-        m.assert_called_once_with(path, "w")
-        assert m().write.call_count == len(entries)
+        (tmp_path / "foo").write_text("seq 1 permit 2001:db8::/32\n")
+        replace = mocker.patch("os.replace", autospec=True,
+                               side_effect=side_effect)
+        path = str(tmp_path / "foo")
+        worker.counters.clear()
+        data = "".join(worker.prefix_list_line(i, e)
+                       for i, e in enumerate(entries)).encode()
+        assert worker.write_prefix_list(path, entries, "ipv6") == (
+            True, hashlib.sha256(data).hexdigest(),
+        )
+        replace.assert_called_once_with(f"{path}.tmp", path)
+        assert (tmp_path / "foo.tmp").read_bytes() == data
+        assert worker.counters["written-bytes"] == len(data)
+
+    def test_write_prefix_list_unchanged(self, worker, tmp_path):
+        """Test that rewriting identical contents is reported unchanged."""
+        path = str(tmp_path / "foo")
+        entries = [{"prefix": "192.0.2.0/24", "exact": True}]
+        worker.counters.clear()
+        changed, digest = worker.write_prefix_list(path, entries, "ipv4")
+        assert changed is True
+        assert digest == file_digest(path)
+        assert worker.write_prefix_list(path, entries, "ipv4") == (False,
+                                                                   digest)
+        assert worker.counters["written-bytes"] == len(
+            worker.prefix_list_line(0, entries[0]),
+        )
+        entries.append({"prefix": "198.51.100.0/24", "exact": True})
+        assert worker.write_prefix_list(path, entries, "ipv4")[0] is True
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["foo"]
+
+    def test_write_prefix_list_interrupted(self, worker, mocker, tmp_path):
+        """Test that an interrupted write leaves the existing file intact."""
+        path = tmp_path / "foo"
+        path.write_text("seq 1 permit 192.0.2.0/24\n")
+        entries = [{"prefix": "198.51.100.0/24", "exact": True}]
+        mocker.patch.object(worker, "prefix_list_line", autospec=True,
+                            side_effect=CancelledException)
+        with pytest.raises(CancelledException):
+            worker.write_prefix_list(str(path), entries, "ipv4")
+        assert path.read_text() == "seq 1 permit 192.0.2.0/24\n"
+        assert not (tmp_path / "foo.tmp").exists()
 
     @pytest.mark.parametrize(("entry", "expect"), (
         ({"prefix": "10.0.0.0/8", "exact": True}, "seq 1 permit 10.0.0.0/8\n"),
@@ -266,6 +1149,8 @@ class TestPrefixListWorker(object):
     def test_eapi_request(self, worker, cmd, allow_empty):
         """Test case for 'eapi_request' method."""
         result = worker.eapi_request(cmd, "{}_resp".format(cmd), allow_empty)
+        assert worker.counters["eapi-calls"] == 1
+        assert worker.counters["eapi-time"] >= 0
         if allow_empty:
             assert result == {}
         else:
@@ -273,7 +1158,7 @@ class TestPrefixListWorker(object):
 
     @pytest.mark.parametrize("side_effect", (
         (urllib.request.addinfourl(url="/testing", code=200, headers=None,
-                                   fp=io.StringIO('{"foo":"bar"}')),),
+                                   fp=io.BytesIO(b'{"foo":"bar"}')),),
         pytest.param(urllib.error.URLError(reason="Testing"),
                      marks=pytest.mark.xfail(raises=urllib.error.URLError),
                      id="URLError"),
@@ -288,9 +1173,206 @@ class TestPrefixListWorker(object):
                             side_effect=side_effect)
         result = worker.rptk_request("/testing")
         assert result["foo"] == "bar"
+        assert worker.counters["rptk-requests"] == 1
+        assert worker.counters["rptk-bytes"] == len('{"foo":"bar"}')
+
+    @pytest.mark.parametrize("exc", (
+        socket.timeout("timed out"),
+        urllib.error.URLError(reason=socket.timeout("timed out")),
+    ))
+    def test_rptk_request_timeout(self, mocker, worker, exc):
+        """Test that timed-out requests are counted."""
+        mocker.patch.object(urllib.request, "urlopen", autospec=True,
+                            side_effect=exc)
+        mocker.patch.object(worker, "request_timeout", return_value=5)
+        worker.counters.clear()
+        with pytest.raises(type(exc)):
+            worker.rptk_request("/testing")
+        assert urllib.request.urlopen.call_args.kwargs["timeout"] == 5
+        assert worker.counters["rptk-timeouts"] == 1
+
+    @staticmethod
+    def bundle_cache(path):
+        """Write a cached bundle and its entity tag under 'path'."""
+        cache = path / ".bundles"
+        cache.mkdir()
+        Bundle.write(str(cache / "strict.zip"), {"AS-FOO": {"ipv4": []}})
+        (cache / "strict.zip.etag").write_text('"v1"')
+        return cache
+
+    def test_fetch_bundle(self, worker, mocker, tmp_path):
+        """Test case for 'fetch_bundle' method."""
+        cache = self.bundle_cache(tmp_path)
+        Bundle.write(str(tmp_path / "new.zip"), {"AS-BAR": {"ipv4": []}})
+        body = (tmp_path / "new.zip").read_bytes()
+        resp = urllib.request.addinfourl(url="/strict.zip", code=200,
+                                         headers={"ETag": '"v2"'},
+                                         fp=io.BytesIO(body))
+        mocker.patch.object(urllib.request, "urlopen", autospec=True,
+                            return_value=resp)
+        mocker.patch.multiple(worker, source_dir=str(tmp_path),
+                              bundle_url="http://127.0.0.1/bundles/")
+        worker.counters.clear()
+        with worker.fetch_bundle("strict") as bundle:
+            assert bundle.get("AS-BAR") is not None
+        req = urllib.request.urlopen.call_args.args[0]
+        assert req.full_url == "http://127.0.0.1/bundles/strict.zip"
+        assert req.get_header("If-none-match") == '"v1"'
+        assert (cache / "strict.zip.etag").read_text() == '"v2"'
+        assert worker.counters["bundle-bytes"] == len(body)
+
+    @staticmethod
+    def prebuilt_tree(worker, mocker, path):
+        """Render a prebuilt tree under 'path', and serve it over urlopen."""
+        lists = {
+            "strict/AS-FOO/ipv4": {"policy": "strict", "name": "AS-FOO",
+                                   "afi": "ipv4", "file": "as-foo-4",
+                                   "entries": 1},
+            "strict/AS-BAR/ipv4": {"policy": "strict", "name": "AS-BAR",
+                                   "afi": "ipv4", "file": "as-bar-4",
+                                   "entries": 0},
+        }
+        files = {"manifest.json": None,
+                 "strict/as-foo-4": b"seq 1 permit 192.0.2.0/24\n",
+                 "strict/as-bar-4": b""}
+        (path / "strict").mkdir(parents=True)
+        for record in lists.values():
+            file = f"strict/{record['file']}"
+            (path / file).write_bytes(files[file])
+            record["digest"] = file_digest(str(path / file))
+        Manifest(str(path)).write(lists, {})
+        files["manifest.json"] = (path / "manifest.json").read_bytes()
+        mocker.patch.object(
+            urllib.request, "urlopen", autospec=True,
+            side_effect=lambda url, timeout: io.BytesIO(
+                files[url.rpartition("/tree/")[2]],
+            ),
+        )
+        mocker.patch.object(worker, "prebuilt_url", "http://127.0.0.1/tree")
+        return files
+
+    def test_install(self, worker, mocker, tmp_path):
+        """Test case for 'install' method."""
+        files = self.prebuilt_tree(worker, mocker, tmp_path / "server")
+        source_dir = tmp_path / "source"
+        (source_dir / "strict").mkdir(parents=True)
+        (source_dir / "strict" / "as-bar-4").write_bytes(b"")
+        (source_dir / ".loaded").write_text(json.dumps({
+            "strict/AS-BAR/ipv4": file_digest(str(source_dir / "strict" /
+                                                  "as-bar-4")),
+        }))
+        mocker.patch.object(worker, "source_dir", str(source_dir))
+        mocker.patch.object(worker, "refresh_all", autospec=True)
+        worker.counters.clear()
+        worker.lists.clear()
+        configured = {"strict": {"AS-FOO": {"ipv4": "as-foo-4"},
+                                 "AS-BAR": {"ipv4": "as-bar-4"},
+                                 "AS-BAZ": {"ipv4": "as-baz-4"}}}
+        stats = worker.install(configured)
+        assert stats == {"succeeded": 2, "failed": 1, "changed": 1}
+        worker.refresh_all.assert_called_once_with({"AS-FOO"})
+        assert (source_dir / "strict" / "as-foo-4").read_bytes() == \
+            files["strict/as-foo-4"]
+        assert not (source_dir / ".prebuilt").exists()
+        assert worker.lists["strict/AS-FOO/ipv4"]["entries"] == 1
+        assert worker.lists["strict/AS-BAZ/ipv4"]["error"] == \
+            "missing from manifest"
+        assert worker.counters["prebuilt-missing"] == 1
+
+    def test_install_invalid(self, worker, mocker, tmp_path):
+        """Test that a tree that does not match its manifest is rejected."""
+        files = self.prebuilt_tree(worker, mocker, tmp_path / "server")
+        files["strict/as-foo-4"] = b"seq 1 permit 0.0.0.0/0\n"
+        source_dir = tmp_path / "source"
+        source_dir.mkdir()
+        mocker.patch.object(worker, "source_dir", str(source_dir))
+        mocker.patch.object(worker, "refresh_all", autospec=True)
+        worker.counters.clear()
+        configured = {"strict": {"AS-FOO": {"ipv4": "as-foo-4"},
+                                 "AS-BAR": {"ipv4": "as-bar-4"}}}
+        with pytest.raises(ValueError):
+            worker.install(configured)
+        worker.refresh_all.assert_not_called()
+        assert list(source_dir.iterdir()) == []
+        assert worker.counters["prebuilt-invalid"] == 1
+
+    @pytest.mark.parametrize("code", (304, 500))
+    def test_fetch_bundle_error(self, worker, mocker, tmp_path, code):
+        """Test that unchanged bundles are reused, and failures tolerated."""
+        self.bundle_cache(tmp_path)
+        mocker.patch.object(urllib.request, "urlopen", autospec=True,
+                            side_effect=urllib.error.HTTPError(
+                                url="/strict.zip", code=code, msg="Testing",
+                                hdrs=None, fp=None,
+                            ))
+        mocker.patch.multiple(worker, source_dir=str(tmp_path),
+                              bundle_url="http://127.0.0.1")
+        worker.counters.clear()
+        bundle = worker.fetch_bundle("strict")
+        if code == 304:
+            with bundle:
+                assert bundle.get("AS-FOO") is not None
+            assert worker.counters["bundle-unchanged"] == 1
+        else:
+            assert bundle is None
+            assert worker.counters["bundle-failures"] == 1
+
+    @pytest.mark.parametrize(("ceiling", "headers", "exceeded"), (
+        (None, {}, False),
+        (1024, {}, False),
+        (16, {}, True),
+        (1024, {"Content-Length": "2048"}, True),
+    ))
+    def test_read_response(self, worker, mocker, ceiling, headers, exceeded):
+        """Test case for 'read_response' method."""
+        body = b'{"foo":"bar"}' * 10
+        resp = urllib.request.addinfourl(url="/testing", code=200,
+                                         headers=headers, fp=io.BytesIO(body))
+        mocker.patch.object(worker, "max_response_bytes", ceiling)
+        if exceeded:
+            with pytest.raises(CeilingExceeded):
+                worker.read_response(resp)
+            assert resp.closed
+        else:
+            assert worker.read_response(resp) == body
+
+    def test_read_response_bandwidth(self, worker, mocker):
+        """Test that responses are read at no more than 'rptk_bandwidth'."""
+        body = b"x" * 100000
+        resp = urllib.request.addinfourl(url="/testing", code=200,
+                                         headers={}, fp=io.BytesIO(body))
+        bucket = mocker.create_autospec(TokenBucket, instance=True)
+        bucket.take.return_value = 0.0
+        mocker.patch.object(worker, "byte_bucket", bucket)
+        assert worker.read_response(resp) == body
+        assert sum(c.args[0] for c in bucket.take.call_args_list) == len(body)
+
+    def test_read_response_deadline(self, worker, mocker):
+        """Test that a slow-drip response is abandoned at the deadline."""
+        resp = mocker.Mock(headers={})
+        resp.read1.side_effect = lambda n: time.sleep(0.05) or b"x"
+        mocker.patch.object(worker, "deadline", time.monotonic() + 0.2)
+        t0 = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            worker.read_response(resp)
+        assert time.monotonic() - t0 < 0.5
+        resp.close.assert_called_once_with()
+
+    @pytest.mark.parametrize("waited", (0.0, 0.5))
+    def test_rate_limit(self, worker, mocker, waited):
+        """Test case for 'rate_limit' method."""
+        bucket = mocker.create_autospec(TokenBucket, instance=True)
+        bucket.take.return_value = waited
+        worker.counters.clear()
+        worker.rate_limit(None, 1)
+        worker.rate_limit(bucket, 1)
+        bucket.take.assert_called_once_with(1)
+        assert worker.counters["rptk-rate-limited"] == (1 if waited else 0)
+        assert worker.counters["rptk-rate-limited-time"] == waited
 
     @pytest.mark.parametrize("obj", (
         '{"foo":"bar"}',
+        b'{"foo":"bar"}',
         io.StringIO('{"foo":"bar"}'),
         pytest.param("foo",
                      marks=pytest.mark.xfail(raises=ValueError, strict=True)),
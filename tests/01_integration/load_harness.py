@@ -0,0 +1,185 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""End-to-end load harness for PrefixListWorker.
+
+Runs a complete `PrefixListWorker.run` against a fault-injecting RPTK stub
+and a fake eAPI, and reports wall time, requests, bytes and memory usage.
+
+When run as a script, the `tests` directory must be on `PYTHONPATH`, for the
+shared prefix data generator.
+"""
+
+import argparse
+import json
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.request
+
+import eossdk
+
+from prefix_list_agent.worker import PrefixListWorker
+
+from rptk_stub import RptkStubProcess, generate_objects
+
+
+class FakeEapi(object):
+    """Fake `eossdk.EapiMgr` serving configured prefix-lists."""
+
+    def __init__(self, objects, source_dir, policy="test", single_afi=0.0):
+        """Initialise the fake eAPI manager.
+
+        The first `single_afi` fraction of objects are configured as IPv4
+        prefix-lists only, and the rest for both address families.
+        """
+        self.lists = {obj: {"ipPrefixListSource":
+                            f"file:{source_dir}/{policy}/{obj.lower()}-{{}}"}
+                      for obj in objects}
+        single = set(sorted(objects)[:int(len(objects) * single_afi)])
+        self.afis = {obj: ("ipv4",) if obj in single else ("ipv4", "ipv6")
+                     for obj in objects}
+        self.calls = 0
+        self.time = 0.0
+
+    def run_show_cmd(self, cmd):
+        """Respond to an eAPI show command."""
+        t0 = time.perf_counter()
+        self.calls += 1
+        if cmd.startswith("show"):
+            afi = "ipv6" if "ipv6" in cmd else "ipv4"
+            lists = {name: {"ipPrefixListSource":
+                            config["ipPrefixListSource"].format(afi)}
+                     for name, config in self.lists.items()
+                     if afi in self.afis[name]}
+            body = json.dumps({"ipPrefixLists": lists})
+        else:
+            body = json.dumps({"messages": []})
+        self.time += time.perf_counter() - t0
+        return eossdk.EapiResponse(True, 0, "", [body])
+
+
+def wait_for(endpoint, timeout=30):
+    """Wait for the stub server to start listening."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return urllib.request.urlopen(f"{endpoint}/_stats")  # noqa: S310
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.2)
+
+
+def stub_stats(endpoint):
+    """Get request and byte counters from the stub server."""
+    resp = urllib.request.urlopen(f"{endpoint}/_stats")  # noqa: S310
+    return json.load(resp)
+
+
+def run_load(objects=100, size=100, update_delay=None,
+             bind="127.0.0.1:8001", trace_memory=False, single_afi=0.0,
+             worker_options=None, **stub_options):
+    """Run a worker against a stub server and return a report.
+
+    `worker_options` are passed to `PrefixListWorker` as keyword arguments.
+
+    Python heap usage is only traced if `trace_memory` is set, because
+    tracing adds considerable overhead to the measured wall time.
+    """
+    endpoint = f"http://{bind}"
+    data = generate_objects(objects, size)
+    stub = RptkStubProcess(objects=data, bind=bind, **stub_options)
+    stub.start()
+    try:
+        wait_for(endpoint)
+        before = stub_stats(endpoint)
+        with tempfile.TemporaryDirectory() as source_dir:
+            eapi = FakeEapi(data, source_dir, single_afi=single_afi)
+            worker = PrefixListWorker(rptk_endpoint=endpoint,
+                                      source_dir=source_dir,
+                                      update_delay=update_delay,
+                                      eapi=eapi, **(worker_options or {}))
+            peak = None
+            if trace_memory:
+                tracemalloc.start()
+            t0 = time.perf_counter()
+            worker.run()
+            wall_time = time.perf_counter() - t0
+            if trace_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+            try:
+                (stats, lists, _), error = worker.data, None
+            except EOFError:
+                stats, lists, error = None, None, worker.error
+        after = stub_stats(endpoint)
+    finally:
+        stub.terminate()
+        stub.join()
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return {"wall_time": wall_time,
+            "requests": after["requests"] - before["requests"],
+            "bytes": after["bytes"] - before["bytes"],
+            "peak_traced_bytes": peak,
+            "max_rss_kb": usage.ru_maxrss,
+            "eapi_calls": eapi.calls,
+            "eapi_time": eapi.time,
+            "stats": stats,
+            "lists": lists,
+            "error": None if error is None else repr(error)}
+
+
+def main():
+    """Run the load harness."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--objects", type=int, default=100)
+    parser.add_argument("--size", type=int, default=100,
+                        help="entries per address family per object")
+    parser.add_argument("--update-delay", type=int, default=None)
+    parser.add_argument("--bind", default="127.0.0.1:8001")
+    parser.add_argument("--latency", default=None,
+                        help="latency distribution, e.g. 'exp:0.2'")
+    parser.add_argument("--bandwidth", type=int, default=None,
+                        help="bandwidth limit (bytes/second)")
+    parser.add_argument("--drip", type=float, nargs=2, default=None,
+                        metavar=("CHUNK", "INTERVAL"),
+                        help="slow-drip chunk size and interval")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--hang", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--formats", nargs="+", default=None,
+                        help="response formats offered by the stub")
+    parser.add_argument("--single-afi", type=float, default=0.0,
+                        help="fraction of objects configured for IPv4 only")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="trace peak python heap usage")
+    args = parser.parse_args()
+    drip = None
+    if args.drip is not None:
+        drip = (int(args.drip[0]), args.drip[1])
+    report = run_load(objects=args.objects, size=args.size,
+                      update_delay=args.update_delay, bind=args.bind,
+                      latency=args.latency, bandwidth=args.bandwidth,
+                      drip=drip, error_rate=args.error_rate,
+                      timeout_rate=args.timeout_rate, hang=args.hang,
+                      seed=args.seed, trace_memory=args.trace_memory,
+                      single_afi=args.single_afi, formats=args.formats)
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0 if report["error"] is None else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
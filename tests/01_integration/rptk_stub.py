@@ -11,20 +11,58 @@
 # the License.
 """Fixtures for PrefixListAgent integration tests."""
 
+import argparse
 import json
 import multiprocessing
+import random
 import sys
+import time
 
 import flask
 
 import gunicorn.app.base
 
+from prefix_data import prefix_entries
+
+from prefix_list_agent.formats import encode_plain
+
+
+def generate_objects(count, size):
+    """Generate `count` objects with `size` entries per address family."""
+    return {f"AS-LOAD-{i}": {"ipv4": prefix_entries(size, "ipv4", i * size),
+                             "ipv6": prefix_entries(size, "ipv6", i * size)}
+            for i in range(count)}
+
+
+def latency_distribution(spec, rng):
+    """Build a latency sampling function from a spec string.
+
+    Supported specs are `fixed:<s>`, `uniform:<min>,<max>` and `exp:<mean>`.
+    """
+    if not spec:
+        return lambda: 0.0
+    kind, _, args = spec.partition(":")
+    params = [float(a) for a in args.split(",")]
+    if kind == "fixed":
+        return lambda: params[0]
+    elif kind == "uniform":
+        return lambda: rng.uniform(*params)
+    elif kind == "exp":
+        return lambda: rng.expovariate(1 / params[0])
+    raise ValueError(f"unknown latency distribution '{kind}'")
+
 
 class RptkStub(gunicorn.app.base.BaseApplication):
-    """Integrated web server."""
+    """Integrated web server.
+
+    Besides serving the default test objects, the stub can serve generated
+    objects and inject latency, bandwidth limits, errors and timeouts in
+    order to be used as a load-testing target.
+    """
 
     app = flask.Flask(__name__)
-    formats = {"json": {"description": "JSON object"}}
+    formats = {"json": {"description": "JSON object"},
+               "plain": {"description": "Plaintext (LOA) prefix-list"}}
     policies = {"test": "A dummy test policy"}
     objects = {
         "AS-FOO": {
@@ -45,9 +83,42 @@ class RptkStub(gunicorn.app.base.BaseApplication):
         },
     }
 
-    def __init__(self, **kwargs):
-        """Initialise the uwsgi app."""
+    def __init__(self, objects=None, latency=None, bandwidth=None,
+                 drip=None, error_rate=0.0, timeout_rate=0.0,
+                 hang=60.0, seed=0, formats=None, **kwargs):
+        """Initialise the uwsgi app.
+
+        Args:
+            objects: mapping of object names to prefix data to serve
+                instead of the default objects.
+            latency: latency distribution spec applied to each request.
+            bandwidth: response body bandwidth limit (bytes/second).
+            drip: `(chunk_size, interval)` tuple to send the response
+                body in small chunks with a fixed delay between them.
+            error_rate: fraction of objects for which requests fail.
+            timeout_rate: fraction of objects for which requests hang.
+            hang: seconds to hang for when injecting a timeout.
+            seed: random seed for latency and fault injection.
+            formats: names of the response formats to offer, instead of
+                all supported formats.
+
+        """
         self.opts = kwargs
+        if objects is not None:
+            self.objects = objects
+        if formats is not None:
+            self.formats = {f: self.formats[f] for f in formats}
+        rng = random.Random(seed)  # noqa: S311
+        self.latency = latency_distribution(latency, rng)
+        self.bandwidth = bandwidth
+        self.drip = drip
+        self.hang = hang
+        names = sorted(self.objects)
+        self.failing = set(rng.sample(names, int(len(names) * error_rate)))
+        self.hanging = set(rng.sample(sorted(set(names) - self.failing),
+                                      int(len(names) * timeout_rate)))
+        self.requests = multiprocessing.Value("L", 0)
+        self.bytes = multiprocessing.Value("L", 0)
         super(RptkStub, self).__init__()
 
     def load(self):
@@ -62,15 +133,46 @@ class RptkStub(gunicorn.app.base.BaseApplication):
             except Exception as e:
                 print(e)
 
+    def count(self, body):
+        """Update request and byte counters."""
+        with self.requests.get_lock():
+            self.requests.value += 1
+        with self.bytes.get_lock():
+            self.bytes.value += len(body)
+
+    def respond(self, body, mimetype="application/json"):
+        """Build a response, subject to the configured throttling."""
+        if isinstance(body, str):
+            body = body.encode()
+        self.count(body)
+        if self.drip is not None:
+            chunk, interval = self.drip
+        elif self.bandwidth:
+            chunk = 65536
+            interval = chunk / self.bandwidth
+        else:
+            return flask.Response(body, mimetype=mimetype)
+
+        def generate():
+            for i in range(0, len(body), chunk):
+                yield body[i:i + chunk]
+                time.sleep(interval)
+        return flask.Response(generate(), mimetype=mimetype)
+
     def run(self, *args, **kwargs):
         """Run the server."""
         @self.app.route("/formats")
         def formats():
-            return json.dumps(self.formats)
+            return self.respond(json.dumps(self.formats))
 
         @self.app.route("/policies")
         def policies():
-            return json.dumps(self.policies)
+            return self.respond(json.dumps(self.policies))
+
+        @self.app.route("/_stats")
+        def stats():
+            return json.dumps({"requests": self.requests.value,
+                               "bytes": self.bytes.value})
 
         @self.app.route("/query")
         @self.app.route("/<string:format>/query")
@@ -81,8 +183,20 @@ class RptkStub(gunicorn.app.base.BaseApplication):
             if obj:
                 objs.append(obj)
             objs = set(objs)
-            result = {o: self.objects[o] for o in objs}
-            return json.dumps(result)
+            time.sleep(self.latency())
+            if objs & self.hanging:
+                time.sleep(self.hang)
+            if objs & self.failing:
+                self.count(b"")
+                flask.abort(500)
+            afi = flask.request.args.get("afi")
+            if afi is None:
+                result = {o: self.objects[o] for o in objs}
+            else:
+                result = {o: {afi: self.objects[o][afi]} for o in objs}
+            if format == "plain" and format in self.formats:
+                return self.respond(encode_plain(result), "text/plain")
+            return self.respond(json.dumps(result))
 
         super(RptkStub, self).run(*args, **kwargs)
 
@@ -90,16 +204,42 @@ class RptkStub(gunicorn.app.base.BaseApplication):
 class RptkStubProcess(multiprocessing.Process):
     """Multiprocessing runner."""
 
+    def __init__(self, *args, **kwargs):
+        """Initialise the runner with options for `RptkStub`."""
+        super(RptkStubProcess, self).__init__()
+        self.stub_args = args
+        self.stub_kwargs = kwargs
+
     def run(self):
         """Run the stub server."""
         sys.argv = [sys.executable]
-        server = RptkStub(loglevel="warning")
+        server = RptkStub(*self.stub_args, loglevel="warning",
+                          **self.stub_kwargs)
         server.run()
 
 
 def main():
     """Launch a stub version of an rptk web application."""
-    server = RptkStub()
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--bind", default="127.0.0.1:8000")
+    parser.add_argument("--objects", type=int, default=None,
+                        help="number of objects to generate")
+    parser.add_argument("--size", type=int, default=100,
+                        help="entries per address family per object")
+    parser.add_argument("--latency", default=None,
+                        help="latency distribution, e.g. 'exp:0.2'")
+    parser.add_argument("--bandwidth", type=int, default=None,
+                        help="bandwidth limit (bytes/second)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    objects = None
+    if args.objects is not None:
+        objects = generate_objects(args.objects, args.size)
+    sys.argv = [sys.executable]
+    server = RptkStub(objects=objects, latency=args.latency,
+                      bandwidth=args.bandwidth, error_rate=args.error_rate,
+                      timeout_rate=args.timeout_rate, bind=args.bind)
     return server.run()
 
 
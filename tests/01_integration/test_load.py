@@ -0,0 +1,68 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Load harness tests for PrefixListWorker."""
+
+from load_harness import run_load
+
+
+class TestLoadHarness(object):
+    """Test cases for the end-to-end load harness."""
+
+    def test_run_load(self):
+        """Test a worker run against a fault-injecting stub."""
+        report = run_load(objects=20, size=10, error_rate=0.1,
+                          latency="uniform:0,0.01", bind="127.0.0.1:8001")
+        assert report["error"] is None
+        assert report["stats"]["succeeded"] == 36
+        assert report["stats"]["failed"] == 4
+        # policies, failed bulk query and one query per object
+        assert report["requests"] == 22
+        assert report["bytes"] > 0
+        # two discovery commands, and a single pair of refresh commands
+        assert report["eapi_calls"] == 4
+
+    def test_run_load_single_afi(self):
+        """Test that single-AFI prefix-lists are fetched for one AFI only."""
+        both = run_load(objects=20, size=10, bind="127.0.0.1:8001")
+        single = run_load(objects=20, size=10, single_afi=1.0,
+                          bind="127.0.0.1:8001")
+        assert single["error"] is None
+        assert single["stats"]["succeeded"] == 20
+        assert single["stats"]["afi-filtered"] == 20
+        assert "afi-unused-entries" not in single["stats"]
+        assert single["bytes"] < both["bytes"] * 0.6
+
+    def test_run_load_deadline(self):
+        """Test that a slow-drip response cannot overrun the run deadline."""
+        report = run_load(objects=20, size=50, drip=(64, 0.2),
+                          worker_options={"run_deadline": 2,
+                                          "rptk_timeout": 1},
+                          bind="127.0.0.1:8001")
+        assert report["error"] is None
+        assert report["stats"]["deadline-exceeded"] == 1
+        assert report["wall_time"] < 3
+
+    def test_run_load_formats(self):
+        """Test opting in to plain, and falling back to JSON if not offered."""
+        json = run_load(objects=20, size=10, bind="127.0.0.1:8001")
+        plain = run_load(objects=20, size=10,
+                         worker_options={"rptk_format": "plain"},
+                         bind="127.0.0.1:8001")
+        fallback = run_load(objects=20, size=10, formats=["json"],
+                            worker_options={"rptk_format": "plain"},
+                            bind="127.0.0.1:8001")
+        for report in (json, plain, fallback):
+            assert report["error"] is None
+            assert report["stats"]["succeeded"] == 40
+        assert plain["bytes"] < json["bytes"] < fallback["bytes"]
+        # the formats request is only made when plain is preferred
+        assert plain["requests"] == fallback["requests"] == json["requests"] + 1  # noqa: E501
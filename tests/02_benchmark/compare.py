@@ -0,0 +1,63 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Compare PrefixListAgent benchmark results against a baseline."""
+
+import argparse
+import json
+import sys
+
+METRICS = ("seconds", "peak_bytes")
+
+
+def load(path):
+    """Load benchmark results from a JSON file."""
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def compare(baseline, current, threshold):
+    """Compare two sets of results, returning a list of regressions."""
+    regressions = []
+    for name in sorted(set(baseline) | set(current)):
+        if name not in current:
+            print(f"{name:40} missing from current results")
+            continue
+        if name not in baseline:
+            print(f"{name:40} new")
+            continue
+        for metric in METRICS:
+            old, new = baseline[name][metric], current[name][metric]
+            ratio = new / old if old else float("inf") if new else 1.0
+            flag = ""
+            if ratio > threshold:
+                flag = " REGRESSION"
+                regressions.append((name, metric, ratio))
+            print(f"{name:40} {metric:10} {old:>14.6g} -> {new:>14.6g} "
+                  f"({ratio:.2f}x){flag}")
+    return regressions
+
+
+def main():
+    """Compare benchmark results against a baseline."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("baseline", help="baseline results JSON file")
+    parser.add_argument("current", help="current results JSON file")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="maximum acceptable current/baseline ratio")
+    args = parser.parse_args()
+    regressions = compare(load(args.baseline), load(args.current),
+                          args.threshold)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
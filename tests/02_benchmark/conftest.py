@@ -0,0 +1,87 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Fixtures for PrefixListAgent benchmarks.
+
+Benchmarks are deselected by default. Run them with:
+
+    python3 -m pytest -m benchmark tests/02_benchmark
+
+and compare the results with a stored baseline using `compare.py`.
+"""
+
+import datetime
+import gc
+import json
+import os
+import platform
+import time
+import tracemalloc
+
+from generators import ENTRY_COUNTS
+
+import pytest
+
+
+class BenchmarkRecorder(object):
+    """Collect benchmark measurements and save them as JSON."""
+
+    def __init__(self, path, rounds=3):
+        """Initialise the recorder."""
+        self.path = path
+        self.rounds = rounds
+        self.results = dict()
+
+    def __call__(self, name, items, func, *args, **kwargs):
+        """Measure wall time and peak memory of `func(*args, **kwargs)`."""
+        rounds = self.rounds if items < ENTRY_COUNTS[-1] else 1
+        timings = []
+        for _ in range(rounds):
+            gc.collect()
+            t0 = time.perf_counter()
+            func(*args, **kwargs)
+            timings.append(time.perf_counter() - t0)
+        gc.collect()
+        tracemalloc.start()
+        try:
+            result = func(*args, **kwargs)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        seconds = min(timings)
+        self.results[name] = {"items": items,
+                              "seconds": seconds,
+                              "throughput": items / seconds if seconds else None,  # noqa: E501
+                              "peak_bytes": peak}
+        return result
+
+    def save(self):
+        """Write the collected results to `self.path`."""
+        data = {"meta": {"timestamp": datetime.datetime.now().isoformat(),
+                         "python": platform.python_version(),
+                         "machine": platform.machine()},
+                "results": self.results}
+        with open(self.path, "w") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+
+
+@pytest.fixture(scope="session")
+def benchmark():
+    """Provide a session-wide `BenchmarkRecorder`.
+
+    Results are written to the path in `$BENCHMARK_OUTPUT` (default
+    `benchmark.json`) at the end of the session.
+    """
+    recorder = BenchmarkRecorder(os.environ.get("BENCHMARK_OUTPUT",
+                                                "benchmark.json"))
+    yield recorder
+    if recorder.results:
+        recorder.save()
@@ -0,0 +1,48 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Synthetic data generators for PrefixListAgent benchmarks."""
+
+import json
+
+import eossdk
+
+from prefix_data import prefix_entries
+
+from prefix_list_agent.formats import encode_plain
+
+ENTRY_COUNTS = (1000, 100000, 1000000)
+LIST_COUNTS = (10, 1000, 10000)
+
+
+def rptk_payload(count, objects=("AS-BENCH",), rptk_format="json"):
+    """Generate a serialised RPTK query response."""
+    per_obj = max(count // len(objects), 1)
+    data = {obj: {"ipv4": prefix_entries(per_obj, "ipv4"),
+                  "ipv6": prefix_entries(per_obj, "ipv6")}
+            for obj in objects}
+    if rptk_format == "plain":
+        return encode_plain(data)
+    return json.dumps(data)
+
+
+def configured_lists(count, source_dir, policy="strict"):
+    """Generate a `show ip prefix-list` eAPI response body."""
+    return json.dumps({"ipPrefixLists": {
+        f"AS-BENCH-{i}": {"ipPrefixListSource":
+                          f"file:{source_dir}/{policy}/as-bench-{i}"}
+        for i in range(count)
+    }})
+
+
+def eapi_response(body):
+    """Wrap a response body in an `EapiResponse`."""
+    return eossdk.EapiResponse(True, 0, "", [body])
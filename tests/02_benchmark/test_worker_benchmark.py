@@ -0,0 +1,124 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Benchmarks for prefix_list_agent.worker hot paths."""
+
+import collections
+
+from generators import (ENTRY_COUNTS, LIST_COUNTS, configured_lists,
+                        eapi_response, rptk_payload)
+
+from prefix_data import prefix_entries
+
+from prefix_list_agent.formats import JSON_BACKENDS
+
+import pytest
+
+pytestmark = pytest.mark.benchmark
+
+
+@pytest.mark.parametrize("count", ENTRY_COUNTS)
+class TestEntryBenchmarks(object):
+    """Benchmarks scaling with the number of prefix-list entries."""
+
+    def test_parse(self, benchmark, worker, count):
+        """Benchmark deserialising an RPTK response."""
+        payload = rptk_payload(count)
+        result = benchmark(f"parse[{count}]", count * 2,
+                           worker.json_load, payload)
+        assert len(result["AS-BENCH"]["ipv4"]) == count
+
+    @pytest.mark.parametrize("backend", JSON_BACKENDS)
+    def test_parse_backend(self, benchmark, backend, count):
+        """Benchmark deserialising an RPTK response with a JSON backend."""
+        payload = rptk_payload(count).encode()
+        result = benchmark(f"parse_{backend}[{count}]", count * 2,
+                           JSON_BACKENDS[backend], payload)
+        assert len(result["AS-BENCH"]["ipv4"]) == count
+
+    @pytest.mark.parametrize("rptk_format", ("json", "plain"))
+    def test_decode(self, benchmark, worker, count, rptk_format):
+        """Benchmark decoding the same RPTK response in each format.
+
+        'decode_json[N]' and 'decode_plain[N]' measure the same prefix data,
+        so their timings are directly comparable.
+        """
+        if rptk_format == "json":
+            payload = rptk_payload(count).encode()
+            result = benchmark(f"decode_json[{count}]", count * 2,
+                               worker.json_load, payload)
+        else:
+            payload = rptk_payload(count, rptk_format=rptk_format)
+            result = benchmark(f"decode_{rptk_format}[{count}]", count * 2,
+                               worker.decode, rptk_format, payload)
+        assert len(result["AS-BENCH"]["ipv4"]) == count
+
+    def test_normalise_entries(self, benchmark, worker, count):
+        """Benchmark sorting and de-duplicating prefix entries."""
+        entries = prefix_entries(count, "ipv4")
+        # interleave out of order, as RPTK may return them
+        entries = entries[1::2] + entries[0::2][::-1]
+        result = benchmark(f"normalise_entries[{count}]", count,
+                           worker.normalise_entries, entries, "ipv4")
+        assert len(result) == count
+
+    def test_prefix_list_line(self, benchmark, worker, count):
+        """Benchmark generating prefix-list lines."""
+        entries = prefix_entries(count, "ipv6")
+
+        def render():
+            return [worker.prefix_list_line(i, e)
+                    for i, e in enumerate(entries)]
+        lines = benchmark(f"prefix_list_line[{count}]", count, render)
+        assert len(lines) == count
+
+    def test_write_prefix_list(self, benchmark, worker, tmp_path, count):
+        """Benchmark rendering a prefix-list to file."""
+        entries = prefix_entries(count, "ipv4")
+        path = tmp_path / "as-bench"
+        benchmark(f"write_prefix_list[{count}]", count,
+                  worker.write_prefix_list, str(path), entries, "ipv4")
+        assert path.exists()
+
+
+@pytest.mark.parametrize("count", LIST_COUNTS)
+class TestListBenchmarks(object):
+    """Benchmarks scaling with the number of configured prefix-lists."""
+
+    def test_get_configured(self, benchmark, worker, count):
+        """Benchmark discovery of configured prefix-lists."""
+        response = eapi_response(configured_lists(count, worker.source_dir))
+        worker.eapi.run_show_cmd.side_effect = lambda cmd: response
+        configured = benchmark(f"get_configured[{count}]", count * 2,
+                               worker.get_configured, {"strict": ""})
+        assert len(configured["strict"]) == count
+
+    @pytest.mark.parametrize("backend", JSON_BACKENDS)
+    def test_parse_eapi(self, benchmark, backend, worker, count):
+        """Benchmark deserialising an eAPI response with a JSON backend."""
+        body = configured_lists(count, worker.source_dir)
+        result = benchmark(f"parse_eapi_{backend}[{count}]", count,
+                           JSON_BACKENDS[backend], body)
+        assert len(result["ipPrefixLists"]) == count
+
+    def test_write_results(self, benchmark, worker, tmp_path, count):
+        """Benchmark writing results and collecting statistics."""
+        worker.source_dir = str(tmp_path)
+        objs = collections.defaultdict(dict)
+        for i in range(count):
+            objs[f"AS-BENCH-{i}"]["ipv4"] = f"as-bench-{i}-4"
+            objs[f"AS-BENCH-{i}"]["ipv6"] = f"as-bench-{i}-6"
+        entries = {"ipv4": prefix_entries(10, "ipv4"),
+                   "ipv6": prefix_entries(10, "ipv6")}
+        data = {"strict": {obj: entries for obj in objs}}
+        stats, _ = benchmark(f"write_results[{count}]", count * 2,
+                             worker.write_results, {"strict": objs}, data)
+        assert stats["succeeded"] == count * 2
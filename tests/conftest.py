@@ -9,7 +9,7 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations under
 # the License.
-"""Fixtures for prefix_list_agent test cases."""
+"""Shared fixtures for prefix_list_agent test cases."""
 
 import json
 import multiprocessing.connection
@@ -0,0 +1,35 @@
+# Copyright (c) 2019 Workonline Communications (Pty) Ltd. All rights reserved.
+#
+# The contents of this file are licensed under the MIT License
+# (the "License"); you may not use this file except in compliance with the
+# License.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations under
+# the License.
+"""Synthetic prefix data shared by the integration tests and benchmarks."""
+
+
+def prefix_entries(count, afi, seed=0):
+    """Generate a deterministic list of RPTK prefix entries.
+
+    Entries are numbered from 'seed', so that generators called with
+    non-overlapping ranges produce distinct prefixes. Every third entry
+    carries a prefix length range.
+    """
+    entries = []
+    for i in range(seed, seed + count):
+        if afi == "ipv4":
+            prefix = f"{10 + (i >> 16) % 200}.{(i >> 8) & 0xff}.{i & 0xff}.0/24"  # noqa: E501
+        else:
+            prefix = f"2001:db8:{i >> 16:x}:{i & 0xffff:x}::/64"
+        if i % 3:
+            entry = {"prefix": prefix, "exact": True}
+        else:
+            length = int(prefix.rsplit("/", 1)[1])
+            entry = {"prefix": prefix, "exact": False,
+                     "greater-equal": length, "less-equal": length + 8}
+        entries.append(entry)
+    return entries